@@ -0,0 +1,25 @@
+"""
+Benchmarks reproduzíveis da camada de banco (ver benchmarks/__main__.py).
+"""
+
+from benchmarks.baseline import carregar_resultado, comparar_resultados, salvar_resultado
+from benchmarks.carga_http import GeradorCarga, Histograma
+from benchmarks.cenarios import CENARIOS, ContextoCenarios, executar_cenarios
+from benchmarks.gerador_dados import ESCALAS, gerar_dados
+from benchmarks.medicao import CONTADOR, ConexaoMedida, medir
+
+__all__ = [
+    'carregar_resultado',
+    'comparar_resultados',
+    'salvar_resultado',
+    'GeradorCarga',
+    'Histograma',
+    'CENARIOS',
+    'ContextoCenarios',
+    'executar_cenarios',
+    'ESCALAS',
+    'gerar_dados',
+    'CONTADOR',
+    'ConexaoMedida',
+    'medir'
+]
\ No newline at end of file
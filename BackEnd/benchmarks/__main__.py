@@ -0,0 +1,115 @@
+"""
+Benchmarks da camada de banco (executar a partir da pasta BackEnd).
+
+O banco de benchmark precisa existir com o schema do projeto
+(script_banco.sql); `gerar` APAGA os dados dele.
+
+Uso:
+    python -m benchmarks gerar --escala 100k [--semente 42] [--banco energia_bench]
+    python -m benchmarks executar --escala 100k --saida resultados/base.json
+    python -m benchmarks executar --escala 100k --comparar resultados/base.json
+    python -m benchmarks comparar resultados/base.json resultados/novo.json
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONEXAO_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "Conexao")
+for caminho in (BACKEND_DIR, CONEXAO_DIR):
+    if caminho not in sys.path:
+        sys.path.insert(0, caminho)
+
+from database import CONFIG_CONEXAO, Database, criar_pool
+from benchmarks.baseline import carregar_resultado, comparar_resultados, imprimir_comparacao, salvar_resultado
+from benchmarks.cenarios import CENARIOS, ContextoCenarios, executar_cenarios
+from benchmarks.gerador_dados import ESCALAS, gerar_dados
+from benchmarks.medicao import ConexaoMedida
+
+
+def _conectar(args) -> Database:
+    if args.banco == CONFIG_CONEXAO['database'] and not args.forcar:
+        raise ValueError(
+            f"'{args.banco}' é o banco da aplicação; use um banco próprio para benchmark "
+            "(ou --forcar)"
+        )
+    pool = criar_pool(minimo=1, maximo=2, database=args.banco, connection_factory=ConexaoMedida)
+    return Database(pool=pool)
+
+
+def gerar(args) -> int:
+    db = _conectar(args)
+    with db.conexao_requisicao():
+        info = gerar_dados(db, args.escala, args.semente)
+    print(f"✅ Dados gerados em '{args.banco}' (escala {args.escala}, semente {args.semente}):")
+    for entidade, quantidade in info['dimensoes'].items():
+        print(f"   {entidade}: {quantidade}")
+    return 0
+
+
+def executar(args) -> int:
+    from routes import Routes
+
+    db = _conectar(args)
+    ctx = ContextoCenarios(db, Routes(db), args.escala, args.semente)
+    print(f"⏱️  {args.iteracoes} iterações por cenário (escala {args.escala})")
+    with db.conexao_requisicao():
+        cenarios = executar_cenarios(ctx, args.cenarios, args.iteracoes, args.aquecimento)
+
+    meta = {'escala': args.escala, 'semente': args.semente, 'iteracoes': args.iteracoes, 'banco': args.banco}
+    documento = {'meta': meta, 'cenarios': cenarios}
+    if args.saida:
+        documento = salvar_resultado(args.saida, cenarios, meta)
+        print(f"💾 Resultado salvo em {args.saida}")
+    if args.comparar:
+        return 1 if imprimir_comparacao(
+            comparar_resultados(carregar_resultado(args.comparar), documento, args.tolerancia)
+        ) else 0
+    return 0
+
+
+def comparar(args) -> int:
+    linhas = comparar_resultados(carregar_resultado(args.base), carregar_resultado(args.atual), args.tolerancia)
+    return 1 if imprimir_comparacao(linhas) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do banco Energia Para Todos")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    def opcoes_banco(p):
+        p.add_argument('--banco', default='energia_bench', help='Banco de benchmark (padrão: energia_bench)')
+        p.add_argument('--forcar', action='store_true', help='Permite usar o banco da aplicação')
+        p.add_argument('--escala', choices=sorted(ESCALAS), default='1k')
+        p.add_argument('--semente', type=int, default=42)
+
+    p_gerar = comandos.add_parser('gerar', help='Apaga e recria os dados sintéticos')
+    opcoes_banco(p_gerar)
+    p_gerar.set_defaults(funcao=gerar)
+
+    p_executar = comandos.add_parser('executar', help='Mede os cenários')
+    opcoes_banco(p_executar)
+    p_executar.add_argument('--iteracoes', type=int, default=100)
+    p_executar.add_argument('--aquecimento', type=int, default=5)
+    p_executar.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=None)
+    p_executar.add_argument('--saida', default=None, help='Arquivo JSON do resultado')
+    p_executar.add_argument('--comparar', default=None, help='Baseline JSON para comparar')
+    p_executar.add_argument('--tolerancia', type=float, default=0.2)
+    p_executar.set_defaults(funcao=executar)
+
+    p_comparar = comandos.add_parser('comparar', help='Compara dois resultados JSON')
+    p_comparar.add_argument('base')
+    p_comparar.add_argument('atual')
+    p_comparar.add_argument('--tolerancia', type=float, default=0.2)
+    p_comparar.set_defaults(funcao=comparar)
+
+    args = parser.parse_args()
+    try:
+        return args.funcao(args)
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
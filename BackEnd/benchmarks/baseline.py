@@ -0,0 +1,93 @@
+"""
+Resultados em JSON (baselines) e comparação entre duas execuções.
+"""
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Uma métrica só é regressão se piorar além da tolerância E deste tanto em ms
+# (evita alarmes em cenários de frações de milissegundo)
+DIFERENCA_MINIMA_MS = 0.5
+METRICAS_TEMPO = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def salvar_resultado(caminho: str, cenarios: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Grava {'meta': ..., 'cenarios': ...} em `caminho` e devolve o documento."""
+    documento = {
+        'meta': {
+            **meta,
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'maquina': platform.node(),
+        },
+        'cenarios': cenarios,
+    }
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return documento
+
+
+def carregar_resultado(caminho: str) -> Dict[str, Any]:
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparar_resultados(
+    base: Dict[str, Any],
+    atual: Dict[str, Any],
+    tolerancia: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Compara duas execuções cenário a cenário.
+
+    Args:
+        base: Documento de referência (salvar_resultado)
+        atual: Documento da execução nova
+        tolerancia: Piora relativa aceita nos percentis (0.2 = 20%)
+
+    Returns:
+        Uma linha por cenário/métrica com base, atual, variação e se é regressão.
+        Mais consultas por chamada é sempre regressão (não depende de ruído).
+    """
+    linhas = []
+    cenarios_base = base.get('cenarios', {})
+    for nome, medido in atual.get('cenarios', {}).items():
+        referencia = cenarios_base.get(nome)
+        if referencia is None:
+            continue
+        for metrica in METRICAS_TEMPO + ('consultas',):
+            antes = float(referencia.get(metrica, 0))
+            depois = float(medido.get(metrica, 0))
+            variacao = (depois - antes) / antes if antes else 0.0
+            if metrica == 'consultas':
+                regressao = depois > antes
+            else:
+                regressao = variacao > tolerancia and depois - antes > DIFERENCA_MINIMA_MS
+            linhas.append({
+                'cenario': nome,
+                'metrica': metrica,
+                'base': antes,
+                'atual': depois,
+                'variacao': round(variacao, 4),
+                'regressao': regressao,
+            })
+    return linhas
+
+
+def imprimir_comparacao(linhas: List[Dict[str, Any]]) -> int:
+    """Mostra a comparação e devolve o número de regressões."""
+    regressoes = 0
+    for linha in linhas:
+        marca = '❌' if linha['regressao'] else '  '
+        regressoes += linha['regressao']
+        print(f"{marca} {linha['cenario']:<26} {linha['metrica']:<10} "
+              f"{linha['base']:>10.2f} -> {linha['atual']:>10.2f} ({linha['variacao']:+.1%})")
+    if regressoes:
+        print(f"❌ {regressoes} regressão(ões) encontrada(s)")
+    else:
+        print("✅ Nenhuma regressão")
+    return regressoes
@@ -0,0 +1,461 @@
+"""
+Gerador de carga HTTP: percorre as jornadas de doador, beneficiário e admin
+contra um servidor em execução (Conexao/server.py) e mede cada rota.
+
+Os usuários são os do banco gerado por `python -m benchmarks gerar` (mesma
+escala). O limite de tentativas de login vale para o gerador de carga como
+para qualquer cliente; para medir capacidade, suba o servidor com limites
+altos, por exemplo:
+    iniciar_servidor(limites_admissao={'capacidade_ip': 1e6, 'taxa_ip': 1e6,
+                                       'capacidade_conta': 1e6, 'taxa_conta': 1e6})
+
+Uso (a partir da pasta BackEnd):
+    python -m benchmarks.carga_http --url http://localhost:8000 --escala 1k \\
+        --concorrencia 16 --duracao 60 [--taxa 20] [--mix doador=6,beneficiario=3,admin=1]
+"""
+import argparse
+import bisect
+import http.client
+import json
+import math
+import queue
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from benchmarks.gerador_dados import EMAIL_ADMIN, ESCALAS, SENHA_PADRAO, dimensoes
+
+# Limites dos baldes do histograma: 0,1 ms a ~2 min, crescendo 10% por balde
+LIMITES_HISTOGRAMA = [0.1 * 1.1 ** k for k in range(int(math.log(1_200_000) / math.log(1.1)) + 1)]
+
+ROTAS_ADMIN = [
+    '/api/admin/metricas',
+    '/api/admin/beneficiarios',
+    '/api/admin/doadores',
+    '/api/admin/creditos',
+    '/api/admin/fila',
+    '/api/admin/logs',
+]
+
+
+class Histograma:
+    """
+    Latências em baldes logarítmicos (erro relativo de até 10% nos percentis),
+    com memória fixa independentemente do número de amostras.
+    """
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES_HISTOGRAMA) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def registrar(self, ms: float) -> None:
+        self.contagens[bisect.bisect_left(LIMITES_HISTOGRAMA, ms)] += 1
+        self.total += 1
+        self.soma += ms
+        self.minimo = min(self.minimo, ms)
+        self.maximo = max(self.maximo, ms)
+
+    def juntar(self, outro: 'Histograma') -> None:
+        for i, n in enumerate(outro.contagens):
+            self.contagens[i] += n
+        self.total += outro.total
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+
+    def percentil(self, p: float) -> float:
+        """Limite superior do balde que contém o percentil p (nunca acima do máximo)."""
+        if not self.total:
+            return 0.0
+        alvo = max(1, math.ceil(p / 100 * self.total))
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                limite = LIMITES_HISTOGRAMA[i] if i < len(LIMITES_HISTOGRAMA) else self.maximo
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def baldes(self) -> List[Tuple[float, int]]:
+        """(limite superior em ms, contagem) dos baldes não vazios."""
+        return [
+            (round(LIMITES_HISTOGRAMA[i], 3) if i < len(LIMITES_HISTOGRAMA) else round(self.maximo, 3), n)
+            for i, n in enumerate(self.contagens) if n
+        ]
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            'requisicoes': self.total,
+            'media_ms': round(self.soma / self.total, 3) if self.total else 0.0,
+            'min_ms': round(self.minimo, 3) if self.total else 0.0,
+            'p50_ms': round(self.percentil(50), 3),
+            'p90_ms': round(self.percentil(90), 3),
+            'p99_ms': round(self.percentil(99), 3),
+            'max_ms': round(self.maximo, 3),
+        }
+
+
+class EstatisticasRota:
+    """Histograma, códigos HTTP e falhas de uma rota (uma instância por thread)."""
+
+    def __init__(self):
+        self.histograma = Histograma()
+        self.status: Counter = Counter()
+        self.erros = 0          # exceção de rede ou HTTP >= 400
+        self.recusadas = 0      # sucesso: false com HTTP 200
+
+    def juntar(self, outra: 'EstatisticasRota') -> None:
+        self.histograma.juntar(outra.histograma)
+        self.status.update(outra.status)
+        self.erros += outra.erros
+        self.recusadas += outra.recusadas
+
+
+class Cliente:
+    """Uma conexão keep-alive com cookies próprios (a sessão de um usuário)."""
+
+    def __init__(self, url: str, estatisticas: Dict[str, EstatisticasRota], timeout: float = 30.0):
+        alvo = urlparse(url)
+        self.host = alvo.hostname or 'localhost'
+        self.porta = alvo.port or 80
+        self.timeout = timeout
+        self.estatisticas = estatisticas
+        self.cookies: Dict[str, str] = {}
+        self._conexao: Optional[http.client.HTTPConnection] = None
+
+    def _conectar(self) -> http.client.HTTPConnection:
+        if self._conexao is None:
+            conexao = http.client.HTTPConnection(self.host, self.porta, timeout=self.timeout)
+            conexao.connect()
+            # Sem Nagle no cliente (como os navegadores): o atraso medido é o do servidor
+            conexao.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._conexao = conexao
+        return self._conexao
+
+    def fechar(self) -> None:
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+    def requisitar(self, metodo: str, caminho: str, dados: Optional[dict] = None) -> Tuple[int, Any]:
+        """
+        Envia a requisição, guarda os cookies e registra a latência da rota.
+
+        Returns:
+            (status HTTP, JSON da resposta ou None); status 0 = erro de rede
+        """
+        rota = f"{metodo} {caminho.split('?', 1)[0]}"
+        estatisticas = self.estatisticas.setdefault(rota, EstatisticasRota())
+        cabecalhos = {'Accept': 'application/json'}
+        corpo = None
+        if dados is not None:
+            corpo = json.dumps(dados).encode('utf-8')
+            cabecalhos['Content-Type'] = 'application/json'
+        if self.cookies:
+            cabecalhos['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+
+        inicio = time.perf_counter()
+        try:
+            conexao = self._conectar()
+            conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            bruto = resposta.read()
+            if resposta.will_close:
+                self.fechar()
+        except (OSError, http.client.HTTPException):
+            estatisticas.histograma.registrar((time.perf_counter() - inicio) * 1000)
+            estatisticas.status['erro_rede'] += 1
+            estatisticas.erros += 1
+            self.fechar()
+            return 0, None
+        estatisticas.histograma.registrar((time.perf_counter() - inicio) * 1000)
+
+        for cabecalho in resposta.headers.get_all('Set-Cookie') or []:
+            for nome, morsel in SimpleCookie(cabecalho).items():
+                self.cookies[nome] = morsel.value
+
+        estatisticas.status[str(resposta.status)] += 1
+        try:
+            conteudo = json.loads(bruto) if bruto else None
+        except ValueError:
+            conteudo = None
+        if resposta.status >= 400:
+            estatisticas.erros += 1
+        elif isinstance(conteudo, dict) and conteudo.get('sucesso') is False:
+            estatisticas.recusadas += 1
+        return resposta.status, conteudo
+
+
+class UsuarioVirtual:
+    """Usuário logado uma vez e reaproveitado pelas jornadas do seu tipo."""
+
+    def __init__(self, cliente: Cliente, tipo: str, email: str):
+        self.cliente = cliente
+        self.tipo = tipo
+        self.email = email
+        self.logado = False
+
+    def garantir_login(self) -> bool:
+        if not self.logado:
+            status, resposta = self.cliente.requisitar(
+                'POST', '/api/login', {'email': self.email, 'password': SENHA_PADRAO}
+            )
+            self.logado = status == 200 and isinstance(resposta, dict) and bool(resposta.get('sucesso'))
+        return self.logado
+
+    def requisitar(self, metodo: str, caminho: str, dados: Optional[dict] = None):
+        status, resposta = self.cliente.requisitar(metodo, caminho, dados)
+        if status in (401, 403):
+            # Sessão expirada/descartada pelo servidor: próximo passo refaz o login
+            self.logado = False
+        return status, resposta
+
+
+def jornada_doador(usuario: UsuarioVirtual, rnd: random.Random) -> None:
+    if not usuario.garantir_login():
+        return
+    usuario.requisitar('GET', '/api/doador/dados')
+    usuario.requisitar('POST', '/api/doador/doar', {'quantidade_kwh': round(rnd.uniform(10, 200), 2)})
+
+
+def jornada_beneficiario(usuario: UsuarioVirtual, rnd: random.Random) -> None:
+    if not usuario.garantir_login():
+        return
+    usuario.requisitar('GET', '/api/beneficiario/dados')
+    usuario.requisitar('POST', '/api/beneficiario/solicitar', {'quantidade_kwh': round(rnd.uniform(50, 300), 2)})
+
+
+def jornada_admin(usuario: UsuarioVirtual, rnd: random.Random) -> None:
+    if not usuario.garantir_login():
+        return
+    for rota in ROTAS_ADMIN:
+        usuario.requisitar('GET', rota)
+    usuario.requisitar('POST', '/api/admin/distribuir', {'limite': 10})
+
+
+JORNADAS = {
+    'doador': jornada_doador,
+    'beneficiario': jornada_beneficiario,
+    'admin': jornada_admin,
+}
+
+
+class GeradorCarga:
+    """
+    Executa jornadas com `concorrencia` threads.
+
+    - taxa=None: laço fechado (cada thread emenda uma jornada na outra,
+      com `pausa` segundos entre elas)
+    - taxa=X: laço aberto, X jornadas/s com chegadas de Poisson; se todas as
+      threads estiverem ocupadas a jornada espera e o atraso é medido
+      (espera_inicio), em vez de a carga simplesmente diminuir
+    """
+
+    def __init__(
+        self,
+        url: str,
+        escala: str = '1k',
+        concorrencia: int = 8,
+        duracao: float = 30.0,
+        taxa: Optional[float] = None,
+        mix: Optional[Dict[str, float]] = None,
+        pausa: float = 0.0,
+        semente: int = 42
+    ):
+        self.url = url
+        self.dim = dimensoes(ESCALAS[escala])
+        self.concorrencia = concorrencia
+        self.duracao = duracao
+        self.taxa = taxa
+        self.mix = mix or {'doador': 6, 'beneficiario': 3, 'admin': 1}
+        self.pausa = pausa
+        self.semente = semente
+
+        self._parar = threading.Event()
+        self._chegadas: 'queue.Queue[Optional[float]]' = queue.Queue()
+        self._por_thread: List[Dict[str, Any]] = []
+
+    def _email(self, tipo: str, rnd: random.Random) -> str:
+        if tipo == 'admin':
+            return EMAIL_ADMIN
+        if tipo == 'doador':
+            id_usuario = 2 + rnd.randrange(self.dim['doadores'])
+        else:
+            id_usuario = 2 + self.dim['doadores'] + rnd.randrange(self.dim['beneficiarios'])
+        return f"usuario{id_usuario}@bench.local"
+
+    def _trabalhador(self, indice: int) -> None:
+        rnd = random.Random(self.semente + indice)
+        estatisticas: Dict[str, EstatisticasRota] = {}
+        jornadas: Counter = Counter()
+        espera = Histograma()
+        usuarios: Dict[str, UsuarioVirtual] = {}
+        tipos = list(self.mix)
+        pesos = [self.mix[t] for t in tipos]
+        self._por_thread.append({'estatisticas': estatisticas, 'jornadas': jornadas, 'espera': espera})
+
+        while not self._parar.is_set():
+            if self.taxa:
+                agendada = self._chegadas.get()
+                if agendada is None:
+                    break
+                espera.registrar(max(0.0, time.perf_counter() - agendada) * 1000)
+            tipo = rnd.choices(tipos, pesos)[0]
+            usuario = usuarios.get(tipo)
+            if usuario is None:
+                usuario = UsuarioVirtual(Cliente(self.url, estatisticas), tipo, self._email(tipo, rnd))
+                usuarios[tipo] = usuario
+            JORNADAS[tipo](usuario, rnd)
+            jornadas[tipo] += 1
+            if not self.taxa and self.pausa:
+                self._parar.wait(self.pausa)
+
+        for usuario in usuarios.values():
+            usuario.cliente.fechar()
+
+    def _agendar_chegadas(self, fim: float) -> None:
+        rnd = random.Random(self.semente - 1)
+        proxima = time.perf_counter()
+        while not self._parar.is_set():
+            proxima += rnd.expovariate(self.taxa)
+            if proxima >= fim:
+                break
+            atraso = proxima - time.perf_counter()
+            if atraso > 0 and self._parar.wait(atraso):
+                break
+            self._chegadas.put(proxima)
+
+    def executar(self) -> Dict[str, Any]:
+        """Roda a carga por `duracao` segundos e devolve o relatório."""
+        inicio = time.perf_counter()
+        fim = inicio + self.duracao
+        threads = [
+            threading.Thread(target=self._trabalhador, args=(i,), daemon=True)
+            for i in range(self.concorrencia)
+        ]
+        for t in threads:
+            t.start()
+
+        if self.taxa:
+            self._agendar_chegadas(fim)
+            # Jornadas já agendadas continuam; depois cada thread recebe o sinal de fim
+            for _ in threads:
+                self._chegadas.put(None)
+        else:
+            time.sleep(max(0.0, fim - time.perf_counter()))
+            self._parar.set()
+        for t in threads:
+            t.join()
+        return self._relatorio(time.perf_counter() - inicio)
+
+    def _relatorio(self, decorrido: float) -> Dict[str, Any]:
+        rotas: Dict[str, EstatisticasRota] = {}
+        jornadas: Counter = Counter()
+        espera = Histograma()
+        for dados in self._por_thread:
+            for rota, est in dados['estatisticas'].items():
+                rotas.setdefault(rota, EstatisticasRota()).juntar(est)
+            jornadas.update(dados['jornadas'])
+            espera.juntar(dados['espera'])
+
+        total = sum(est.histograma.total for est in rotas.values())
+        erros = sum(est.erros for est in rotas.values())
+        return {
+            'meta': {
+                'url': self.url,
+                'concorrencia': self.concorrencia,
+                'duracao_s': round(decorrido, 3),
+                'taxa_alvo': self.taxa,
+                'mix': self.mix,
+                'semente': self.semente,
+            },
+            'total': {
+                'requisicoes': total,
+                'requisicoes_por_s': round(total / decorrido, 2) if decorrido else 0.0,
+                'jornadas': dict(jornadas),
+                'jornadas_por_s': round(sum(jornadas.values()) / decorrido, 2) if decorrido else 0.0,
+                'erros': erros,
+                'taxa_erros': round(erros / total, 4) if total else 0.0,
+                'espera_inicio': espera.resumo() if self.taxa else None,
+            },
+            'rotas': {
+                rota: {
+                    **est.histograma.resumo(),
+                    'requisicoes_por_s': round(est.histograma.total / decorrido, 2) if decorrido else 0.0,
+                    'erros': est.erros,
+                    'recusadas': est.recusadas,
+                    'status': dict(est.status),
+                    'histograma': est.histograma.baldes(),
+                }
+                for rota, est in sorted(rotas.items())
+            },
+        }
+
+
+def imprimir_relatorio(relatorio: Dict[str, Any], histogramas: bool = False) -> None:
+    total = relatorio['total']
+    print(f"\n{total['requisicoes']} requisições em {relatorio['meta']['duracao_s']}s "
+          f"({total['requisicoes_por_s']} req/s, {total['jornadas_por_s']} jornadas/s), "
+          f"erros: {total['erros']} ({total['taxa_erros']:.2%})")
+    if total['espera_inicio']:
+        e = total['espera_inicio']
+        print(f"Espera para iniciar jornada: p50={e['p50_ms']}ms p99={e['p99_ms']}ms max={e['max_ms']}ms")
+    print(f"\n{'rota':<36} {'n':>7} {'req/s':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'erros':>6} {'recus.':>6}")
+    for rota, r in relatorio['rotas'].items():
+        print(f"{rota:<36} {r['requisicoes']:>7} {r['requisicoes_por_s']:>8} {r['p50_ms']:>9.1f} "
+              f"{r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f} {r['erros']:>6} {r['recusadas']:>6}")
+        if histogramas:
+            maior = max((n for _, n in r['histograma']), default=1)
+            for limite, n in r['histograma']:
+                print(f"    <= {limite:>10.1f}ms {n:>7} {'#' * max(1, round(40 * n / maior))}")
+
+
+def _ler_mix(texto: str) -> Dict[str, float]:
+    mix = {}
+    for parte in texto.split(','):
+        tipo, _, peso = parte.partition('=')
+        tipo = tipo.strip()
+        if tipo not in JORNADAS:
+            raise argparse.ArgumentTypeError(f"Jornada desconhecida: {tipo}")
+        mix[tipo] = float(peso or 1)
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Carga HTTP no servidor Energia Para Todos")
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--escala', choices=sorted(ESCALAS), default='1k', help='Escala usada no gerar')
+    parser.add_argument('--concorrencia', type=int, default=8, help='Threads (usuários simultâneos)')
+    parser.add_argument('--duracao', type=float, default=30.0, help='Segundos de carga')
+    parser.add_argument('--taxa', type=float, default=None, help='Jornadas/s (laço aberto); omitido = laço fechado')
+    parser.add_argument('--pausa', type=float, default=0.0, help='Pausa entre jornadas no laço fechado (s)')
+    parser.add_argument('--mix', type=_ler_mix, default=None, help='Pesos das jornadas, ex.: doador=6,beneficiario=3,admin=1')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--histogramas', action='store_true', help='Mostra o histograma de cada rota')
+    parser.add_argument('--saida', default=None, help='Grava o relatório em JSON')
+    args = parser.parse_args()
+
+    gerador = GeradorCarga(args.url, args.escala, args.concorrencia, args.duracao,
+                           args.taxa, args.mix, args.pausa, args.semente)
+    modo = f"{args.taxa} jornadas/s" if args.taxa else "laço fechado"
+    print(f"🚀 Carga em {args.url}: {args.concorrencia} threads, {args.duracao}s, {modo}")
+    relatorio = gerador.executar()
+    imprimir_relatorio(relatorio, args.histogramas)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+        print(f"💾 Relatório salvo em {args.saida}")
+    return 1 if relatorio['total']['erros'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Cenários medidos: os métodos quentes de Database e Routes, chamados como o
+servidor chama (Routes com a sessão do usuário sorteado).
+"""
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.gerador_dados import EMAIL_ADMIN, ESCALAS, SENHA_PADRAO, dimensoes
+
+# (operação, limpeza fora da medição)
+Preparado = Tuple[Callable[[], Any], Optional[Callable[[Any], None]]]
+
+
+class ContextoCenarios:
+    """Database, Routes e os ids existentes no banco gerado (mesma escala do gerar)."""
+
+    def __init__(self, db, routes, escala: str = '1k', semente: int = 42):
+        self.db = db
+        self.routes = routes
+        self.rnd = random.Random(semente)
+        self.dim = dimensoes(ESCALAS[escala])
+
+    def usuario_doador(self) -> Tuple[int, int]:
+        """(id_usuario, id_doador) sorteados (mesma ordem do gerador)."""
+        i = self.rnd.randrange(self.dim['doadores'])
+        return 2 + i, i + 1
+
+    def usuario_beneficiario(self, na_fila: bool = True) -> Tuple[int, int]:
+        """(id_usuario, id_beneficiario); na_fila=False sorteia da reserva."""
+        total = self.dim['beneficiarios']
+        reserva = self.dim['reserva_fila']
+        if na_fila:
+            i = self.rnd.randrange(total - reserva)
+        else:
+            i = total - reserva + self.rnd.randrange(reserva)
+        return 2 + self.dim['doadores'] + i, i + 1
+
+    def definir_sessao(self, **dados) -> None:
+        self.routes.sessao = dados
+
+
+def _validar_login(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        id_usuario, _ = ctx.usuario_doador()
+        return ctx.db.validar_login(f"usuario{id_usuario}@bench.local", SENHA_PADRAO)
+    return operacao, None
+
+
+def _entrar_na_fila(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        _, id_beneficiario = ctx.usuario_beneficiario(na_fila=False)
+        return ctx.db.entrar_na_fila(id_beneficiario, 1500.0, 180.0, 3)
+
+    def depois(id_fila):
+        # Devolve o beneficiário à reserva: a próxima rodada mede o mesmo caminho
+        ctx.db.executar("DELETE FROM fila_espera WHERE id_fila = %s", (id_fila,))
+        ctx.db.posicoes_fila.remover(id_fila)
+    return operacao, depois
+
+
+def _executar_distribuicao(ctx: ContextoCenarios) -> Preparado:
+    return (lambda: ctx.db.executar_distribuicao(limite=10)), None
+
+
+def _distribuir_credito_incremental(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        # Caminho de uma doação: crédito novo distribuído sozinho
+        _, id_doador = ctx.usuario_doador()
+        id_credito = ctx.db.criar_credito(id_doador=id_doador, quantidade_kwh=500.0)
+        return ctx.db.distribuir_credito_incremental(id_credito, limite=10)
+    return operacao, None
+
+
+def _obter_dados_beneficiario(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        id_usuario, id_beneficiario = ctx.usuario_beneficiario()
+        ctx.definir_sessao(usuario_id=id_usuario, tipo='BENEFICIARIO', id_beneficiario=id_beneficiario)
+        return ctx.routes.obter_dados_beneficiario()
+    return operacao, None
+
+
+def _obter_dados_doador(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        id_usuario, id_doador = ctx.usuario_doador()
+        ctx.definir_sessao(usuario_id=id_usuario, tipo='DOADOR', id_doador=id_doador)
+        return ctx.routes.obter_dados_doador()
+    return operacao, None
+
+
+def _obter_metricas_admin(ctx: ContextoCenarios) -> Preparado:
+    def operacao():
+        ctx.definir_sessao(usuario_id=1, tipo='ADMINISTRADOR', email=EMAIL_ADMIN)
+        return ctx.routes.obter_metricas_admin()
+    return operacao, None
+
+
+def _listar_usuarios(ctx: ContextoCenarios) -> Preparado:
+    return (lambda: ctx.db.listar_usuarios(limite=100)), None
+
+
+# Ordem de execução: leituras primeiro; as distribuições por último,
+# porque consomem créditos e fila (gere os dados de novo antes de gravar baseline)
+CENARIOS: Dict[str, Callable[[ContextoCenarios], Preparado]] = {
+    'validar_login': _validar_login,
+    'obter_dados_beneficiario': _obter_dados_beneficiario,
+    'obter_dados_doador': _obter_dados_doador,
+    'obter_metricas_admin': _obter_metricas_admin,
+    'listar_usuarios': _listar_usuarios,
+    'entrar_na_fila': _entrar_na_fila,
+    'distribuir_credito_incremental': _distribuir_credito_incremental,
+    'executar_distribuicao': _executar_distribuicao,
+}
+
+
+def executar_cenarios(
+    ctx: ContextoCenarios,
+    nomes: Optional[List[str]] = None,
+    iteracoes: int = 100,
+    aquecimento: int = 5
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Mede os cenários escolhidos (todos, por padrão) na ordem de CENARIOS.
+
+    Returns:
+        nome -> resumo de medicao.medir()
+    """
+    from benchmarks.medicao import medir
+
+    resultados = {}
+    for nome, preparar in CENARIOS.items():
+        if nomes and nome not in nomes:
+            continue
+        operacao, depois = preparar(ctx)
+        resultados[nome] = medir(operacao, iteracoes=iteracoes, aquecimento=aquecimento, depois=depois)
+        r = resultados[nome]
+        print(f"  {nome:<26} p50={r['p50_ms']:>9.2f}ms p95={r['p95_ms']:>9.2f}ms "
+              f"p99={r['p99_ms']:>9.2f}ms consultas={r['consultas']:>6} linhas={r['linhas']}")
+    return resultados
@@ -0,0 +1,253 @@
+"""
+Gerador de dados sintéticos para os benchmarks.
+
+Mesma semente e escala produzem sempre as mesmas linhas (ids explícitos,
+random.Random próprio), gravadas com COPY. APAGA os dados das tabelas
+principais do banco informado: use um banco só para benchmark, criado com
+script_banco.sql.
+"""
+import io
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Usuários totais por escala; as demais tabelas são proporcionais
+ESCALAS = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+SENHA_PADRAO = 'bench123'
+EMAIL_ADMIN = 'admin@bench.local'
+# Data fixa: a mesma semente gera as mesmas datas em qualquer dia
+DATA_BASE = datetime(2025, 1, 1)
+LINHAS_POR_COPY = 50_000
+
+TABELAS_DADOS = [
+    'log_auditoria', 'historico_credito', 'transacao', 'fila_espera',
+    'doador_beneficiario_atendido', 'doador_agregado', 'credito',
+    'beneficiario', 'renda_beneficiario', 'consumo_beneficiario',
+    'doador', 'usuario', 'credencial_usuario',
+]
+
+SEQUENCIAS = [
+    ('credencial_usuario', 'id_credencial'), ('usuario', 'id_usuario'),
+    ('doador', 'id_doador'), ('renda_beneficiario', 'id_renda'),
+    ('consumo_beneficiario', 'id_consumo'), ('beneficiario', 'id_beneficiario'),
+    ('credito', 'id_credito'), ('transacao', 'id_transacao'),
+    ('historico_credito', 'id_historico'), ('fila_espera', 'id_fila'),
+    ('log_auditoria', 'id_log'),
+]
+
+
+def dimensoes(total_usuarios: int) -> Dict[str, int]:
+    """Quantidade de linhas de cada entidade para um total de usuários."""
+    doadores = max(1, total_usuarios // 5)
+    beneficiarios = max(1, total_usuarios - doadores - 1)
+    return {
+        'usuarios': doadores + beneficiarios + 1,
+        'doadores': doadores,
+        'beneficiarios': beneficiarios,
+        'creditos': doadores * 3,
+        # Beneficiários sem entrada na fila, usados pelo cenário entrar_na_fila
+        'reserva_fila': max(1, min(beneficiarios // 10, 1_000)),
+        'transacoes': beneficiarios // 2,
+        'logs': total_usuarios * 2,
+    }
+
+
+def _valor_copy(valor: Any) -> str:
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    texto = str(valor)
+    return texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+def copiar(cursor, tabela: str, colunas: Sequence[str], linhas: Iterable[Sequence[Any]]) -> int:
+    """Grava as linhas com COPY FROM STDIN em blocos de LINHAS_POR_COPY."""
+    comando = f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN"
+    total = 0
+    buffer = io.StringIO()
+    pendentes = 0
+    for linha in linhas:
+        buffer.write('\t'.join(_valor_copy(v) for v in linha))
+        buffer.write('\n')
+        pendentes += 1
+        if pendentes >= LINHAS_POR_COPY:
+            buffer.seek(0)
+            cursor.copy_expert(comando, buffer)
+            total += pendentes
+            buffer = io.StringIO()
+            pendentes = 0
+    if pendentes:
+        buffer.seek(0)
+        cursor.copy_expert(comando, buffer)
+        total += pendentes
+    return total
+
+
+def _prioridade(renda: float) -> int:
+    # Mesma fórmula de Database.entrar_na_fila
+    return max(int(10000 - renda), 1000) if renda > 0 else 1000
+
+
+def gerar_dados(db, escala: str = '1k', semente: int = 42) -> Dict[str, Any]:
+    """
+    Recria os dados sintéticos (doadores, beneficiários, créditos, fila,
+    transações e logs) e atualiza estatísticas/agregados.
+
+    Args:
+        db: Database conectado ao banco de benchmark
+        escala: Chave de ESCALAS
+        semente: Semente do gerador (mesma semente = mesmos dados)
+
+    Returns:
+        Dimensões geradas, semente e escala (gravados junto com os resultados)
+    """
+    rnd = random.Random(semente)
+    dim = dimensoes(ESCALAS[escala])
+    dom = db.dominios
+    ids = {
+        'tipo_doador': dom.obter_id('tipo_usuario', 'DOADOR', padrao=1),
+        'tipo_benef': dom.obter_id('tipo_usuario', 'BENEFICIARIO', padrao=2),
+        'tipo_admin': dom.obter_id('tipo_usuario', 'ADMINISTRADOR', padrao=3),
+        'ativo': dom.obter_id('status', 'ATIVO', padrao=1),
+        'pessoa_fisica': dom.obter_id('classificacao_doador', 'PESSOA_FISICA', padrao=1),
+        'benef_aprovado': dom.obter_id('status_beneficiario', 'APROVADO', padrao=1),
+        'credito_disponivel': dom.obter_id('status_credito', 'DISPONIVEL', padrao=1),
+        'credito_parcial': dom.obter_id('status_credito', 'PARCIALMENTE_UTILIZADO', padrao=2),
+        'credito_esgotado': dom.obter_id('status_credito', 'ESGOTADO', padrao=3),
+        'fila_aguardando': dom.obter_id('status_fila', 'AGUARDANDO', padrao=1),
+        'fila_atendido': dom.obter_id('status_fila', 'ATENDIDO', padrao=3),
+        'transacao_concluida': dom.obter_id('status_transacao', 'CONCLUIDA', padrao=1),
+        'mov_distribuicao': dom.obter_id('tipo_movimento', 'DISTRIBUICAO', padrao=1),
+        'status_log': dom.obter_id('status_log', 'SUCESSO', padrao=1),
+        'acoes': [dom.obter_id('tipo_acao', a, padrao=1) for a in ('LOGIN', 'LOGOUT', 'DOACAO', 'CADASTRO')],
+    }
+
+    n_doadores = dim['doadores']
+    n_benef = dim['beneficiarios']
+    n_usuarios = dim['usuarios']
+    n_creditos = dim['creditos']
+    n_fila = n_benef - dim['reserva_fila']
+
+    # Usuário 1 = admin; depois doadores; depois beneficiários
+    def id_usuario_doador(i: int) -> int:
+        return 2 + i
+
+    def id_usuario_benef(i: int) -> int:
+        return 2 + n_doadores + i
+
+    db._set_autocommit_safe(False)
+    try:
+        cursor = db.conn.cursor()
+        cursor.execute(f"TRUNCATE {', '.join(TABELAS_DADOS)} RESTART IDENTITY CASCADE")
+
+        # Um único hash bcrypt: todos os usuários entram com SENHA_PADRAO
+        cursor.execute("SELECT crypt(%s, gen_salt('bf')), gen_salt('bf')", (SENHA_PADRAO,))
+        senha_hash, senha_salt = cursor.fetchone()
+
+        def email(id_usuario: int) -> str:
+            return EMAIL_ADMIN if id_usuario == 1 else f"usuario{id_usuario}@bench.local"
+
+        copiar(cursor, 'credencial_usuario',
+               ('id_credencial', 'login', 'senha_hash', 'senha_salt', 'data_ultimo_login'),
+               ((i, email(i), senha_hash, senha_salt, DATA_BASE + timedelta(minutes=rnd.randrange(525_600)))
+                for i in range(1, n_usuarios + 1)))
+
+        def tipo(id_usuario: int) -> int:
+            if id_usuario == 1:
+                return ids['tipo_admin']
+            return ids['tipo_doador'] if id_usuario <= 1 + n_doadores else ids['tipo_benef']
+
+        copiar(cursor, 'usuario',
+               ('id_usuario', 'nome', 'email', 'cep', 'id_tipo', 'id_status', 'id_credencial'),
+               ((i, f"Usuário {i}", email(i), f"{rnd.randrange(100_000_000):08d}", tipo(i), ids['ativo'], i)
+                for i in range(1, n_usuarios + 1)))
+
+        copiar(cursor, 'doador',
+               ('id_doador', 'data_cadastro', 'id_usuario', 'id_classificacao'),
+               ((i + 1, (DATA_BASE - timedelta(days=rnd.randrange(730))).date(), id_usuario_doador(i),
+                 ids['pessoa_fisica'])
+                for i in range(n_doadores)))
+
+        rendas = [round(rnd.uniform(300, 6000), 2) for _ in range(n_benef)]
+        consumos = [round(rnd.uniform(80, 400), 2) for _ in range(n_benef)]
+        moradores = [rnd.randint(1, 8) for _ in range(n_benef)]
+        copiar(cursor, 'renda_beneficiario', ('id_renda', 'valor_renda'),
+               ((i + 1, rendas[i]) for i in range(n_benef)))
+        copiar(cursor, 'consumo_beneficiario', ('id_consumo', 'media_kwh'),
+               ((i + 1, consumos[i]) for i in range(n_benef)))
+        copiar(cursor, 'beneficiario',
+               ('id_beneficiario', 'num_moradores', 'id_usuario', 'id_renda', 'id_consumo', 'id_status_beneficiario'),
+               ((i + 1, moradores[i], id_usuario_benef(i), i + 1, i + 1, ids['benef_aprovado'])
+                for i in range(n_benef)))
+
+        # Créditos: 1/3 já consumidos, o resto disponível (parte parcialmente)
+        def creditos() -> Iterator[List[Any]]:
+            for i in range(n_creditos):
+                inicial = round(rnd.uniform(10, 500), 2)
+                sorteio = rnd.random()
+                if sorteio < 0.33:
+                    disponivel, status = 0, ids['credito_esgotado']
+                elif sorteio < 0.5:
+                    disponivel, status = round(inicial * rnd.uniform(0.1, 0.9), 2), ids['credito_parcial']
+                else:
+                    disponivel, status = inicial, ids['credito_disponivel']
+                expira = (DATA_BASE + timedelta(days=365 + rnd.randrange(730))).date()
+                yield [i + 1, disponivel, inicial, expira, rnd.randrange(n_doadores) + 1, status]
+
+        copiar(cursor, 'credito',
+               ('id_credito', 'quantidade_disponivel_kwh', 'quantidade_inicial_kwh', 'data_expiracao',
+                'id_doador', 'id_status_credito'),
+               creditos())
+        copiar(cursor, 'historico_credito', ('id_historico', 'quantidade_kwh', 'data_movimento', 'id_credito'),
+               ((i + 1, round(rnd.uniform(10, 500), 2), DATA_BASE.date(), i + 1) for i in range(n_creditos)))
+
+        # Transações antes da fila: o gatilho trg_atualizar_fila não encontra
+        # entradas AGUARDANDO para atualizar durante a carga
+        copiar(cursor, 'transacao',
+               ('id_transacao', 'quantidade_kwh', 'data_transacao', 'id_beneficiario', 'id_status_transacao',
+                'id_tipo_movimentacao', 'id_credito'),
+               ((i + 1, round(rnd.uniform(5, 200), 2), (DATA_BASE + timedelta(days=rnd.randrange(365))).date(),
+                 rnd.randrange(n_fila) + 1, ids['transacao_concluida'], ids['mov_distribuicao'],
+                 rnd.randrange(n_creditos) + 1)
+                for i in range(dim['transacoes'])))
+
+        # Fila: os primeiros n_fila beneficiários (metade já atendida); os da reserva ficam de fora
+        copiar(cursor, 'fila_espera',
+               ('id_fila', 'id_beneficiario', 'data_entrada', 'prioridade', 'id_status_fila',
+                'renda_familiar', 'consumo_medio_kwh', 'num_moradores', 'tempo_espera_dias'),
+               ((i + 1, i + 1, DATA_BASE + timedelta(minutes=rnd.randrange(525_600)), _prioridade(rendas[i]),
+                 ids['fila_aguardando'] if rnd.random() < 0.5 else ids['fila_atendido'],
+                 rendas[i], consumos[i], moradores[i], 0)
+                for i in range(n_fila)))
+
+        copiar(cursor, 'log_auditoria',
+               ('id_log', 'ip_acesso', 'data_hora', 'detalhes', 'id_usuario', 'id_tipo_acao', 'id_status_log'),
+               ((i + 1, f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(256)}",
+                 DATA_BASE + timedelta(seconds=rnd.randrange(31_536_000)), 'benchmark',
+                 rnd.randrange(n_usuarios) + 1, rnd.choice(ids['acoes']), ids['status_log'])
+                for i in range(dim['logs'])))
+
+        for tabela, coluna in SEQUENCIAS:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{tabela}', '{coluna}'), "
+                f"COALESCE((SELECT MAX({coluna}) FROM {tabela}), 0) + 1, false)"
+            )
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        raise
+    finally:
+        db._set_autocommit_safe(True)
+
+    db.reconstruir_agregados_doador()
+    cursor = db.conn.cursor()
+    cursor.execute("ANALYZE")
+    db.posicoes_fila.invalidar()
+
+    return {'escala': escala, 'semente': semente, 'dimensoes': dim}
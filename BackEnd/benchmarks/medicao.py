@@ -0,0 +1,130 @@
+"""
+Medição dos cenários: tempo por chamada, consultas enviadas ao banco e
+linhas lidas/alteradas, contadas na própria conexão psycopg2.
+"""
+import contextlib
+import io
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from psycopg2 import extensions
+
+
+class ContadorConsultas:
+    """Consultas executadas e linhas (rowcount) desde o último zerar()."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.linhas = 0
+
+    def zerar(self) -> None:
+        self.consultas = 0
+        self.linhas = 0
+
+    def registrar(self, cursor) -> None:
+        self.consultas += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            self.linhas += cursor.rowcount
+
+
+# Os benchmarks rodam em uma thread só; um contador para o processo basta
+CONTADOR = ContadorConsultas()
+
+_CURSORES_MEDIDOS: Dict[type, type] = {}
+
+
+def _cursor_medido(classe: type) -> type:
+    """Subclasse do cursor que conta cada execute() no CONTADOR."""
+    medido = _CURSORES_MEDIDOS.get(classe)
+    if medido is None:
+        def execute(self, query, vars=None):
+            try:
+                return classe.execute(self, query, vars)
+            finally:
+                CONTADOR.registrar(self)
+
+        def executemany(self, query, vars_list):
+            try:
+                return classe.executemany(self, query, vars_list)
+            finally:
+                CONTADOR.registrar(self)
+
+        medido = type(f"{classe.__name__}Medido", (classe,), {'execute': execute, 'executemany': executemany})
+        _CURSORES_MEDIDOS[classe] = medido
+    return medido
+
+
+class ConexaoMedida(extensions.connection):
+    """
+    Conexão cujos cursores (inclusive RealDictCursor e cursores nomeados)
+    contam as consultas. Use como connection_factory do pool:
+    criar_pool(connection_factory=ConexaoMedida).
+    """
+
+    def cursor(self, *args, **kwargs):
+        fabrica = kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+        kwargs['cursor_factory'] = _cursor_medido(fabrica)
+        return super().cursor(*args, **kwargs)
+
+
+def percentil(valores_ordenados: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank (valores já ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    posicao = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[posicao - 1]
+
+
+def medir(
+    operacao: Callable[[], Any],
+    iteracoes: int = 100,
+    aquecimento: int = 5,
+    depois: Optional[Callable[[Any], None]] = None
+) -> Dict[str, Any]:
+    """
+    Executa a operação várias vezes e resume tempos e consultas.
+
+    Args:
+        operacao: Função sem argumentos (uma chamada = uma amostra)
+        iteracoes: Amostras medidas
+        aquecimento: Chamadas descartadas antes (PREPARE, caches, páginas do banco)
+        depois: Limpeza fora da medição, recebe o retorno da operação
+
+    Returns:
+        dict com p50/p95/p99/media/max em ms, consultas e linhas por chamada
+    """
+    tempos: List[float] = []
+    consultas: List[int] = []
+    linhas: List[int] = []
+
+    # As rotas imprimem bastante; o terminal não entra na medição
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        for i in range(aquecimento + iteracoes):
+            CONTADOR.zerar()
+            inicio = time.perf_counter()
+            retorno = operacao()
+            duracao = (time.perf_counter() - inicio) * 1000
+            amostra = (CONTADOR.consultas, CONTADOR.linhas)
+            if depois is not None:
+                depois(retorno)
+            if i >= aquecimento:
+                tempos.append(duracao)
+                consultas.append(amostra[0])
+                linhas.append(amostra[1])
+            saida.seek(0)
+            saida.truncate()
+
+    tempos.sort()
+    n = len(tempos) or 1
+    return {
+        'iteracoes': len(tempos),
+        'p50_ms': round(percentil(tempos, 50), 3),
+        'p95_ms': round(percentil(tempos, 95), 3),
+        'p99_ms': round(percentil(tempos, 99), 3),
+        'media_ms': round(sum(tempos) / n, 3),
+        'max_ms': round(tempos[-1], 3) if tempos else 0.0,
+        'consultas': round(sum(consultas) / n, 2),
+        'consultas_max': max(consultas) if consultas else 0,
+        'linhas': round(sum(linhas) / n, 2),
+    }
@@ -1,50 +1,550 @@
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
 from datetime import datetime, date
 from typing import Optional, List, Dict, Any, Set, Tuple
 from psycopg2 import extensions
 
+from utils.pool_conexoes import PoolConexoes
+from utils.cache_dominios import CacheDominios
+from utils.custo_banco import CursorMedido
+from utils.escritor_auditoria import EscritorAuditoria
+from utils.eventos import BarramentoEventos, TipoEvento
+from utils.instrucoes_preparadas import RegistroInstrucoes
+from utils.perfilador_sql import PerfiladorSQL
+from utils.paginacao import chave_cursor, decodificar_cursor, montar_pagina
+from utils.logger_auditoria import LoggerAuditoria
+from services.agendador_distribuicao import AgendadorDistribuicao
+from services.posicao_fila import IndicePosicaoFila
+
+# Parâmetros de conexão usados pelo modo direto e pelos pools criados via criar_pool()
+CONFIG_CONEXAO = {
+    'host': "localhost",
+    'database': "energia_db",
+    'user': "postgres",
+    'password': "senha123",
+    'port': "5432"
+}
+
+
+def criar_pool(minimo: int = 2, maximo: int = 10, **kwargs) -> PoolConexoes:
+    """
+    Cria um pool de conexões com a configuração padrão do banco.
+    Parâmetros extras (timeout, verificar_apos, database...) sobrescrevem os padrões.
+    """
+    parametros = {**CONFIG_CONEXAO, **kwargs}
+    return PoolConexoes(minimo=minimo, maximo=maximo, **parametros)
+
+
+def _numeric_float(valor, cursor):
+    return float(valor) if valor is not None else None
+
+
+def _iso(base):
+    def converter(valor, cursor):
+        resultado = base(valor, cursor)
+        return resultado.isoformat() if resultado is not None else None
+    return converter
+
+
+# NUMERIC como float e DATE/TIMESTAMP como string ISO (os mesmos tipos que
+# processar_resultado produzia reconstruindo cada dict depois do fetch)
+CONVERSORES_TIPOS = [extensions.new_type(extensions.DECIMAL.values, 'NUMERIC_FLOAT', _numeric_float)] + [
+    extensions.new_type(base.values, f'{base.name}_ISO', _iso(base))
+    for base in (extensions.PYDATE, extensions.PYDATETIME, getattr(extensions, 'PYDATETIMETZ', None))
+    if base is not None
+]
+
+
+def registrar_conversores_tipos(conn) -> None:
+    """
+    Aplica CONVERSORES_TIPOS só nesta conexão (as usadas pelo Database).
+    As demais conexões do processo (sessões, admissão, scripts) continuam
+    recebendo Decimal/date/datetime do psycopg2.
+    """
+    for conversor in CONVERSORES_TIPOS:
+        extensions.register_type(conversor, conn)
+
+
+# Consultas quentes preparadas no servidor (PREPARE uma vez por conexão)
+INSTRUCOES = RegistroInstrucoes()
+
+INSTRUCOES.registrar('validar_login', """
+    SELECT 
+        u.id_usuario, 
+        u.nome, 
+        u.email,
+        tu.descricao_tipo as tipo_usuario,
+        s.descricao_status as status
+    FROM usuario u
+    JOIN credencial_usuario c ON u.id_credencial = c.id_credencial
+    JOIN tipo_usuario tu ON u.id_tipo = tu.id_tipo
+    JOIN status s ON u.id_status = s.id_status
+    WHERE c.login = $1
+    AND c.senha_hash = crypt($2, c.senha_hash)
+    AND s.descricao_status = 'ATIVO'
+""")
+
+_SELECT_CREDITOS = """
+    SELECT 
+        c.id_credito,
+        c.quantidade_disponivel_kwh,
+        c.data_expiracao,
+        c.id_doador,
+        sc.descricao_status AS status,
+        d.data_cadastro,
+        u.nome AS nome_doador,
+        u.email AS email_doador
+    FROM credito c
+    JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
+    JOIN doador d ON c.id_doador = d.id_doador
+    JOIN usuario u ON d.id_usuario = u.id_usuario
+"""
+# Paginação por chave (id_credito DESC): "depois de" $1 avança, "antes de" volta
+INSTRUCOES.registrar('listar_creditos', _SELECT_CREDITOS + """
+    WHERE c.id_credito < $1
+    ORDER BY c.id_credito DESC LIMIT $2
+""")
+INSTRUCOES.registrar('listar_creditos_antes', _SELECT_CREDITOS + """
+    WHERE c.id_credito > $1
+    ORDER BY c.id_credito ASC LIMIT $2
+""")
+INSTRUCOES.registrar('listar_creditos_doador', _SELECT_CREDITOS + """
+    WHERE c.id_doador = $1 AND c.id_credito < $2
+    ORDER BY c.id_credito DESC LIMIT $3
+""")
+INSTRUCOES.registrar('listar_creditos_doador_antes', _SELECT_CREDITOS + """
+    WHERE c.id_doador = $1 AND c.id_credito > $2
+    ORDER BY c.id_credito ASC LIMIT $3
+""")
+ORDENACAO_CREDITOS = [('c.id_credito', 'id_credito', 'DESC')]
+
+INSTRUCOES.registrar('listar_fila_detalhes', """
+    SELECT 
+        f.id_fila,
+        f.id_beneficiario,
+        b.id_usuario,
+        u.nome,
+        u.email,
+        f.prioridade,
+        f.data_entrada,
+        f.renda_familiar,
+        f.consumo_medio_kwh,
+        f.num_moradores,
+        f.tempo_espera_dias,
+        EXTRACT(DAY FROM NOW() - f.data_entrada) AS dias_na_fila,
+        sf.descricao_status_fila
+    FROM fila_espera f
+    JOIN beneficiario b ON f.id_beneficiario = b.id_beneficiario
+    JOIN usuario u ON b.id_usuario = u.id_usuario
+    JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+    WHERE f.id_fila = ANY($1::int[])
+        AND sf.descricao_status_fila = 'AGUARDANDO'
+""")
+
+# Distribuição: créditos ainda utilizáveis e topo da fila (ambos travados pelo chamador)
+_SELECT_CREDITOS_DISPONIVEIS = """
+    SELECT c.id_credito, c.id_doador, c.quantidade_disponivel_kwh, c.data_expiracao
+    FROM credito c
+    JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
+    WHERE sc.descricao_status IN ('DISPONIVEL', 'PARCIALMENTE_UTILIZADO')
+        AND c.quantidade_disponivel_kwh > 0
+        AND (c.data_expiracao IS NULL OR c.data_expiracao > CURRENT_DATE)
+"""
+# Prefixo de créditos (na ordem de consumo) cujo saldo acumulado antes de
+# cada um ainda não cobre %s kWh: o último incluído completa a demanda.
+# tamanho_prefixo conta as linhas do prefixo antes do SKIP LOCKED, para o
+# chamador saber se alguma foi pulada por estar travada
+_SELECT_PREFIXO_CREDITOS = """
+    WITH acumulado AS (
+        SELECT c2.id_credito,
+            SUM(c2.quantidade_disponivel_kwh) OVER (
+                ORDER BY c2.data_expiracao NULLS LAST, c2.id_credito
+            ) - c2.quantidade_disponivel_kwh AS acumulado_antes
+        FROM credito c2
+        JOIN status_credito sc2 ON c2.id_status_credito = sc2.id_status_credito
+        WHERE sc2.descricao_status IN ('DISPONIVEL', 'PARCIALMENTE_UTILIZADO')
+            AND c2.quantidade_disponivel_kwh > 0
+            AND (c2.data_expiracao IS NULL OR c2.data_expiracao > CURRENT_DATE)
+    ),
+    prefixo AS (
+        SELECT id_credito, COUNT(*) OVER () AS tamanho_prefixo
+        FROM acumulado
+        WHERE acumulado_antes < %s::numeric
+    )
+    SELECT c.id_credito, c.id_doador, c.quantidade_disponivel_kwh, c.data_expiracao,
+        p.tamanho_prefixo
+    FROM credito c
+    JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
+    JOIN prefixo p ON p.id_credito = c.id_credito
+    WHERE sc.descricao_status IN ('DISPONIVEL', 'PARCIALMENTE_UTILIZADO')
+        AND c.quantidade_disponivel_kwh > 0
+        AND (c.data_expiracao IS NULL OR c.data_expiracao > CURRENT_DATE)
+"""
+_ORDEM_CREDITOS_TRAVA = """
+    ORDER BY c.data_expiracao NULLS LAST, c.id_credito
+    FOR UPDATE OF c SKIP LOCKED
+"""
+_SELECT_TOPO_FILA = """
+    SELECT f.id_fila, f.id_beneficiario, f.prioridade, f.consumo_medio_kwh,
+        u.nome, u.email
+    FROM fila_espera f
+    JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+    JOIN beneficiario b ON f.id_beneficiario = b.id_beneficiario
+    JOIN usuario u ON b.id_usuario = u.id_usuario
+    WHERE sf.descricao_status_fila = 'AGUARDANDO'
+    ORDER BY f.prioridade DESC, f.data_entrada ASC
+    LIMIT %s
+    FOR UPDATE OF f SKIP LOCKED
+"""
+
+
 class Database:
     """
     Classe de conexão e operações com PostgreSQL.
+
+    Modos de operação:
+    - Direto (padrão): uma conexão e um cursor próprios, como sempre foi.
+    - Pool: Database(pool=criar_pool(...)). Cada thread empresta uma conexão
+      do pool e usa um cursor próprio; `conn` e `cursor` passam a apontar para
+      a conexão emprestada pela thread atual. Use conexao_requisicao() para
+      delimitar o empréstimo (uma requisição HTTP, por exemplo).
     """
     
-    def __init__(self):
-        """Estabelece conexão com PostgreSQL"""
+    def __init__(self, pool: Optional[PoolConexoes] = None):
+        """Estabelece conexão com PostgreSQL (ou associa o pool informado)"""
+        self.pool = pool
+        self._local = threading.local()
+        self._conn = None
+        self._cursor = None
+
+        # Tabelas de domínio (status/tipos) servidas da memória; ver utils/cache_dominios.py
+        self.dominios = CacheDominios(self.buscar_todos)
+        # Posições da fila (AGUARDANDO) em memória; carregado na primeira consulta
+        self.posicoes_fila = IndicePosicaoFila(self.buscar_todos)
+        # Avisos "dados alterados" (ex.: invalidação do cache de respostas do servidor)
+        self.eventos = BarramentoEventos()
+        # Instruções preparadas compartilhadas (contadores em self.instrucoes.estatisticas())
+        self.instrucoes = INSTRUCOES
+        # Quando ativo, registrar_log_auditoria só enfileira (ver ativar_auditoria_assincrona)
+        self.escritor_auditoria: Optional[EscritorAuditoria] = None
+        # Quando ativo, os helpers de consulta passam pelo perfilador (ver ativar_perfilador)
+        self.perfilador: Optional[PerfiladorSQL] = None
+        # Quando ativo, solicitar_distribuicao só agenda (ver ativar_agendador_distribuicao)
+        self.agendador_distribuicao: Optional[AgendadorDistribuicao] = None
+
+        if pool is None:
+            try:
+                self._conn = psycopg2.connect(**CONFIG_CONEXAO)
+                registrar_conversores_tipos(self._conn)
+                self._cursor = self._conn.cursor(cursor_factory=CursorMedido)
+                print("Conexão com o banco de dados estabelecida com sucesso!")
+            except psycopg2.Error as e:
+                print("Erro ao conectar ao banco de dados:", e)
+                self._conn = None
+                return
+
         try:
-            self.conn = psycopg2.connect(
-                host="localhost",
-                database="energia_db",
-                user="postgres",
-                password="senha123", 
-                port="5432"
-            )
-            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            print("Conexão com o banco de dados estabelecida com sucesso!")
-        except psycopg2.Error as e:
-            print("Erro ao conectar ao banco de dados:", e)
-            self.conn = None
-    def _rollback_if_needed(self):
+            with self.conexao_requisicao():
+                self.dominios.carregar()
+        except Exception as e:
+            # Sem cache agora: a primeira consulta de domínio tenta carregar de novo
+            print("Aviso: não foi possível carregar as tabelas de domínio:", e)
+
+    # ============================================
+    # CONEXÃO / POOL
+    # ============================================
+
+    @property
+    def conn(self):
+        """Conexão em uso: a própria (modo direto) ou a emprestada pela thread atual."""
+        if self.pool is None:
+            return self._conn
+        if getattr(self._local, 'conn', None) is None:
+            # Empréstimo implícito: fica com a thread até liberar_conexao()
+            self._emprestar_conexao()
+        return self._local.conn
+
+    @property
+    def cursor(self):
+        """Cursor (RealDictCursor medido, ver utils/custo_banco.py) da conexão em uso pela thread atual."""
+        if self.pool is None:
+            return self._cursor
+        if getattr(self._local, 'conn', None) is None:
+            self._emprestar_conexao()
+        return self._local.cursor
+
+    def _emprestar_conexao(self):
+        conn = self.pool.obter()
+        registrar_conversores_tipos(conn)
+        self._local.conn = conn
+        self._local.cursor = conn.cursor(cursor_factory=CursorMedido)
+
+    def liberar_conexao(self, confirmar: bool = True) -> None:
         """
-        Se houver transação aberta, faz rollback para voltar ao estado IDLE.
-        Evita 'set_session cannot be used inside a transaction'.
+        Devolve ao pool a conexão emprestada pela thread atual.
+        Transação pendente é confirmada (confirmar=True) ou desfeita.
+        Sem efeito no modo direto.
         """
-        if not self.conn:
+        if self.pool is None:
+            return
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        cursor = self._local.cursor
+        self._local.conn = None
+        self._local.cursor = None
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        self.pool.devolver(conn, confirmar=confirmar)
+
+    def ativar_auditoria_assincrona(self, **kwargs) -> EscritorAuditoria:
+        """
+        Passa a gravar logs de auditoria em segundo plano e em lote.
+
+        O escritor usa o pool desta instância (ou um pool dedicado de uma
+        conexão, no modo direto) e também vira o destino do LoggerAuditoria
+        em memória, para que os dois caminhos de auditoria compartilhem a
+        mesma gravação. Parâmetros extras vão para EscritorAuditoria.
+        """
+        if self.escritor_auditoria is None:
+            pool = self.pool if self.pool is not None else criar_pool(minimo=0, maximo=1)
+            self.escritor_auditoria = EscritorAuditoria(pool, self.dominios, **kwargs).iniciar()
+            LoggerAuditoria().definir_destino(self.escritor_auditoria)
+        return self.escritor_auditoria
+
+    def ativar_agendador_distribuicao(self, **kwargs) -> Optional[AgendadorDistribuicao]:
+        """
+        Passa a distribuir créditos em segundo plano: solicitar_distribuicao()
+        só agenda, e uma thread junta as solicitações em rajada numa única
+        execução (cada rodada com uma conexão emprestada do pool).
+        Exige o modo pool; parâmetros extras vão para AgendadorDistribuicao.
+        """
+        if self.pool is None:
+            print("Aviso: agendador de distribuição exige o modo pool; distribuição continua síncrona")
+            return None
+        if self.agendador_distribuicao is None:
+            self.agendador_distribuicao = AgendadorDistribuicao(
+                self._rodada_distribuicao, executar_credito=self._rodada_credito, **kwargs
+            ).iniciar()
+        return self.agendador_distribuicao
+
+    def _rodada_distribuicao(self, limite: int) -> dict:
+        """Uma rodada de distribuição na thread do agendador."""
+        with self.conexao_requisicao():
+            return self.executar_distribuicao(limite=limite)
+
+    def _rodada_credito(self, id_credito: int, limite: int) -> dict:
+        """Uma rodada incremental (só o crédito informado) na thread do agendador."""
+        with self.conexao_requisicao():
+            return self.distribuir_credito_incremental(id_credito, limite=limite)
+
+    def ativar_perfilador(self, **kwargs) -> PerfiladorSQL:
+        """
+        Passa a medir as consultas feitas por executar/buscar_um/buscar_todos
+        (e variantes preparadas): chamadas, tempo e linhas por impressão
+        digital, log de consultas lentas e, com explicar=True, o EXPLAIN
+        (ANALYZE, BUFFERS) das mais lentas. Parâmetros extras vão para
+        PerfiladorSQL; relatório em self.perfilador.relatorio().
+        """
+        if self.perfilador is None:
+            self.perfilador = PerfiladorSQL(**kwargs)
+        return self.perfilador
+
+    def desativar_perfilador(self) -> Optional[PerfiladorSQL]:
+        """Volta à execução sem medição; devolve o perfilador (com os dados coletados)."""
+        perfilador, self.perfilador = self.perfilador, None
+        return perfilador
+
+    @contextmanager
+    def conexao_requisicao(self):
+        """
+        Delimita o uso de uma conexão do pool (ex.: uma requisição HTTP).
+
+        A conexão só é emprestada no primeiro acesso a `conn`/`cursor` dentro
+        do bloco e é devolvida na saída: em caso de exceção a transação
+        pendente é desfeita; caso contrário, é confirmada (confirmar_requisicao)
+        e os logs de auditoria da requisição seguem para o escritor. Métodos com
+        transação própria entram na transação da requisição em vez de
+        desfazê-la: não fazem commit e desfazem só o próprio trabalho, com
+        SAVEPOINT (ver _abrir_ponto); o que eles fariam depois do commit
+        (eventos, índice da fila) roda depois do commit da requisição.
+        Blocos aninhados reaproveitam o escopo externo.
+        """
+        if self.pool is None or getattr(self._local, 'escopo', False):
+            yield self
             return
-        st = self.conn.get_transaction_status()
-        # Usa as constantes CORRETAS do psycopg2
-        if st in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_ACTIVE):
+
+        self._local.escopo = True
+        self._local.auditoria_pendente = []
+        self._local.apos_commit = []
+        self._local.pontos = []
+        try:
+            yield self
+            # Falha no commit sobe daqui e cai no rollback abaixo
+            self.confirmar_requisicao()
+        except BaseException:
+            self._local.escopo = False
+            self._local.auditoria_pendente = None
+            self._local.apos_commit = None
+            self._local.pontos = []
+            self.liberar_conexao(confirmar=False)
+            raise
+        else:
+            self._local.escopo = False
+            self._local.auditoria_pendente = None
+            self._local.apos_commit = None
+            self._local.pontos = []
+            self.liberar_conexao(confirmar=True)
+
+    def confirmar_requisicao(self) -> None:
+        """
+        Confirma já a transação da requisição (ex.: antes de enviar a
+        resposta ao cliente) e só então roda as ações de _apos_commit e
+        envia os logs de auditoria pendentes ao escritor.
+
+        Se o commit falhar, a transação é desfeita, ações e logs pendentes
+        são descartados e a exceção sobe. O escopo continua aberto: o que a
+        requisição gravar depois é confirmado na saída de conexao_requisicao.
+        Sem efeito fora de conexao_requisicao.
+        """
+        if self.pool is None or not getattr(self._local, 'escopo', False):
+            return
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
             try:
-                self.conn.rollback()
+                if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_INERROR:
+                    # COMMIT de transação abortada vira ROLLBACK sem erro no psycopg2
+                    raise Exception("Transação da requisição abortada por erro anterior; nada foi gravado")
+                conn.commit()
             except Exception:
-                pass
+                self._local.auditoria_pendente = []
+                self._local.apos_commit = []
+                self._local.pontos = []
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+        self._local.pontos = []
+
+        pendentes, self._local.auditoria_pendente = self._local.auditoria_pendente, []
+        acoes, self._local.apos_commit = self._local.apos_commit, []
+        for funcao, args, kwargs in acoes:
+            try:
+                funcao(*args, **kwargs)
+            except Exception as e:
+                print(f"ERRO após o commit da requisição: {e}")
+        # Logs da requisição só depois do commit, em lote pelo escritor
+        escritor = self.escritor_auditoria
+        if escritor is not None:
+            for evento in pendentes:
+                escritor.enfileirar(**evento)
+
+    def _em_transacao(self) -> bool:
+        """True se a conexão está no meio de uma transação (mesmo que com erro)."""
+        if not self.conn:
+            return False
+        return self.conn.get_transaction_status() in (
+            extensions.TRANSACTION_STATUS_INTRANS,
+            extensions.TRANSACTION_STATUS_ACTIVE,
+            extensions.TRANSACTION_STATUS_INERROR
+        )
 
     def _set_autocommit_safe(self, on: bool):
         """
-        Muda o autocommit com segurança: antes, sai de qualquer transação ativa.
+        Muda o autocommit sem descartar o que já foi gravado.
+
+        Política de transação (no modo pool a conexão chega com autocommit
+        desligado e a transação aberta pertence à requisição, ver
+        conexao_requisicao):
+        - Desligar com transação aberta: o método entra nela; dentro de
+          conexao_requisicao ele confirma/desfaz com _confirmar/_desfazer, que
+          não encerram a transação da requisição
+        - Ligar com transação aberta: dentro de conexao_requisicao ela segue
+          aberta até a saída do bloco; fora dele, é confirmada antes
+        - Transação com erro (o Postgres já a descartou) é encerrada com rollback
         """
-        self._rollback_if_needed()
-        self.conn.autocommit = on
+        conn = self.conn
+        status = conn.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_INERROR:
+            print("Aviso: transação com erro desfeita antes de mudar o autocommit")
+            conn.rollback()
+        elif status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_ACTIVE):
+            if not on or getattr(self._local, 'escopo', False):
+                return
+            conn.commit()
+        conn.autocommit = on
+
+    def _abrir_ponto(self) -> Optional[str]:
+        """
+        Início de um método com commit/rollback próprios.
+
+        Dentro de conexao_requisicao, com a transação da requisição já
+        aberta, cria um SAVEPOINT: _desfazer volta só até ele (o que a
+        requisição gravou antes fica) e _confirmar apenas o libera.
+        Devolve o nome do ponto, ou None quando o método é dono da transação.
+        """
+        if not getattr(self._local, 'escopo', False):
+            return None
+        if self.conn.get_transaction_status() != extensions.TRANSACTION_STATUS_INTRANS:
+            return None
+        pontos = getattr(self._local, 'pontos', None)
+        if pontos is None:
+            pontos = self._local.pontos = []
+        ponto = f"ponto_metodo_{len(pontos) + 1}"
+        self.conn.cursor().execute(f"SAVEPOINT {ponto}")
+        pontos.append(ponto)
+        return ponto
+
+    def _fechar_ponto(self, ponto: str, comando: str) -> None:
+        pontos = getattr(self._local, 'pontos', None) or []
+        if ponto not in pontos:
+            return
+        del pontos[pontos.index(ponto):]
+        self.conn.cursor().execute(comando)
+
+    def _confirmar(self, ponto: Optional[str] = None) -> None:
+        """
+        Commit do método. Dentro de conexao_requisicao não encerra a
+        transação: só libera o ponto, e a requisição confirma na saída.
+        """
+        if ponto is not None:
+            self._fechar_ponto(ponto, f"RELEASE SAVEPOINT {ponto}")
+        elif not getattr(self._local, 'escopo', False):
+            self.conn.commit()
+
+    def _desfazer(self, ponto: Optional[str] = None) -> None:
+        """Rollback do método: até o ponto (ver _abrir_ponto) ou da transação inteira."""
+        if ponto is not None:
+            self._fechar_ponto(ponto, f"ROLLBACK TO SAVEPOINT {ponto}; RELEASE SAVEPOINT {ponto}")
+        else:
+            self.conn.rollback()
+
+    def _desfazer_erro(self) -> None:
+        """
+        Rollback dos helpers de consulta após um erro. Dentro de um método
+        com ponto aberto quem desfaz é o método (até o ponto), para não
+        perder o que a requisição gravou antes.
+        """
+        if self.conn and not getattr(self._local, 'pontos', None):
+            self.conn.rollback()
+
+    def _apos_commit(self, funcao, *args, **kwargs) -> None:
+        """
+        Chama funcao(*args, **kwargs) depois que as gravações forem
+        confirmadas: na hora fora de conexao_requisicao, ou depois do commit
+        da requisição (descartada se ela falhar). Usado para eventos do
+        barramento e para o índice de posições da fila.
+        """
+        acoes = getattr(self._local, 'apos_commit', None)
+        if acoes is None:
+            funcao(*args, **kwargs)
+        else:
+            acoes.append((funcao, args, kwargs))
     
     # ============================================
     # MÉTODOS AUXILIARES
@@ -66,19 +566,34 @@ class Database:
     @staticmethod
     def processar_resultado(resultado):
         """
-        Processa resultado de query convertendo tipos automaticamente.
+        Mantido por compatibilidade: a conversão de tipos agora acontece no
+        próprio psycopg2, nas conexões do Database (ver
+        registrar_conversores_tipos), então as linhas já chegam prontas para
+        serialização.
         """
-        if resultado is None:
-            return None
-        if isinstance(resultado, list):
-            return [
-                {k: Database.converter_datas(v) for k, v in row.items()}
-                for row in resultado
-            ]
-        if isinstance(resultado, dict):
-            return {k: Database.converter_datas(v) for k, v in resultado.items()}
         return resultado
 
+    def _execute(self, query, params):
+        """cursor.execute() dos helpers; passa pelo perfilador quando ativo."""
+        perfilador = self.perfilador
+        if perfilador is None:
+            self.cursor.execute(query, params or ())
+            return self.cursor
+        return perfilador.executar(self.conn, self.cursor, query, params)
+
+    def _executar_preparado(self, nome, params):
+        perfilador = self.perfilador
+        if perfilador is None:
+            return self.instrucoes.executar(self.conn, self.cursor, nome, params)
+        inicio = time.perf_counter()
+        cursor = self.instrucoes.executar(self.conn, self.cursor, nome, params)
+        comando = f"EXECUTE {nome}" + (f" ({', '.join(['%s'] * len(params))})" if params else "")
+        perfilador.registrar(
+            self.instrucoes.sql(nome), params, (time.perf_counter() - inicio) * 1000,
+            cursor.rowcount, self.conn, comando_explain=comando
+        )
+        return cursor
+
     def executar(self, query, params=None):
         """
         Executa query SQL e retorna cursor.
@@ -86,13 +601,12 @@ class Database:
         - Em transações manuais (autocommit=False), quem chama decide commit/rollback.
         """
         try:
-            self.cursor.execute(query, params or ())
+            self._execute(query, params)
             if self.conn.autocommit:  # <<< só commita se estiver em autocommit
                 self.conn.commit()
             return self.cursor
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
+            self._desfazer_erro()
             raise
 
     def buscar_um(self, query, params=None):
@@ -101,12 +615,9 @@ class Database:
         Retorna dict ou None.
         """
         try:
-            self.cursor.execute(query, params or ())
-            resultado = self.cursor.fetchone()
-            return self.processar_resultado(resultado)
+            return self._execute(query, params).fetchone()
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
+            self._desfazer_erro()
             raise
 
     def buscar_todos(self, query, params=None):
@@ -115,18 +626,80 @@ class Database:
         Retorna lista de dicts.
         """
         try:
-            self.cursor.execute(query, params or ())
-            resultado = self.cursor.fetchall()
-            return self.processar_resultado(resultado)
+            return self._execute(query, params).fetchall()
         except Exception as e:
-            if self.conn:
-                self.conn.rollback()
+            self._desfazer_erro()
+            raise
+
+    def buscar_um_preparado(self, nome, params=()):
+        """
+        Como buscar_um, mas executa uma instrução registrada em INSTRUCOES
+        (PREPARE na primeira vez por conexão, depois só EXECUTE).
+        """
+        try:
+            cursor = self._executar_preparado(nome, params)
+            return cursor.fetchone()
+        except Exception as e:
+            self._desfazer_erro()
             raise
 
+    def buscar_todos_preparado(self, nome, params=()):
+        """Como buscar_todos, para uma instrução registrada em INSTRUCOES."""
+        try:
+            cursor = self._executar_preparado(nome, params)
+            return cursor.fetchall()
+        except Exception as e:
+            self._desfazer_erro()
+            raise
+
+    @contextmanager
+    def cursor_servidor(self, query, params=None, itersize=2000):
+        """
+        Cursor nomeado (server-side) para ler resultados grandes aos poucos:
+        o Postgres entrega `itersize` linhas por ida ao banco e a memória do
+        processo não cresce com o tamanho da tabela.
+
+        Roda em uma transação somente leitura (REPEATABLE READ: a extração
+        inteira vê o mesmo instantâneo), desfeita ao sair do bloco. Com uma
+        transação já aberta (ex.: gravações da requisição), o cursor usa essa
+        transação e a deixa como estava.
+
+        Uso:
+            with db.cursor_servidor("SELECT ...") as cursor:
+                for linha in cursor:  # tuplas; nomes em cursor.description
+                    ...
+        """
+        import uuid
+
+        self._set_autocommit_safe(False)
+        propria = not self._em_transacao()
+        cursor = None
+        try:
+            if propria:
+                self.conn.cursor().execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor = self.conn.cursor(name=f"exportacao_{uuid.uuid4().hex[:12]}")
+            cursor.itersize = itersize
+            cursor.execute(query, params or ())
+            yield cursor
+        finally:
+            try:
+                if cursor is not None and not cursor.closed:
+                    cursor.close()
+            except Exception:
+                pass
+            if propria:
+                self.conn.rollback()
+            self._set_autocommit_safe(True)
+
     def fechar(self):
-        """Fecha conexão com o banco"""
-        self.cursor.close()
-        self.conn.close()
+        """Fecha conexão com o banco (no modo pool, devolve a conexão da thread)"""
+        if self.pool is not None:
+            self.liberar_conexao()
+            return
+        if self._cursor is not None:
+            self._cursor.close()
+        if self._conn is not None:
+            self._conn.close()
 
     # AUTENTICAÇÃO E CADASTRO
     def criar_usuario_simples(self, nome, email, senha, tipo_usuario='DOADOR'):
@@ -143,6 +716,7 @@ class Database:
         3. Insere usuário na tabela
         4. Retorna id_usuario
         """
+        ponto = self._abrir_ponto()
         try:
             # 1. Credencial com criptografia bcrypt
             query_credencial = """
@@ -153,15 +727,11 @@ class Database:
             cursor = self.executar(query_credencial, (email, senha))
             id_credencial = cursor.fetchone()['id_credencial']
 
-            # 2. Buscar ID do tipo de usuário (DOADOR, BENEFICIARIO, ADMINISTRADOR)
-            query_tipo = "SELECT id_tipo FROM tipo_usuario WHERE descricao_tipo = %s"
-            tipo = self.buscar_um(query_tipo, (tipo_usuario,))
-            id_tipo = tipo['id_tipo'] if tipo else 1
+            # 2. ID do tipo de usuário (DOADOR, BENEFICIARIO, ADMINISTRADOR)
+            id_tipo = self.dominios.obter_id('tipo_usuario', tipo_usuario, padrao=1)
 
-            # 3. Buscar ID do status ATIVO
-            query_status = "SELECT id_status FROM status WHERE descricao_status = 'ATIVO'"
-            status = self.buscar_um(query_status)
-            id_status = status['id_status'] if status else 1
+            # 3. ID do status ATIVO
+            id_status = self.dominios.obter_id('status', 'ATIVO', padrao=1)
 
             # 4. Criar usuário (sem telefone)
             # Nota: o fluxo de cadastro inicial NÃO utiliza telefone. Inserimos apenas
@@ -178,18 +748,19 @@ class Database:
             id_usuario = cursor.fetchone()['id_usuario']
             # Garantir que a criação do usuário seja confirmada no banco
             try:
-                self.conn.commit()
+                self._confirmar(ponto)
             except Exception:
                 # Se commit falhar, tenta rollback para deixar estado consistente
                 try:
-                    self.conn.rollback()
+                    self._desfazer(ponto)
                 except Exception:
                     pass
 
+            self._apos_commit(self.eventos.publicar, TipoEvento.CADASTRO, id_usuario=id_usuario)
             return id_usuario
 
         except Exception as e:
-            self.conn.rollback()
+            self._desfazer(ponto)
             raise Exception(f"Erro ao criar usuário: {str(e)}")
 
     def validar_login(self, email, senha):
@@ -203,22 +774,7 @@ class Database:
         - dict com id_usuario, nome, email, tipo_usuario, status
         - None se credenciais inválidas
         """
-        query = """
-            SELECT 
-                u.id_usuario, 
-                u.nome, 
-                u.email,
-                tu.descricao_tipo as tipo_usuario,
-                s.descricao_status as status
-            FROM usuario u
-            JOIN credencial_usuario c ON u.id_credencial = c.id_credencial
-            JOIN tipo_usuario tu ON u.id_tipo = tu.id_tipo
-            JOIN status s ON u.id_status = s.id_status
-            WHERE c.login = %s
-            AND c.senha_hash = crypt(%s, c.senha_hash)
-            AND s.descricao_status = 'ATIVO'
-        """
-        return self.buscar_um(query, (email, senha))
+        return self.buscar_um_preparado('validar_login', (email, senha))
 
     def atualizar_ultimo_login(self, email):
         """
@@ -244,13 +800,8 @@ class Database:
         Retorna:
         - id_doador: ID do registro criado
         """
-        # Buscar ID da classificação
-        query_class = """
-            SELECT id_classificacao FROM classificacao_doador 
-            WHERE descricao_classificacao = %s
-        """
-        result = self.buscar_um(query_class, (classificacao,))
-        id_classificacao = result['id_classificacao'] if result else 1
+        # ID da classificação
+        id_classificacao = self.dominios.obter_id('classificacao_doador', classificacao, padrao=1)
         
         # Criar doador
         query = """
@@ -259,7 +810,9 @@ class Database:
             RETURNING id_doador
         """
         cursor = self.executar(query, (id_usuario, id_classificacao))
-        return cursor.fetchone()['id_doador']
+        id_doador = cursor.fetchone()['id_doador']
+        self._apos_commit(self.eventos.publicar, TipoEvento.CADASTRO, id_usuario=id_usuario, id_doador=id_doador)
+        return id_doador
     
 
     def criar_beneficiario_simples(self, id_usuario):
@@ -273,14 +826,10 @@ class Database:
         Retorna:
         - id_beneficiario: ID do registro criado
         """
+        ponto = self._abrir_ponto()
         try:
-            # Busca ID do status AGUARDANDO_APROVACAO
-            query_status = """
-                SELECT id_status_beneficiario FROM status_beneficiario 
-                WHERE descricao_status_beneficiario = 'AGUARDANDO_APROVACAO'
-            """
-            status = self.buscar_um(query_status)
-            id_status = status['id_status_beneficiario'] if status else 1
+            # ID do status AGUARDANDO_APROVACAO
+            id_status = self.dominios.obter_id('status_beneficiario', 'AGUARDANDO_APROVACAO', padrao=1)
         
             # Cria beneficiário
             query = """
@@ -297,19 +846,22 @@ class Database:
             # Confirma a inserção para que outras operações (em especial
             # aquelas que fazem rollback antes de iniciar transação) vejam o registro
             try:
-                self.conn.commit()
+                self._confirmar(ponto)
             except Exception:
                 try:
-                    self.conn.rollback()
+                    self._desfazer(ponto)
                 except Exception:
                     pass
 
             print(f"Beneficiário criado: id_beneficiario={id_beneficiario} para usuario_id={id_usuario}")
+            self._apos_commit(
+                self.eventos.publicar, TipoEvento.CADASTRO, id_usuario=id_usuario, id_beneficiario=id_beneficiario
+            )
 
             return id_beneficiario
         
         except Exception as e:
-            self.conn.rollback()
+            self._desfazer(ponto)
             raise Exception(f"Erro ao criar beneficiário: {str(e)}")
 
     # CRUD DE USUÁRIOS
@@ -365,6 +917,7 @@ class Database:
         Retorna:
         - dict com dados atualizados (id_usuario, nome, email)
         """
+        ponto = self._abrir_ponto()
         try:
             # 1. Buscar id_credencial do usuário
             query_cred = """
@@ -394,11 +947,12 @@ class Database:
                 WHERE id_credencial = %s
             """
             self.executar(query_login, (email, id_credencial))
+            self._confirmar(ponto)
         
             return usuario_atualizado
         
         except Exception as e:
-            self.conn.rollback()
+            self._desfazer(ponto)
             raise Exception(f"Erro ao atualizar usuário: {str(e)}")
 
     def atualizar_senha(self, login, senha_atual, senha_nova):
@@ -411,6 +965,7 @@ class Database:
         - True: senha alterada com sucesso
         - False: senha atual incorreta
         """
+        ponto = self._abrir_ponto()
         try:
             cursor = self.executar("""
                 UPDATE credencial_usuario
@@ -420,10 +975,12 @@ class Database:
                 RETURNING id_credencial
             """, (senha_nova, login, senha_atual))
             
-            return cursor.fetchone() is not None
+            alterada = cursor.fetchone() is not None
+            self._confirmar(ponto)
+            return alterada
             
         except Exception as e:
-            self.conn.rollback()
+            self._desfazer(ponto)
             raise
 
     def excluir_usuario_por_email(self, email):
@@ -464,10 +1021,19 @@ class Database:
             self._set_autocommit_safe(True)
 
             # Se for BENEFICIÁRIO, apague dependências primeiro
+            doadores_afetados = []
             if id_benef:
+                doadores_afetados = [r['id_doador'] for r in self.buscar_todos("""
+                    SELECT DISTINCT c.id_doador
+                    FROM transacao t
+                    JOIN credito c ON t.id_credito = c.id_credito
+                    WHERE t.id_beneficiario = %s
+                """, (id_benef,))]
                 self.executar("DELETE FROM fila_espera WHERE id_beneficiario = %s", (id_benef,))
                 self.executar("DELETE FROM transacao   WHERE id_beneficiario = %s", (id_benef,))
+                self.executar("DELETE FROM doador_beneficiario_atendido WHERE id_beneficiario = %s", (id_benef,))
                 self.executar("DELETE FROM beneficiario WHERE id_beneficiario = %s", (id_benef,))
+                self._apos_commit(self.posicoes_fila.sincronizar_beneficiarios, [id_benef], [])
 
             # Se for DOADOR, apague créditos/histórico e depois o doador
             if id_doador:
@@ -477,6 +1043,8 @@ class Database:
                 """, (id_doador,))
                 self.executar("DELETE FROM transacao WHERE id_credito IN (SELECT id_credito FROM credito WHERE id_doador = %s)", (id_doador,))
                 self.executar("DELETE FROM credito   WHERE id_doador = %s", (id_doador,))
+                self.executar("DELETE FROM doador_beneficiario_atendido WHERE id_doador = %s", (id_doador,))
+                self.executar("DELETE FROM doador_agregado WHERE id_doador = %s", (id_doador,))
                 self.executar("DELETE FROM doador    WHERE id_doador = %s", (id_doador,))
 
             # Logs vinculados ao usuário
@@ -487,6 +1055,16 @@ class Database:
             if id_cred:
                 self.executar("DELETE FROM credencial_usuario WHERE id_credencial = %s", (id_cred,))
             # Não removemos telefone pois o sistema NÃO usa telefone no cadastro inicial
+
+            # Transações removidas mudam o distribuído/famílias dos doadores
+            for id_afetado in doadores_afetados:
+                self.reconstruir_agregados_doador(id_afetado)
+
+            # Dentro de uma requisição, só depois do commit dela
+            self._apos_commit(self.eventos.publicar, TipoEvento.CADASTRO, id_usuario=id_usuario)
+            if id_benef or id_doador:
+                # Transações do usuário foram removidas junto
+                self._apos_commit(self.eventos.publicar, TipoEvento.DISTRIBUICAO, id_usuario=id_usuario)
             return True
 
         except Exception as e:
@@ -507,30 +1085,36 @@ class Database:
         - detalhes: Descrição adicional (opcional)
         
         Retorna:
-        - id_log: ID do registro criado
+        - id_log: ID do registro criado (None no modo assíncrono, em que o
+          evento é apenas enfileirado para o EscritorAuditoria)
+
+        No modo assíncrono, dentro de conexao_requisicao o evento fica
+        guardado com a requisição e só vai para o EscritorAuditoria depois
+        do commit na saída do bloco (requisição que falha não deixa log);
+        fora dela é enfileirado na hora.
         """
-        # Buscar ID do tipo de ação
-        try:
-            # Buscar ID do tipo de ação
-            query_tipo = "SELECT id_tipo_acao FROM tipo_acao WHERE descricao_tipo_acao = %s"
-            tipo = self.buscar_um(query_tipo, (tipo_acao,))
-            id_tipo_acao = tipo['id_tipo_acao'] if tipo else 1
-
-            # Buscar ID do tipo de dispositivo (WEB)
-            query_disp = """
-                SELECT id_tipo_dispositivo FROM tipo_dispositivo 
-                WHERE descricao_tipo_dispositivo = 'WEB'
-            """
-            disp = self.buscar_um(query_disp)
-            id_disp = disp['id_tipo_dispositivo'] if disp else 1
+        if self.escritor_auditoria is not None:
+            evento = {
+                'tipo_acao': tipo_acao,
+                'id_usuario': id_usuario,
+                'ip_acesso': ip_acesso,
+                'detalhes': detalhes,
+                'data_hora': datetime.now()
+            }
+            pendentes = getattr(self._local, 'auditoria_pendente', None)
+            if pendentes is not None:
+                pendentes.append(evento)
+            else:
+                self.escritor_auditoria.enfileirar(**evento)
+            return None
 
-            # Buscar ID do status (SUCESSO)
-            query_status = """
-                SELECT id_status_log FROM status_log 
-                WHERE descricao_status_log = 'SUCESSO'
-            """
-            status = self.buscar_um(query_status)
-            id_status = status['id_status_log'] if status else 1
+        em_transacao = self._em_transacao()
+
+        try:
+            # IDs de tipo de ação, dispositivo (WEB) e status (SUCESSO) vêm do cache
+            id_tipo_acao = self.dominios.obter_id('tipo_acao', tipo_acao, padrao=1)
+            id_disp = self.dominios.obter_id('tipo_dispositivo', 'WEB', padrao=1)
+            id_status = self.dominios.obter_id('status_log', 'SUCESSO', padrao=1)
 
             # Inserir log (permite NULL em id_usuario)
             query = """
@@ -544,6 +1128,9 @@ class Database:
                 (ip_acesso, detalhes, id_usuario, id_tipo_acao, id_disp, id_status)
             )
             resultado = cursor.fetchone()
+            if not em_transacao and not self.conn.autocommit:
+                # Sem transação de negócio aberta: o log é a própria transação
+                self.conn.commit()
             return resultado['id_log'] if resultado else None
         
         except Exception as e:
@@ -569,32 +1156,40 @@ class Database:
         Returns:
             ID do crédito criado
         """
+        ponto = self._abrir_ponto()
         try:
             # Define expiração padrão se não fornecida
             if data_expiracao is None:
                 from datetime import timedelta
                 data_expiracao = date.today() + timedelta(days=365)
             
-            # Busca ID do status DISPONIVEL
-            query_status = """
-                SELECT id_status_credito FROM status_credito 
-                WHERE descricao_status = 'DISPONIVEL'
-            """
-            status = self.buscar_um(query_status)
-            id_status = status['id_status_credito'] if status else 1
+            # ID do status DISPONIVEL
+            id_status = self.dominios.obter_id('status_credito', 'DISPONIVEL', padrao=1)
             
-            # Insere crédito
+            # Insere crédito e soma no total doado do doador no mesmo comando
             query = """
-                INSERT INTO credito (
-                    quantidade_disponivel_kwh,
-                    data_expiracao,
-                    id_doador,
-                    id_status_credito
+                WITH novo AS (
+                    INSERT INTO credito (
+                        quantidade_disponivel_kwh,
+                        quantidade_inicial_kwh,
+                        data_expiracao,
+                        id_doador,
+                        id_status_credito
+                    )
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id_credito, id_doador, quantidade_inicial_kwh
+                ), agregado AS (
+                    INSERT INTO doador_agregado (id_doador, total_doado_kwh)
+                    SELECT id_doador, quantidade_inicial_kwh FROM novo
+                    ON CONFLICT (id_doador) DO UPDATE
+                    SET total_doado_kwh = doador_agregado.total_doado_kwh + EXCLUDED.total_doado_kwh,
+                        data_atualizacao = NOW()
                 )
-                VALUES (%s, %s, %s, %s)
-                RETURNING id_credito
+                SELECT id_credito FROM novo
             """
-            cursor = self.executar(query, (quantidade_kwh, data_expiracao, id_doador, id_status))
+            cursor = self.executar(
+                query, (quantidade_kwh, quantidade_kwh, data_expiracao, id_doador, id_status)
+            )
             id_credito = cursor.fetchone()['id_credito']
             
             # Registra no histórico
@@ -605,61 +1200,128 @@ class Database:
             )
             # Garante que a inserção foi persistida para leituras em outras requisições
             try:
-                self.conn.commit()
+                self._confirmar(ponto)
             except Exception:
                 try:
-                    self.conn.rollback()
+                    self._desfazer(ponto)
                 except Exception:
                     pass
 
+            self._apos_commit(self.eventos.publicar, TipoEvento.DOACAO, id_credito=id_credito, id_doador=id_doador)
             return id_credito
             
         except Exception as e:
-            self.conn.rollback()
+            self._desfazer(ponto)
             raise Exception(f"Erro ao criar crédito: {str(e)}")
     
+    def criar_creditos_em_lote(
+        self,
+        id_doador: int,
+        itens: List[Tuple[float, Optional[date]]]
+    ) -> List[int]:
+        """
+        Cria vários créditos de um doador em uma única transação: um INSERT
+        com todas as linhas (execute_values), um para o histórico e uma única
+        soma no total doado.
+
+        Args:
+            id_doador: ID do doador
+            itens: (quantidade_kwh, data_expiracao ou None = 12 meses)
+
+        Returns:
+            IDs dos créditos criados, na ordem de `itens`
+        """
+        from datetime import timedelta
+        from psycopg2.extras import execute_values
+
+        if not itens:
+            return []
+
+        expiracao_padrao = date.today() + timedelta(days=365)
+        id_status = self.dominios.obter_id('status_credito', 'DISPONIVEL', padrao=1)
+        total = sum(quantidade for quantidade, _ in itens)
+
+        self._set_autocommit_safe(False)
+        ponto = self._abrir_ponto()
+        try:
+            # O Postgres não garante o RETURNING na ordem do VALUES: os ids saem
+            # da sequência antes do INSERT, então cada item já nasce com o seu
+            ids = [linha['id_credito'] for linha in self.buscar_todos(
+                "SELECT nextval(pg_get_serial_sequence('credito', 'id_credito')) AS id_credito "
+                "FROM generate_series(1, %s)",
+                (len(itens),)
+            )]
+            linhas = [
+                (id_credito, quantidade, quantidade, data_expiracao or expiracao_padrao, id_doador, id_status)
+                for id_credito, (quantidade, data_expiracao) in zip(ids, itens)
+            ]
+
+            execute_values(
+                self.cursor,
+                """
+                INSERT INTO credito (
+                    id_credito,
+                    quantidade_disponivel_kwh,
+                    quantidade_inicial_kwh,
+                    data_expiracao,
+                    id_doador,
+                    id_status_credito
+                )
+                VALUES %s
+                """,
+                linhas,
+                page_size=len(linhas)
+            )
+
+            execute_values(
+                self.cursor,
+                "INSERT INTO historico_credito (quantidade_kwh, data_movimento, id_credito) VALUES %s",
+                [(quantidade, id_credito) for id_credito, (quantidade, _) in zip(ids, itens)],
+                template="(%s, CURRENT_DATE, %s)",
+                page_size=len(linhas)
+            )
+
+            self.ajustar_agregado_doador(id_doador, doado_kwh=total)
+            self._confirmar(ponto)
+        except Exception as e:
+            self._desfazer(ponto)
+            raise Exception(f"Erro ao criar créditos em lote: {str(e)}")
+        finally:
+            self._set_autocommit_safe(True)
+
+        self._apos_commit(self.eventos.publicar, TipoEvento.DOACAO, id_doador=id_doador, ids_credito=ids)
+        return ids
+
     def listar_creditos(
         self, 
         id_doador: Optional[int] = None,
         limit: int = 50,
-        offset: int = 0
-    ) -> list:
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Lista créditos com paginação.
+        Lista créditos paginando por chave (id_credito DESC).
         
         Args:
             id_doador: Filtrar por doador (None = todos, requer ADMIN)
             limit: Registros por página
-            offset: Deslocamento
+            cursor: proximo_cursor/cursor_anterior da página anterior (None = primeira)
         
         Returns:
-            Lista de dicts com dados dos créditos
-        """
-        query = """
-            SELECT 
-                c.id_credito,
-                c.quantidade_disponivel_kwh,
-                c.data_expiracao,
-                c.id_doador,
-                sc.descricao_status AS status,
-                d.data_cadastro,
-                u.nome AS nome_doador,
-                u.email AS email_doador
-            FROM credito c
-            JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
-            JOIN doador d ON c.id_doador = d.id_doador
-            JOIN usuario u ON d.id_usuario = u.id_usuario
+            {'itens': [...], 'proximo_cursor': str|None, 'cursor_anterior': str|None}
+
+        Raises:
+            ValueError: cursor inválido
         """
-        
-        params = []
-        if id_doador:
-            query += " WHERE c.id_doador = %s"
-            params.append(id_doador)
-        
-        query += " ORDER BY c.id_credito DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        return self.buscar_todos(query, tuple(params))
+        posicao = decodificar_cursor(cursor)
+        chave = chave_cursor(posicao, 1)
+        anterior = bool(posicao and posicao.get('a'))
+        # Primeira página: "menor que o maior int" mantém a mesma instrução preparada
+        referencia = int(chave[0]) if chave else 2147483647
+
+        nome = 'listar_creditos' + ('_doador' if id_doador else '') + ('_antes' if anterior else '')
+        params = ((id_doador,) if id_doador else ()) + (referencia, limit + 1)
+        linhas = self.buscar_todos_preparado(nome, params)
+        return montar_pagina(linhas, ORDENACAO_CREDITOS, limit, posicao)
     
     def registrar_historico_credito(
         self,
@@ -673,10 +1335,8 @@ class Database:
         Args:
             id_credito: ID do crédito
             evento: Tipo de evento (CRIACAO, CONSUMO, EXPIRACAO, etc)
-            detalhe: Dados adicionais em JSON
+            detalhe: Dados adicionais; 'id_transacao' liga o registro à transação
         """
-        import json
-        
         # Busca quantidade atual para registrar
         query_qtd = "SELECT quantidade_disponivel_kwh FROM credito WHERE id_credito = %s"
         result = self.buscar_um(query_qtd, (id_credito,))
@@ -686,11 +1346,12 @@ class Database:
             INSERT INTO historico_credito (
                 quantidade_kwh,
                 data_movimento,
-                id_credito
+                id_credito,
+                id_transacao
             )
-            VALUES (%s, CURRENT_DATE, %s)
+            VALUES (%s, CURRENT_DATE, %s, %s)
         """
-        self.executar(query, (quantidade_atual, id_credito))
+        self.executar(query, (quantidade_atual, id_credito, (detalhe or {}).get('id_transacao')))
     
     def atualizar_status_credito(self, id_credito: int) -> None:
         """
@@ -708,18 +1369,7 @@ class Database:
                 SELECT 
                     c.quantidade_disponivel_kwh,
                     c.data_expiracao,
-                    -- Calcula quantidade inicial (disponível + consumido)
-                    (
-                        c.quantidade_disponivel_kwh + 
-                        COALESCE(
-                            (SELECT SUM(t.quantidade_kwh)
-                             FROM transacao t
-                             JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                             WHERE t.id_credito = c.id_credito 
-                                AND st.descricao_status = 'CONCLUIDA'),
-                             0
-                        )
-                    ) as quantidade_inicial
+                    COALESCE(c.quantidade_inicial_kwh, c.quantidade_disponivel_kwh) as quantidade_inicial
                 FROM credito c
                 WHERE c.id_credito = %s
             """
@@ -731,6 +1381,9 @@ class Database:
             qtd_disponivel = float(result['quantidade_disponivel_kwh'])
             qtd_inicial = float(result['quantidade_inicial'])
             data_exp = result['data_expiracao']
+            if isinstance(data_exp, str):
+                # Conexões do Database devolvem datas como string ISO
+                data_exp = date.fromisoformat(data_exp[:10])
         
             # REGRA 1: Verifica expiração primeiro
             if data_exp and data_exp < date.today():
@@ -748,14 +1401,13 @@ class Database:
             else:
                 novo_status = 'DISPONIVEL'
         
-            # Busca ID do status e atualiza
-            query_status = "SELECT id_status_credito FROM status_credito WHERE descricao_status = %s"
-            status = self.buscar_um(query_status, (novo_status,))
+            # ID do status (cache) e atualiza
+            id_status = self.dominios.obter_id('status_credito', novo_status)
         
-            if status:
+            if id_status:
                 self.executar(
                     "UPDATE credito SET id_status_credito = %s WHERE id_credito = %s",
-                    (status['id_status_credito'], id_credito)
+                    (id_status, id_credito)
                 )
             
                 print(f"✅ Crédito #{id_credito}: Status atualizado para {novo_status}")
@@ -765,6 +1417,165 @@ class Database:
             print(f"❌ Erro ao atualizar status do crédito {id_credito}: {e}")
     
 
+    # AGREGADOS DO DOADOR
+    def ajustar_agregado_doador(
+        self,
+        id_doador: int,
+        doado_kwh: float = 0.0,
+        distribuido_kwh: float = 0.0,
+        familias: int = 0
+    ) -> None:
+        """
+        Soma deltas nos totais do doador (doador_agregado), criando a linha se preciso.
+        Roda na transação corrente: use junto do comando que alterou os créditos.
+
+        Args:
+            id_doador: ID do doador
+            doado_kwh: Variação do total doado (negativo ao excluir/reduzir crédito)
+            distribuido_kwh: Variação do total distribuído
+            familias: Novas famílias distintas atendidas
+        """
+        self.executar("""
+            INSERT INTO doador_agregado
+                (id_doador, total_doado_kwh, total_distribuido_kwh, familias_atendidas)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (id_doador) DO UPDATE
+            SET total_doado_kwh = doador_agregado.total_doado_kwh + EXCLUDED.total_doado_kwh,
+                total_distribuido_kwh = doador_agregado.total_distribuido_kwh + EXCLUDED.total_distribuido_kwh,
+                familias_atendidas = doador_agregado.familias_atendidas + EXCLUDED.familias_atendidas,
+                data_atualizacao = NOW()
+        """, (id_doador, doado_kwh, distribuido_kwh, familias))
+
+    def _agregar_fatias_por_doador(self, fatias: List[dict]) -> None:
+        """
+        Atualiza doador_agregado com as fatias de uma distribuição:
+        soma o distribuído por doador e conta famílias novas (pares
+        doador/beneficiário inéditos em doador_beneficiario_atendido).
+        """
+        from psycopg2.extras import execute_values
+
+        distribuido: Dict[int, float] = {}
+        pares = set()
+        for f in fatias:
+            distribuido[f['id_doador']] = distribuido.get(f['id_doador'], 0.0) + f['quantidade_kwh']
+            pares.add((f['id_doador'], f['id_beneficiario']))
+
+        novos = execute_values(
+            self.cursor,
+            """
+            INSERT INTO doador_beneficiario_atendido (id_doador, id_beneficiario)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            RETURNING id_doador
+            """,
+            sorted(pares),
+            page_size=1000,
+            fetch=True
+        )
+        familias: Dict[int, int] = {}
+        for linha in novos:
+            familias[linha['id_doador']] = familias.get(linha['id_doador'], 0) + 1
+
+        execute_values(
+            self.cursor,
+            """
+            INSERT INTO doador_agregado
+                (id_doador, total_doado_kwh, total_distribuido_kwh, familias_atendidas)
+            VALUES %s
+            ON CONFLICT (id_doador) DO UPDATE
+            SET total_distribuido_kwh = doador_agregado.total_distribuido_kwh + EXCLUDED.total_distribuido_kwh,
+                familias_atendidas = doador_agregado.familias_atendidas + EXCLUDED.familias_atendidas,
+                data_atualizacao = NOW()
+            """,
+            [
+                (id_doador, 0, kwh, familias.get(id_doador, 0))
+                for id_doador, kwh in sorted(distribuido.items())
+            ],
+            template="(%s::int, %s::numeric, %s::numeric, %s::int)",
+            page_size=1000
+        )
+
+    def reconstruir_agregados_doador(self, id_doador: Optional[int] = None) -> int:
+        """
+        Recalcula do zero os agregados a partir de credito/transacao.
+        Usado como backfill (créditos antigos sem quantidade_inicial_kwh) e
+        para corrigir divergências; ver BackEnd/manutencao.py.
+
+        Args:
+            id_doador: Reconstrói só este doador (None = todos)
+
+        Returns:
+            Número de doadores atualizados
+        """
+        filtro_credito = "AND c.id_doador = %s" if id_doador else ""
+        filtro_doador = "WHERE d.id_doador = %s" if id_doador else ""
+        filtro_par = "WHERE id_doador = %s" if id_doador else ""
+        params = (id_doador,) if id_doador else None
+
+        self._set_autocommit_safe(False)
+        ponto = self._abrir_ponto()
+        try:
+            # 1) Quantidade inicial dos créditos criados antes da coluna existir
+            self.executar(f"""
+                UPDATE credito c
+                SET quantidade_inicial_kwh = c.quantidade_disponivel_kwh + COALESCE(
+                    (SELECT SUM(t.quantidade_kwh)
+                     FROM transacao t
+                     JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+                     WHERE t.id_credito = c.id_credito
+                       AND st.descricao_status = 'CONCLUIDA'),
+                    0
+                )
+                WHERE c.quantidade_inicial_kwh IS NULL {filtro_credito}
+            """, params)
+
+            # 2) Pares doador/beneficiário já atendidos
+            self.executar(f"DELETE FROM doador_beneficiario_atendido {filtro_par}", params)
+            self.executar(f"""
+                INSERT INTO doador_beneficiario_atendido (id_doador, id_beneficiario)
+                SELECT DISTINCT c.id_doador, t.id_beneficiario
+                FROM transacao t
+                JOIN credito c ON t.id_credito = c.id_credito
+                JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+                WHERE st.descricao_status = 'CONCLUIDA' {filtro_credito}
+            """, params)
+
+            # 3) Totais
+            cursor = self.executar(f"""
+                INSERT INTO doador_agregado
+                    (id_doador, total_doado_kwh, total_distribuido_kwh, familias_atendidas, data_atualizacao)
+                SELECT
+                    d.id_doador,
+                    COALESCE((SELECT SUM(c.quantidade_inicial_kwh)
+                              FROM credito c WHERE c.id_doador = d.id_doador), 0),
+                    COALESCE((SELECT SUM(t.quantidade_kwh)
+                              FROM transacao t
+                              JOIN credito c ON t.id_credito = c.id_credito
+                              JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+                              WHERE c.id_doador = d.id_doador
+                                AND st.descricao_status = 'CONCLUIDA'), 0),
+                    (SELECT COUNT(*) FROM doador_beneficiario_atendido a
+                     WHERE a.id_doador = d.id_doador),
+                    NOW()
+                FROM doador d
+                {filtro_doador}
+                ON CONFLICT (id_doador) DO UPDATE
+                SET total_doado_kwh = EXCLUDED.total_doado_kwh,
+                    total_distribuido_kwh = EXCLUDED.total_distribuido_kwh,
+                    familias_atendidas = EXCLUDED.familias_atendidas,
+                    data_atualizacao = EXCLUDED.data_atualizacao
+            """, params)
+            atualizados = cursor.rowcount
+
+            self._confirmar(ponto)
+            return atualizados
+
+        except Exception as e:
+            self._desfazer(ponto)
+            raise Exception(f"Erro ao reconstruir agregados: {str(e)}")
+        finally:
+            self._set_autocommit_safe(True)
+
     # FILA DE ESPERA
     def entrar_na_fila(
         self,
@@ -777,9 +1588,11 @@ class Database:
         Coloca beneficiário na fila com prioridade baseada APENAS na renda.
         Quanto MENOR a renda, MAIOR a prioridade (fica mais perto do 1º lugar).
         """
+        ponto = None
         try:
             print(f"🔵 entrar_na_fila: id_beneficiario={id_beneficiario}, renda={renda_familiar}")
             self._set_autocommit_safe(False)
+            ponto = self._abrir_ponto()
     
             # Verifica se já está na fila AGUARDANDO
             query_existe = """
@@ -792,17 +1605,10 @@ class Database:
             existe = self.buscar_um(query_existe, (id_beneficiario,))
     
             if existe:
-                self.conn.rollback()
-                self._set_autocommit_safe(True)
                 raise ValueError("Beneficiário já está na fila de espera")
     
-            # Busca ID do status AGUARDANDO
-            query_status = """
-                SELECT id_status_fila FROM status_fila 
-                WHERE descricao_status_fila = 'AGUARDANDO'
-            """
-            status = self.buscar_um(query_status)
-            id_status = status['id_status_fila'] if status else 1
+            # ID do status AGUARDANDO
+            id_status = self.dominios.obter_id('status_fila', 'AGUARDANDO', padrao=1)
     
             # CALCULA PRIORIDADE BASEADA 100% NA RENDA
             # Fórmula simples: menor renda = maior prioridade
@@ -825,8 +1631,6 @@ class Database:
             verifica = self.buscar_um(query_verifica, (id_beneficiario,))
     
             if not verifica:
-                self.conn.rollback()
-                self._set_autocommit_safe(True)
                 raise ValueError(f"Beneficiário {id_beneficiario} não encontrado")
     
             # Inserindo na fila
@@ -842,7 +1646,7 @@ class Database:
                     tempo_espera_dias
                 )
                 VALUES (%s, %s, NOW(), %s, %s, %s, %s, 0)
-                RETURNING id_fila
+                RETURNING id_fila, data_entrada
             """
             self.cursor.execute(
                 query,
@@ -851,42 +1655,41 @@ class Database:
     
             resultado = self.cursor.fetchone()
             if not resultado:
-                self.conn.rollback()
-                self._set_autocommit_safe(True)
                 raise Exception("Falha ao inserir na fila")
     
             id_fila = resultado['id_fila']
-            self.conn.commit()
+            self._confirmar(ponto)
     
             print(f"✅ Inserido na fila: id_fila={id_fila}, prioridade={prioridade}")
     
-            # Montrando posição na fila
+            # Montrando posição na fila (índice em memória)
             self._set_autocommit_safe(True)
-            query_posicao = """
-                SELECT COUNT(*) + 1 AS posicao
-                FROM fila_espera f2
-                JOIN status_fila sf2 ON f2.id_status_fila = sf2.id_status_fila
-                WHERE sf2.descricao_status_fila = 'AGUARDANDO'
-                    AND f2.prioridade > %s
-            """
-            posicao_result = self.buscar_um(query_posicao, (prioridade,))
-            posicao = posicao_result['posicao'] if posicao_result else 1
-            print(f"📍 Posição na fila: {posicao}º lugar")
+            self._apos_commit(
+                self._indexar_entrada_fila, id_fila, prioridade, resultado['data_entrada'], id_beneficiario
+            )
+            self._apos_commit(self.eventos.publicar, TipoEvento.FILA, id_fila=id_fila, id_beneficiario=id_beneficiario)
     
             return id_fila
     
         except ValueError as ve:
-            self.conn.rollback()
+            self._desfazer(ponto)
             self._set_autocommit_safe(True)
             raise
         except Exception as e:
             print(f"❌ ERRO em entrar_na_fila: {e}")
             import traceback
             traceback.print_exc()
-            self.conn.rollback()
+            self._desfazer(ponto)
             self._set_autocommit_safe(True)
             raise Exception(f"Erro ao entrar na fila: {str(e)}")
-    
+
+    def _indexar_entrada_fila(self, id_fila, prioridade, data_entrada, id_beneficiario):
+        """Insere a entrada confirmada no índice de posições e informa a posição."""
+        self.posicoes_fila.inserir(id_fila, prioridade, data_entrada, id_beneficiario)
+        posicao = self.posicoes_fila.posicao(id_fila)
+        if posicao:
+            print(f"📍 Posição na fila: {posicao}º lugar")
+
     def listar_fila(self, top: int = 50) -> list:
         """
         Lista beneficiários na fila ordenados por prioridade.
@@ -897,195 +1700,430 @@ class Database:
         Returns:
             Lista ordenada por prioridade desc, data_entrada asc
         """
-        query = """
-            SELECT * FROM v_fila_priorizada
-            LIMIT %s
-        """
-        return self.buscar_todos(query, (top,))
+        # Ordem e posições vêm do índice; o banco só completa os dados das entradas
+        topo = self.posicoes_fila.top(top)
+        if not topo:
+            return []
+
+        detalhes = self.buscar_todos_preparado('listar_fila_detalhes', ([t['id_fila'] for t in topo],))
+        linhas = {l['id_fila']: l for l in detalhes}
+
+        fila = []
+        for item in topo:
+            linha = linhas.get(item['id_fila'])
+            if linha:
+                linha['posicao_fila'] = item['posicao_fila']
+                fila.append(linha)
+        return fila
     
     # DISTRIBUIÇÃO AUTOMÁTICA
+    @staticmethod
+    def _planejar_distribuicao(creditos: List[dict], beneficiarios: List[dict]) -> List[dict]:
+        """
+        Calcula em memória o plano completo de distribuição (sem tocar no banco).
+
+        Regras (as mesmas do motor original):
+        - Cada beneficiário recebe uma fatia do total disponível proporcional
+          à sua prioridade, nunca mais do que solicitou (consumo_medio_kwh)
+        - As fatias são retiradas dos créditos na ordem recebida
+          (data_expiracao NULLS LAST, id_credito)
+
+        Args:
+            creditos: Créditos travados (id_credito, id_doador, quantidade_disponivel_kwh)
+            beneficiarios: Entradas da fila travadas, em ordem de prioridade
+
+        Returns:
+            Lista de fatias: id_beneficiario, id_fila, nome, id_credito,
+            id_doador, quantidade_kwh e saldo_credito (saldo do crédito após a fatia)
+        """
+        saldos = {c['id_credito']: float(c['quantidade_disponivel_kwh']) for c in creditos}
+        total_kwh_disponivel = float(sum(saldos.values()))
+        soma_prioridades = float(sum(b['prioridade'] for b in beneficiarios)) or 1.0
+
+        fatias = []
+        for benef in beneficiarios:
+            peso = float(benef['prioridade']) / soma_prioridades
+            kwh_alocado = total_kwh_disponivel * peso
+            solicitado = float(benef.get('consumo_medio_kwh') or 0)
+
+            # NUNCA distribuir mais do que foi solicitado
+            kwh_restante = min(kwh_alocado, solicitado) if solicitado > 0 else kwh_alocado
+
+            for credito in creditos:
+                if kwh_restante <= 0.0:
+                    break
+                saldo = saldos[credito['id_credito']]
+                if saldo <= 0.0:
+                    continue
+
+                kwh_consumir = min(kwh_restante, saldo)
+                saldos[credito['id_credito']] = saldo - kwh_consumir
+                kwh_restante -= kwh_consumir
+
+                fatias.append({
+                    'id_beneficiario': benef['id_beneficiario'],
+                    'id_fila': benef['id_fila'],
+                    'nome': benef['nome'],
+                    'id_credito': credito['id_credito'],
+                    'id_doador': credito.get('id_doador'),
+                    'quantidade_kwh': kwh_consumir,
+                    'saldo_credito': saldo - kwh_consumir
+                })
+
+        return fatias
+
+    @staticmethod
+    def _kwh_para_cobrir_demanda(beneficiarios: List[dict]) -> Optional[float]:
+        """
+        Menor total de créditos com que _planejar_distribuicao já entrega a
+        cada beneficiário tudo o que ele pediu: a fatia total * prioridade /
+        soma_prioridades atinge o solicitado quando
+        total >= solicitado * soma_prioridades / prioridade.
+        Com mais créditos do que isso o plano não muda.
+
+        Returns:
+            kWh necessários, ou None quando algum beneficiário não tem limite
+            (consumo_medio_kwh vazio/0 recebe a fatia proporcional de tudo)
+            e todos os créditos disponíveis entram no plano
+        """
+        soma_prioridades = float(sum(b['prioridade'] for b in beneficiarios)) or 1.0
+        necessario = 0.0
+        for benef in beneficiarios:
+            prioridade = float(benef['prioridade'])
+            if prioridade <= 0:
+                continue  # fatia proporcional nula: não recebe nada
+            solicitado = float(benef.get('consumo_medio_kwh') or 0)
+            if solicitado <= 0:
+                return None
+            necessario = max(necessario, solicitado * soma_prioridades / prioridade)
+        return necessario if necessario > 0 else None
+
+    def _travar_creditos_distribuicao(self, beneficiarios: List[dict]) -> List[dict]:
+        """
+        Trava (FOR UPDATE OF c SKIP LOCKED) só os primeiros créditos, na ordem
+        de consumo, cujo saldo acumulado cobre a demanda dos beneficiários
+        já escolhidos. Quando a demanda passa do total disponível, o prefixo
+        já é o conjunto inteiro e é usado como está. Só se alguma linha do
+        prefixo foi pulada (travada por outra transação, ou alterada antes
+        do lock) e o saldo obtido não basta, trava todos os disponíveis,
+        como antes, para que o plano seja o mesmo.
+        """
+        necessario = self._kwh_para_cobrir_demanda(beneficiarios)
+        if necessario is not None:
+            creditos = self.buscar_todos(_SELECT_PREFIXO_CREDITOS + _ORDEM_CREDITOS_TRAVA, (necessario,))
+            pulados = bool(creditos) and len(creditos) < creditos[0]['tamanho_prefixo']
+            if creditos and (not pulados or float(sum(c['quantidade_disponivel_kwh'] for c in creditos)) >= necessario):
+                return creditos
+        return self.buscar_todos(_SELECT_CREDITOS_DISPONIVEIS + _ORDEM_CREDITOS_TRAVA)
+
+    def _gravar_plano_distribuicao(self, fatias: List[dict]) -> List[dict]:
+        """
+        Grava um plano de distribuição em lote, dentro da transação corrente:
+        - INSERT multi-linha em transacao (RETURNING id_transacao com a chave
+          beneficiário/crédito de cada fatia)
+        - UPDATE ... FROM (VALUES ...) com saldo e status finais dos créditos
+        - INSERT multi-linha em historico_credito (um registro por fatia,
+          ligado à transação que o consumiu)
+        - UPDATE único marcando as entradas da fila como ATENDIDO
+        - Agregados dos doadores (distribuído e famílias atendidas)
+
+        Returns:
+            Lista de transações criadas (formato do retorno de executar_distribuicao)
+        """
+        from psycopg2.extras import execute_values
+
+        ids = {
+            'id_status_trans': self.dominios.obter_id('status_transacao', 'CONCLUIDA'),
+            'id_tipo_mov': self.dominios.obter_id('tipo_movimento', 'DISTRIBUICAO'),
+            'id_status_fila_atendido': self.dominios.obter_id('status_fila', 'ATENDIDO'),
+            'id_credito_parcial': self.dominios.obter_id('status_credito', 'PARCIALMENTE_UTILIZADO'),
+            'id_credito_esgotado': self.dominios.obter_id('status_credito', 'ESGOTADO')
+        }
+
+        # 1) Transações
+        linhas_trans = [
+            (f['quantidade_kwh'], f['id_beneficiario'], ids['id_status_trans'], ids['id_tipo_mov'], f['id_credito'])
+            for f in fatias
+        ]
+        retorno = execute_values(
+            self.cursor,
+            """
+            INSERT INTO transacao (
+                quantidade_kwh, data_transacao, id_beneficiario,
+                id_status_transacao, id_tipo_movimentacao, id_credito
+            )
+            VALUES %s
+            RETURNING id_transacao, id_beneficiario, id_credito
+            """,
+            linhas_trans,
+            template="(%s, CURRENT_DATE, %s, %s, %s, %s)",
+            page_size=1000,
+            fetch=True
+        )
+        # O Postgres não garante o RETURNING na ordem do VALUES: cada fatia
+        # recebe o id pela chave (id_beneficiario, id_credito)
+        ids_por_fatia: Dict[Tuple[int, int], List[int]] = {}
+        for linha in retorno:
+            ids_por_fatia.setdefault((linha['id_beneficiario'], linha['id_credito']), []).append(linha['id_transacao'])
+        for f in fatias:
+            f['id_transacao'] = ids_por_fatia[(f['id_beneficiario'], f['id_credito'])].pop()
+
+        # 2) Saldo e status final de cada crédito (créditos travados não estão expirados,
+        #    então o status é ESGOTADO ou PARCIALMENTE_UTILIZADO)
+        saldo_final = {}
+        for f in fatias:
+            saldo_final[f['id_credito']] = f['saldo_credito']
+        linhas_credito = [
+            (
+                id_credito,
+                saldo,
+                ids['id_credito_esgotado'] if saldo <= 0 else ids['id_credito_parcial']
+            )
+            for id_credito, saldo in saldo_final.items()
+        ]
+        execute_values(
+            self.cursor,
+            """
+            UPDATE credito AS c
+            SET quantidade_disponivel_kwh = v.nova_qtd,
+                id_status_credito = v.id_status
+            FROM (VALUES %s) AS v(id_credito, nova_qtd, id_status)
+            WHERE c.id_credito = v.id_credito
+            """,
+            linhas_credito,
+            template="(%s::int, %s::numeric, %s::int)",
+            page_size=1000
+        )
+
+        # 3) Histórico: saldo do crédito após cada fatia e a transação do consumo
+        execute_values(
+            self.cursor,
+            "INSERT INTO historico_credito (quantidade_kwh, data_movimento, id_credito, id_transacao) VALUES %s",
+            [(f['saldo_credito'], f['id_credito'], f['id_transacao']) for f in fatias],
+            template="(%s, CURRENT_DATE, %s, %s)",
+            page_size=1000
+        )
+
+        # 4) Fila: ATENDIDO para quem recebeu alguma fatia
+        ids_fila = sorted({f['id_fila'] for f in fatias})
+        self.executar(
+            "UPDATE fila_espera SET id_status_fila = %s WHERE id_fila = ANY(%s)",
+            (ids['id_status_fila_atendido'], ids_fila)
+        )
+
+        # 5) Totais dos doadores envolvidos
+        self._agregar_fatias_por_doador(fatias)
+
+        return [
+            {
+                'id_transacao': f['id_transacao'],
+                'id_beneficiario': f['id_beneficiario'],
+                'nome_beneficiario': f['nome'],
+                'id_credito': f['id_credito'],
+                'quantidade_kwh': f['quantidade_kwh']
+            }
+            for f in fatias
+        ]
+
+    def _distribuir_travados(
+        self, creditos: List[dict], beneficiarios: List[dict], ponto: Optional[str] = None
+    ) -> dict:
+        """
+        Distribui os créditos entre os beneficiários já travados pela
+        transação corrente (passos 3 a 7 de executar_distribuicao, também
+        usados por distribuir_credito_incremental) e faz o commit (ou libera
+        o ponto do chamador, ver _abrir_ponto).
+        """
+        # 3) Plano em memória
+        fatias = self._planejar_distribuicao(creditos, beneficiarios)
+
+        # 4) Gravação em lote
+        transacoes_criadas = self._gravar_plano_distribuicao(fatias) if fatias else []
+        total_distribuido = float(sum(t['quantidade_kwh'] for t in transacoes_criadas))
+
+        # 5) Entradas AGUARDANDO restantes de quem recebeu (o trigger
+        #    trg_atualizar_fila também pode ter encerrado outras entradas)
+        beneficiarios_distintos = {t['id_beneficiario'] for t in transacoes_criadas}
+        aguardando = self.buscar_todos("""
+            SELECT f.id_fila, f.id_beneficiario, f.prioridade, f.data_entrada
+            FROM fila_espera f
+            JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+            WHERE sf.descricao_status_fila = 'AGUARDANDO'
+                AND f.id_beneficiario = ANY(%s)
+        """, (sorted(beneficiarios_distintos),)) if beneficiarios_distintos else []
+
+        # 6) Commit
+        self._confirmar(ponto)
+
+        # 7) Auditoria só depois do commit (no modo assíncrono o log é gravado
+        #    em outra conexão e não seria desfeito junto com a distribuição)
+        self.registrar_log_auditoria(
+            id_usuario=None,
+            tipo_acao='DISTRIBUICAO',
+            detalhes=f"Distribuídos {total_distribuido:.2f} kWh em {len(transacoes_criadas)} transações"
+        )
+        self._apos_commit(self.posicoes_fila.sincronizar_beneficiarios, beneficiarios_distintos, aguardando)
+        if transacoes_criadas:
+            self._apos_commit(self.eventos.publicar, TipoEvento.DISTRIBUICAO, total_kwh=total_distribuido)
+
+        return {
+            'total_distribuido': round(total_distribuido, 2),
+            'beneficiarios_atendidos': len(beneficiarios_distintos),
+            'creditos_consumidos': len({t['id_credito'] for t in transacoes_criadas}),
+            'transacoes': transacoes_criadas
+        }
+
     def executar_distribuicao(self, limite: int = 10) -> dict:
+        """
+        Distribui créditos disponíveis para o topo da fila.
+
+        O plano é calculado em memória (_planejar_distribuicao) e gravado em
+        lote (_gravar_plano_distribuicao) dentro da mesma transação que trava
+        créditos e fila: o número de comandos não cresce com o de fatias.
+        A fila é lida primeiro para travar só os créditos que a demanda dela
+        consome (ver _travar_creditos_distribuicao); os demais continuam
+        livres para edição/exclusão de doações durante a distribuição.
+        """
         self._set_autocommit_safe(False)
+        ponto = self._abrir_ponto()
         try:
-            # 1) Créditos disponíveis com lock
-            query_creditos = """
-                SELECT c.id_credito, c.id_doador, c.quantidade_disponivel_kwh, c.data_expiracao
-                FROM credito c
-                JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
-                WHERE sc.descricao_status IN ('DISPONIVEL', 'PARCIALMENTE_UTILIZADO')
-                    AND c.quantidade_disponivel_kwh > 0
-                    AND (c.data_expiracao IS NULL OR c.data_expiracao > CURRENT_DATE)
-                ORDER BY c.data_expiracao NULLS LAST, c.id_credito
-                FOR UPDATE SKIP LOCKED
-            """
-            creditos = self.buscar_todos(query_creditos)
+            # 1) Top beneficiários com lock
+            beneficiarios = self.buscar_todos(_SELECT_TOPO_FILA, (limite,))
 
-            if not creditos:
-                self.conn.rollback()
-                self._set_autocommit_safe(True)
+            if not beneficiarios:
+                self._desfazer(ponto)
                 return {
                     'total_distribuido': 0.0,
                     'beneficiarios_atendidos': 0,
                     'creditos_consumidos': 0,
                     'transacoes': [],
-                    'mensagem': 'Nenhum crédito disponível'
+                    'mensagem': 'Nenhum beneficiário na fila'
                 }
 
-            total_kwh_disponivel = float(sum(c['quantidade_disponivel_kwh'] for c in creditos))
+            # 2) Créditos que cobrem a demanda, com lock
+            creditos = self._travar_creditos_distribuicao(beneficiarios)
 
-            # 2) Top beneficiários com lock
-            query_beneficiarios = """
-                SELECT f.id_fila, f.id_beneficiario, f.prioridade, f.consumo_medio_kwh,
-                    u.nome, u.email
-                FROM fila_espera f
-                JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
-                JOIN beneficiario b ON f.id_beneficiario = b.id_beneficiario
-                JOIN usuario u ON b.id_usuario = u.id_usuario
-                WHERE sf.descricao_status_fila = 'AGUARDANDO'
-                ORDER BY f.prioridade DESC, f.data_entrada ASC
-                LIMIT %s
-                FOR UPDATE OF f SKIP LOCKED
-            """
-            beneficiarios = self.buscar_todos(query_beneficiarios, (limite,))
-
-            if not beneficiarios:
-                self.conn.rollback()
-                self._set_autocommit_safe(True)
+            if not creditos:
+                self._desfazer(ponto)
                 return {
                     'total_distribuido': 0.0,
                     'beneficiarios_atendidos': 0,
                     'creditos_consumidos': 0,
                     'transacoes': [],
-                    'mensagem': 'Nenhum beneficiário na fila'
+                    'mensagem': 'Nenhum crédito disponível'
                 }
 
-            # Pré-buscas de IDs estáticos
-            id_status_trans = self.buscar_um(
-                "SELECT id_status_transacao FROM status_transacao WHERE descricao_status = 'CONCLUIDA'")['id_status_transacao']
-            id_tipo_mov = self.buscar_um(
-                "SELECT id_tipo_movimentacao FROM tipo_movimento WHERE descricao_tipo = 'DISTRIBUICAO'")['id_tipo_movimentacao']
-            id_status_fila_atendido = self.buscar_um(
-                "SELECT id_status_fila FROM status_fila WHERE descricao_status_fila = 'ATENDIDO'")['id_status_fila']
-
-            # 3) Alocações alvo (respeitando limite solicitado)
-            soma_prioridades = float(sum(b['prioridade'] for b in beneficiarios)) or 1.0
-            alocacoes = []
-            for benef in beneficiarios:
-                peso = float(benef['prioridade']) / soma_prioridades
-                kwh_alocado = total_kwh_disponivel * peso
-                solicitado = float(benef.get('consumo_medio_kwh') or 0)
-
-                #NUNCA distribuir mais do que foi solicitado
-                if solicitado > 0:
-                    kwh_alvo = min(kwh_alocado, solicitado)
-                else:
-                    kwh_alvo = kwh_alocado
-
-                alocacoes.append({
-                    'id_beneficiario': benef['id_beneficiario'],
-                    'id_fila': benef['id_fila'],
-                    'kwh_alvo': float(kwh_alvo),
-                    'nome': benef['nome']
-                })
+            # 3) a 7) Plano, gravação e commit
+            return self._distribuir_travados(creditos, beneficiarios, ponto)
 
-            # 4) Distribuição efetiva
-            total_distribuido = 0.0
-            transacoes_criadas = []
-            creditos_usados = set()
-
-            for alocacao in alocacoes:
-                kwh_restante = float(alocacao['kwh_alvo'])
-                distribuido_benef = 0.0
-
-                for credito in creditos:
-                    if kwh_restante <= 0.0:
-                        break
-                    if float(credito['quantidade_disponivel_kwh']) <= 0.0:
-                        continue
-
-                    kwh_consumir = float(min(kwh_restante, float(credito['quantidade_disponivel_kwh'])))
-
-                    #CRÍTICO: INCLUI id_credito na transação
-                    cursor_trans = self.executar(
-                        """
-                        INSERT INTO transacao (
-                            quantidade_kwh, data_transacao, id_beneficiario,
-                            id_status_transacao, id_tipo_movimentacao, id_credito
-                        )
-                        VALUES (%s, CURRENT_DATE, %s, %s, %s, %s)
-                        RETURNING id_transacao
-                        """,
-                        (kwh_consumir, alocacao['id_beneficiario'], id_status_trans, id_tipo_mov, credito['id_credito'])
-                    )
-                    id_transacao = cursor_trans.fetchone()['id_transacao']
+        except Exception as e:
+            self._desfazer(ponto)
+            raise Exception(f"Erro na distribuição: {str(e)}")
+        finally:
+            self._set_autocommit_safe(True)
 
-                    # Debita crédito
-                    nova_qtd = float(credito['quantidade_disponivel_kwh']) - kwh_consumir
-                    self.executar(
-                        "UPDATE credito SET quantidade_disponivel_kwh = %s WHERE id_credito = %s",
-                        (nova_qtd, credito['id_credito'])
-                    )
+    def distribuir_credito_incremental(self, id_credito: int, limite: int = 10) -> dict:
+        """
+        Distribui apenas um crédito (ex.: a doação que acabou de chegar) para
+        o topo da fila, com as mesmas regras de executar_distribuicao.
 
-                    # Atualiza status do crédito
-                    self.atualizar_status_credito(credito['id_credito'])
-
-                    # Histórico
-                    self.registrar_historico_credito(
-                        id_credito=credito['id_credito'],
-                        evento='CONSUMO',
-                        detalhe={
-                            'quantidade_consumida': kwh_consumir,
-                            'id_beneficiario': alocacao['id_beneficiario'],
-                            'id_transacao': id_transacao
-                        }
-                    )
+        Trava só a linha do crédito e as `limite` entradas da fila escolhidas:
+        o custo acompanha o tamanho da doação, não o total de créditos
+        disponíveis, e doações concorrentes não disputam os mesmos locks.
+        O que sobrar do crédito fica disponível para a próxima rodada.
 
-                    # Atualiza acumuladores
-                    credito['quantidade_disponivel_kwh'] = nova_qtd
-                    total_distribuido += kwh_consumir
-                    distribuido_benef += kwh_consumir
-                    kwh_restante -= kwh_consumir
-                    creditos_usados.add(credito['id_credito'])
-
-                    transacoes_criadas.append({
-                        'id_transacao': id_transacao,
-                        'id_beneficiario': alocacao['id_beneficiario'],
-                        'nome_beneficiario': alocacao['nome'],
-                        'id_credito': credito['id_credito'],
-                        'quantidade_kwh': kwh_consumir
-                    })
-
-                # MARCA ATENDIDO APENAS SE RECEBEU ALGO
-                if distribuido_benef > 0.0:
-                    self.executar(
-                        "UPDATE fila_espera SET id_status_fila = %s WHERE id_fila = %s",
-                        (id_status_fila_atendido, alocacao['id_fila'])
-                    )
+        Returns:
+            Formato de executar_distribuicao, mais 'id_credito' e
+            'saldo_restante' (kWh do crédito após a rodada)
+        """
+        self._set_autocommit_safe(False)
+        ponto = self._abrir_ponto()
+        try:
+            # 1) Só o crédito informado (SKIP LOCKED: outra rodada já está com ele)
+            creditos = self.buscar_todos(_SELECT_CREDITOS_DISPONIVEIS + """
+                AND c.id_credito = %s
+                FOR UPDATE OF c SKIP LOCKED
+            """, (id_credito,))
 
-            # 5) Auditoria
-            self.registrar_log_auditoria(
-                id_usuario=None,
-                tipo_acao='DISTRIBUICAO',
-                detalhes=f"Distribuídos {total_distribuido:.2f} kWh em {len(transacoes_criadas)} transações"
-            )
+            if not creditos:
+                self._desfazer(ponto)
+                return {
+                    'id_credito': id_credito,
+                    'total_distribuido': 0.0,
+                    'beneficiarios_atendidos': 0,
+                    'creditos_consumidos': 0,
+                    'transacoes': [],
+                    'saldo_restante': 0.0,
+                    'mensagem': 'Crédito indisponível ou em uso por outra distribuição'
+                }
 
-            # 6) Commit
-            self.conn.commit()
+            # 2) Top beneficiários com lock
+            beneficiarios = self.buscar_todos(_SELECT_TOPO_FILA, (limite,))
 
-            beneficiarios_distintos = {t['id_beneficiario'] for t in transacoes_criadas}
-            return {
-                'total_distribuido': round(total_distribuido, 2),
-                'beneficiarios_atendidos': len(beneficiarios_distintos),
-                'creditos_consumidos': len(creditos_usados),
-                'transacoes': transacoes_criadas
-            }
+            if not beneficiarios:
+                self._desfazer(ponto)
+                return {
+                    'id_credito': id_credito,
+                    'total_distribuido': 0.0,
+                    'beneficiarios_atendidos': 0,
+                    'creditos_consumidos': 0,
+                    'transacoes': [],
+                    'saldo_restante': float(creditos[0]['quantidade_disponivel_kwh']),
+                    'mensagem': 'Nenhum beneficiário na fila'
+                }
+
+            # 3) a 7) Plano, gravação e commit
+            resultado = self._distribuir_travados(creditos, beneficiarios, ponto)
+            saldo = float(creditos[0]['quantidade_disponivel_kwh']) - sum(
+                t['quantidade_kwh'] for t in resultado['transacoes']
+            )
+            return {'id_credito': id_credito, **resultado, 'saldo_restante': round(max(saldo, 0.0), 4)}
 
         except Exception as e:
-            self.conn.rollback()
-            raise Exception(f"Erro na distribuição: {str(e)}")
+            self._desfazer(ponto)
+            raise Exception(f"Erro na distribuição do crédito {id_credito}: {str(e)}")
         finally:
             self._set_autocommit_safe(True)
 
+    def solicitar_distribuicao(
+        self,
+        motivo: str,
+        id_credito: Optional[int] = None,
+        limite: int = 10,
+        imediato: bool = False
+    ) -> dict:
+        """
+        Pede uma distribuição de créditos.
+
+        Com o agendador ativo só agenda e volta na hora (retorno com
+        'agendada': True, 'id_job' e 'status'); dentro de conexao_requisicao
+        com a transação aberta, o agendamento fica para depois do commit e
+        'id_job' vem None. Sem o agendador, executa na própria requisição: distribuir_credito_incremental(id_credito) quando o pedido
+        vem de um crédito novo, executar_distribuicao(limite) nos demais casos.
+
+        Args:
+            motivo: Origem do pedido ('doacao', 'fila', 'admin'...)
+            id_credito: Crédito novo que motivou o pedido; sem ele, a rodada
+                considera todos os créditos disponíveis
+            limite: Beneficiários por rodada
+            imediato: Sem esperar a janela de agrupamento do agendador
+        """
+        agendador = self.agendador_distribuicao
+        if agendador is not None and agendador.ativo:
+            if getattr(self._local, 'escopo', False) and self._em_transacao():
+                # A thread do agendador usa outra conexão e não enxergaria a
+                # fila/crédito ainda não confirmados: só agenda depois do commit
+                self._apos_commit(
+                    agendador.solicitar, motivo, id_credito=id_credito, limite=limite, imediato=imediato
+                )
+                return {'agendada': True, 'id_job': None, 'status': 'AGENDADO'}
+            trabalho = agendador.solicitar(motivo, id_credito=id_credito, limite=limite, imediato=imediato)
+            if trabalho is not None:
+                return {'agendada': True, **trabalho}
+        if id_credito is not None:
+            return {'agendada': False, **self.distribuir_credito_incremental(id_credito, limite=limite)}
+        return {'agendada': False, **self.executar_distribuicao(limite=limite)}
+
     def gerar_codigo_recuperacao(self, email):
         """
         Gera código de recuperação para o email informado.
@@ -1109,6 +2147,7 @@ class Database:
         codigo = ''.join([str(random.randint(0, 9)) for _ in range(6)])
 
         # Remove códigos antigos deste email
+        ponto = self._abrir_ponto()
         query_delete = "DELETE FROM codigo_recuperacao WHERE email = %s"
         self.executar(query_delete, (email,))
 
@@ -1121,10 +2160,10 @@ class Database:
     
         #COMMIT para garantir persistência
         try:
-            self.conn.commit()
+            self._confirmar(ponto)
         except Exception:
             try:
-                self.conn.rollback()
+                self._desfazer(ponto)
             except Exception:
                 pass
 
@@ -1151,6 +2190,7 @@ class Database:
             return 'INVALIDO'
 
         minutos = float(resultado.get('minutos_passados', 0))
+        ponto = self._abrir_ponto()
 
         # Se passou mais do que 15 minutos -> expirado
         if minutos > 15:
@@ -1159,14 +2199,14 @@ class Database:
             try:
                 self.executar("DELETE FROM codigo_recuperacao WHERE email = %s AND codigo = %s", (email, codigo))
                 try:
-                    self.conn.commit()
+                    self._confirmar(ponto)
                 except Exception:
                     try:
-                        self.conn.rollback()
+                        self._desfazer(ponto)
                     except Exception:
                         pass
             except Exception:
-                pass
+                self._desfazer(ponto)
             return 'EXPIRADO'
 
         # Código encontrado e dentro do prazo
@@ -1175,14 +2215,14 @@ class Database:
         try:
             self.executar("DELETE FROM codigo_recuperacao WHERE email = %s AND codigo = %s", (email, codigo))
             try:
-                self.conn.commit()
+                self._confirmar(ponto)
             except Exception:
                 try:
-                    self.conn.rollback()
+                    self._desfazer(ponto)
                 except Exception:
                     pass
         except Exception:
-            pass
+            self._desfazer(ponto)
 
         return 'OK'
 
@@ -1190,6 +2230,7 @@ class Database:
         """
         Reseta senha do usuário após validação do código.
         """
+        ponto = self._abrir_ponto()
         try:
             # Busca credencial do usuário
             query = """
@@ -1210,10 +2251,11 @@ class Database:
                 WHERE id_credencial = %s
             """
             self.executar(query_update, (nova_senha, resultado['id_credencial']))
+            self._confirmar(ponto)
         
             return True
         
         except Exception as e:
             print(f"Erro ao resetar senha: {e}")
-            self.conn.rollback()
+            self._desfazer(ponto)
             return False
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Tarefas de manutenção do banco (executar a partir da raiz do projeto).
+
+Uso:
+    python BackEnd/manutencao.py reconstruir-agregados [--doador ID]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import Database
+
+
+def reconstruir_agregados(db: Database, args) -> None:
+    """Recalcula doador_agregado a partir de credito/transacao."""
+    total = db.reconstruir_agregados_doador(args.doador)
+    alvo = f"doador #{args.doador}" if args.doador else "todos os doadores"
+    print(f"✅ Agregados reconstruídos ({alvo}): {total} linha(s) atualizada(s)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manutenção do banco Energia Para Todos")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_agregados = comandos.add_parser(
+        'reconstruir-agregados',
+        help='Backfill/correção de quantidade_inicial_kwh e doador_agregado'
+    )
+    p_agregados.add_argument('--doador', type=int, default=None, help='Somente este id_doador')
+    p_agregados.set_defaults(funcao=reconstruir_agregados)
+
+    args = parser.parse_args()
+
+    db = Database()
+    if db.conn is None:
+        print("❌ Sem conexão com o banco")
+        return 1
+    try:
+        args.funcao(db, args)
+        return 0
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.fechar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -612,4 +612,120 @@ ALTER TABLE transacao
 ADD COLUMN IF NOT EXISTS id_credito INTEGER REFERENCES credito(id_credito);
 
 -- Cria índice para performance
-CREATE INDEX IF NOT EXISTS idx_transacao_credito ON transacao(id_credito);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_transacao_credito ON transacao(id_credito);
+
+-- Transação que consumiu o crédito em cada movimento do histórico
+ALTER TABLE historico_credito
+ADD COLUMN IF NOT EXISTS id_transacao INTEGER REFERENCES transacao(id_transacao) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_historico_credito_transacao ON historico_credito(id_transacao);
+
+-- ============================================
+-- AGREGADOS DO DOADOR
+-- Totais mantidos pela aplicação na mesma transação que cria créditos e
+-- distribui (Database.criar_credito / executar_distribuicao), para que o
+-- painel do doador e a lista do admin não somem o histórico de transações.
+-- Para recalcular: python BackEnd/manutencao.py reconstruir-agregados
+-- ============================================
+
+-- Quantidade original do crédito (quantidade_disponivel_kwh diminui ao distribuir)
+ALTER TABLE credito
+ADD COLUMN IF NOT EXISTS quantidade_inicial_kwh DECIMAL(10,2);
+
+UPDATE credito c
+SET quantidade_inicial_kwh = c.quantidade_disponivel_kwh + COALESCE(
+    (SELECT SUM(t.quantidade_kwh)
+     FROM transacao t
+     JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+     WHERE t.id_credito = c.id_credito
+       AND st.descricao_status = 'CONCLUIDA'),
+    0
+)
+WHERE c.quantidade_inicial_kwh IS NULL;
+
+-- Totais por doador
+CREATE TABLE IF NOT EXISTS doador_agregado (
+    id_doador INTEGER PRIMARY KEY REFERENCES doador(id_doador) ON DELETE CASCADE,
+    total_doado_kwh DECIMAL(14,2) NOT NULL DEFAULT 0,
+    total_distribuido_kwh DECIMAL(14,2) NOT NULL DEFAULT 0,
+    familias_atendidas INTEGER NOT NULL DEFAULT 0,
+    data_atualizacao TIMESTAMP DEFAULT NOW()
+);
+
+-- Pares doador/beneficiário já atendidos (conta famílias distintas sem COUNT DISTINCT)
+CREATE TABLE IF NOT EXISTS doador_beneficiario_atendido (
+    id_doador INTEGER NOT NULL REFERENCES doador(id_doador) ON DELETE CASCADE,
+    id_beneficiario INTEGER NOT NULL REFERENCES beneficiario(id_beneficiario) ON DELETE CASCADE,
+    PRIMARY KEY (id_doador, id_beneficiario)
+);
+
+-- Backfill inicial
+INSERT INTO doador_beneficiario_atendido (id_doador, id_beneficiario)
+SELECT DISTINCT c.id_doador, t.id_beneficiario
+FROM transacao t
+JOIN credito c ON t.id_credito = c.id_credito
+JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+WHERE st.descricao_status = 'CONCLUIDA'
+ON CONFLICT DO NOTHING;
+
+INSERT INTO doador_agregado (id_doador, total_doado_kwh, total_distribuido_kwh, familias_atendidas)
+SELECT
+    d.id_doador,
+    COALESCE((SELECT SUM(c.quantidade_inicial_kwh) FROM credito c WHERE c.id_doador = d.id_doador), 0),
+    COALESCE((SELECT SUM(t.quantidade_kwh)
+              FROM transacao t
+              JOIN credito c ON t.id_credito = c.id_credito
+              JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+              WHERE c.id_doador = d.id_doador
+                AND st.descricao_status = 'CONCLUIDA'), 0),
+    (SELECT COUNT(*) FROM doador_beneficiario_atendido a WHERE a.id_doador = d.id_doador)
+FROM doador d
+ON CONFLICT (id_doador) DO NOTHING;
+
+-- ============================================
+-- SESSÕES HTTP COMPARTILHADAS
+-- Usada quando o servidor roda com iniciar_servidor(backend_sessoes='postgres'),
+-- para que vários processos enxerguem as mesmas sessões. UNLOGGED: sem WAL
+-- (sessões são descartáveis; um crash do banco apenas desloga os usuários).
+-- ============================================
+
+CREATE UNLOGGED TABLE IF NOT EXISTS sessao_http (
+    sid VARCHAR(64) PRIMARY KEY,
+    dados JSONB NOT NULL,
+    expira_em TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sessao_http_expira ON sessao_http (expira_em);
+
+-- ============================================
+-- ÍNDICES DA PAGINAÇÃO POR CHAVE
+-- Mesma ordem das listagens do admin (utils/paginacao.py): cada página é uma
+-- busca no índice a partir da última linha vista, sem OFFSET.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_fila_espera_ordem
+    ON fila_espera (prioridade DESC, data_entrada ASC, id_fila ASC);
+
+CREATE INDEX IF NOT EXISTS idx_log_auditoria_data
+    ON log_auditoria (data_hora DESC, id_log DESC);
+
+CREATE INDEX IF NOT EXISTS idx_credito_doador
+    ON credito (id_doador, id_credito DESC);
+
+-- Ação registrada por /api/admin/exportar
+INSERT INTO TIPO_ACAO (DESCRICAO_TIPO_ACAO) VALUES ('EXPORTACAO')
+ON CONFLICT (DESCRICAO_TIPO_ACAO) DO NOTHING;
+
+-- ============================================
+-- LIMITE DE TENTATIVAS (LOGIN / RECUPERAÇÃO DE SENHA)
+-- Baldes de tokens compartilhados entre processos, usados quando o servidor
+-- roda com iniciar_servidor(backend_admissao='postgres'). UNLOGGED: perder
+-- os contadores num crash do banco apenas zera os limites.
+-- ============================================
+
+CREATE UNLOGGED TABLE IF NOT EXISTS limite_taxa (
+    chave VARCHAR(200) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    admitida BOOLEAN NOT NULL DEFAULT TRUE,
+    atualizado_em TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
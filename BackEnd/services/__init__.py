@@ -1,10 +1,14 @@
 #criando as logicas de negocios e das operações que sera feita na plataforma
+from services.agendador_distribuicao import AgendadorDistribuicao
 from services.distribuidor_creditos import DistribuidorCreditos
 from services.gerador_relatorio import GeradorRelatorios
 from services.painel_transparencia import PainelTransparencia
+from services.posicao_fila import IndicePosicaoFila
 
 __all__ = [
+    'AgendadorDistribuicao',
     'DistribuidorCreditos',
     'GeradorRelatorios',
-    'PainelTransparencia'
+    'PainelTransparencia',
+    'IndicePosicaoFila'
 ]
@@ -0,0 +1,301 @@
+"""
+Serviço AgendadorDistribuicao - distribuição de créditos em segundo plano.
+
+As requisições só sinalizam "distribuição necessária"; uma única thread
+junta as solicitações que chegam em rajada e executa uma rodada por vez.
+"""
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class AgendadorDistribuicao:
+    """
+    Agrupa solicitações de distribuição em trabalhos (jobs) executados por
+    uma thread de fundo.
+
+    - solicitar(): junta a solicitação ao trabalho AGENDADO (ou cria um) e
+      volta na hora com o id do trabalho
+    - O trabalho começa quando passa `janela` segundos sem novas solicitações
+      (debounce) ou `atraso_maximo` segundos após a primeira, o que vier antes;
+      imediato=True (ex.: pedido do administrador) dispensa a espera
+    - Solicitações que chegam durante uma execução vão para o próximo
+      trabalho (a rodada em andamento pode não ver os créditos novos)
+    - Cada trabalho repete `executar(limite)` enquanto a rodada anterior
+      atender `limite` beneficiários, até `max_rodadas`: 100 doações viram
+      um trabalho, mas a fila continua sendo atendida como antes
+    - Trabalho em que toda solicitação trouxe o crédito novo (até
+      `max_incrementais` créditos) usa `executar_credito` em cada um deles:
+      só esses créditos são travados, não todos os disponíveis
+    - status(id_job) / trabalhos(): progresso e resultado dos últimos
+      `max_historico` trabalhos
+    - encerrar() (também registrado em atexit) executa o trabalho pendente
+      antes de parar
+    """
+
+    def __init__(
+        self,
+        executar: Callable[[int], Dict[str, Any]],
+        executar_credito: Optional[Callable[[int, int], Dict[str, Any]]] = None,
+        janela: float = 0.5,
+        atraso_maximo: float = 5.0,
+        limite: int = 10,
+        max_rodadas: int = 50,
+        max_incrementais: int = 100,
+        max_historico: int = 100
+    ):
+        """
+        Args:
+            executar: Executa uma rodada de distribuição para até `limite`
+                beneficiários e devolve o resultado de Database.executar_distribuicao
+            executar_credito: Rodada incremental (id_credito, limite), no formato
+                de Database.distribuir_credito_incremental; None = sempre completa
+            janela: Segundos sem novas solicitações antes de executar
+            atraso_maximo: Espera máxima desde a primeira solicitação do trabalho
+            limite: Beneficiários por rodada (padrão dos pedidos sem limite)
+            max_rodadas: Rodadas por trabalho (por crédito, no modo incremental)
+            max_incrementais: Acima desse número de créditos novos o trabalho
+                faz rodadas completas
+            max_historico: Trabalhos concluídos mantidos para consulta
+        """
+        self._executar = executar
+        self._executar_credito = executar_credito
+        self.janela = janela
+        self.atraso_maximo = atraso_maximo
+        self.limite = limite
+        self.max_rodadas = max_rodadas
+        self.max_incrementais = max_incrementais
+        self.max_historico = max_historico
+
+        self._condicao = threading.Condition()
+        self._pendente: Optional[Dict[str, Any]] = None
+        self._em_execucao: Optional[Dict[str, Any]] = None
+        self._historico: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._proximo_id = 1
+        self._thread: Optional[threading.Thread] = None
+        self._encerrado = False
+        self._estatisticas = {
+            'solicitacoes': 0,
+            'agrupadas': 0,
+            'trabalhos': 0,
+            'rodadas': 0,
+            'rodadas_incrementais': 0,
+            'falhas': 0,
+            'beneficiarios_atendidos': 0
+        }
+
+    # ============================================
+    # CICLO DE VIDA
+    # ============================================
+
+    def iniciar(self) -> 'AgendadorDistribuicao':
+        """Inicia a thread de distribuição (idempotente)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='agendador-distribuicao', daemon=True)
+            self._thread.start()
+            atexit.register(self.encerrar)
+        return self
+
+    def encerrar(self, timeout: float = 30.0) -> None:
+        """Para de aceitar solicitações; o trabalho pendente ainda é executado."""
+        with self._condicao:
+            if self._encerrado:
+                return
+            self._encerrado = True
+            self._condicao.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and not self._encerrado
+
+    # ============================================
+    # PRODUTORES
+    # ============================================
+
+    def solicitar(
+        self,
+        motivo: str,
+        id_credito: Optional[int] = None,
+        limite: Optional[int] = None,
+        imediato: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Sinaliza que a distribuição precisa rodar.
+
+        Args:
+            motivo: Origem do pedido ('doacao', 'fila', 'admin'...)
+            id_credito: Crédito novo que motivou o pedido; sem ele o trabalho
+                faz rodadas completas (todos os créditos disponíveis)
+            limite: Beneficiários por rodada (o trabalho usa o maior pedido)
+            imediato: Executa sem esperar a janela de agrupamento
+
+        Returns:
+            Situação do trabalho (ver status) ou None se o agendador não
+            está ativo (quem chama distribui de forma síncrona)
+        """
+        with self._condicao:
+            if not self.ativo:
+                return None
+            agora = time.monotonic()
+            trabalho = self._pendente
+            if trabalho is None:
+                trabalho = self._pendente = {
+                    'id_job': self._proximo_id,
+                    'status': 'AGENDADO',
+                    'solicitacoes': 0,
+                    'motivos': {},
+                    'ids_credito': [],
+                    'limite': limite or self.limite,
+                    'imediato': False,
+                    'completa': self._executar_credito is None,
+                    'criado_em': datetime.now().isoformat(timespec='seconds'),
+                    'iniciado_em': None,
+                    'concluido_em': None,
+                    'rodadas': 0,
+                    'beneficiarios_atendidos': 0,
+                    'creditos_consumidos': 0,
+                    'transacoes': 0,
+                    'total_distribuido': 0.0,
+                    'erro': None,
+                    '_primeira': agora,
+                }
+                self._proximo_id += 1
+            else:
+                self._estatisticas['agrupadas'] += 1
+            trabalho['solicitacoes'] += 1
+            trabalho['motivos'][motivo] = trabalho['motivos'].get(motivo, 0) + 1
+            if id_credito is None or len(trabalho['ids_credito']) >= self.max_incrementais:
+                trabalho['completa'] = True
+            elif id_credito not in trabalho['ids_credito']:
+                trabalho['ids_credito'].append(id_credito)
+            trabalho['limite'] = max(trabalho['limite'], limite or 0)
+            trabalho['imediato'] = trabalho['imediato'] or imediato
+            trabalho['_ultima'] = agora
+            self._estatisticas['solicitacoes'] += 1
+            self._condicao.notify_all()
+            return self._copia(trabalho)
+
+    # ============================================
+    # CONSULTA
+    # ============================================
+
+    @staticmethod
+    def _copia(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        copia = {k: v for k, v in trabalho.items() if not k.startswith('_')}
+        copia['motivos'] = dict(trabalho['motivos'])
+        copia['ids_credito'] = list(trabalho['ids_credito'])
+        return copia
+
+    def status(self, id_job: int) -> Optional[Dict[str, Any]]:
+        """Situação de um trabalho (AGENDADO, EXECUTANDO, CONCLUIDO ou FALHOU); None se desconhecido."""
+        with self._condicao:
+            for trabalho in (self._pendente, self._em_execucao):
+                if trabalho is not None and trabalho['id_job'] == id_job:
+                    return self._copia(trabalho)
+            trabalho = self._historico.get(id_job)
+            return self._copia(trabalho) if trabalho is not None else None
+
+    def trabalhos(self, limite: int = 20) -> List[Dict[str, Any]]:
+        """Trabalhos mais recentes primeiro (pendente, em execução e concluídos)."""
+        with self._condicao:
+            lista = [t for t in (self._pendente, self._em_execucao) if t is not None]
+            lista += list(reversed(self._historico.values()))
+            return [self._copia(t) for t in lista[:limite]]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores do agendador."""
+        with self._condicao:
+            return {
+                **self._estatisticas,
+                'pendente': self._pendente is not None,
+                'executando': self._em_execucao is not None
+            }
+
+    # ============================================
+    # CONSUMIDOR
+    # ============================================
+
+    def _aguardar_trabalho(self) -> Optional[Dict[str, Any]]:
+        """Espera a janela do trabalho pendente fechar e o move para execução."""
+        with self._condicao:
+            while self._pendente is None:
+                if self._encerrado:
+                    return None
+                self._condicao.wait()
+            while not self._encerrado and not self._pendente['imediato']:
+                prazo = min(
+                    self._pendente['_ultima'] + self.janela,
+                    self._pendente['_primeira'] + self.atraso_maximo
+                )
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicao.wait(restante)
+            trabalho, self._pendente = self._pendente, None
+            trabalho['status'] = 'EXECUTANDO'
+            trabalho['iniciado_em'] = datetime.now().isoformat(timespec='seconds')
+            self._em_execucao = trabalho
+            return trabalho
+
+    def _loop(self) -> None:
+        while True:
+            trabalho = self._aguardar_trabalho()
+            if trabalho is None:
+                return
+            self._processar(trabalho)
+
+    def _rodadas(self, trabalho: Dict[str, Any], rodada: Callable[[], Dict[str, Any]]) -> None:
+        """Repete a rodada enquanto ela atender `limite` beneficiários (e sobrar crédito)."""
+        limite = trabalho['limite']
+        for _ in range(self.max_rodadas):
+            resultado = rodada()
+            atendidos = resultado.get('beneficiarios_atendidos', 0)
+            with self._condicao:
+                trabalho['rodadas'] += 1
+                trabalho['beneficiarios_atendidos'] += atendidos
+                trabalho['creditos_consumidos'] += resultado.get('creditos_consumidos', 0)
+                trabalho['transacoes'] += len(resultado.get('transacoes', []))
+                trabalho['total_distribuido'] = round(
+                    trabalho['total_distribuido'] + float(resultado.get('total_distribuido', 0)), 2
+                )
+                self._estatisticas['rodadas'] += 1
+                if 'id_credito' in resultado:
+                    self._estatisticas['rodadas_incrementais'] += 1
+                self._estatisticas['beneficiarios_atendidos'] += atendidos
+            # Rodada incompleta: faltou crédito ou beneficiário
+            if atendidos < limite or resultado.get('saldo_restante', 1) <= 0:
+                break
+
+    def _processar(self, trabalho: Dict[str, Any]) -> None:
+        limite = trabalho['limite']
+        try:
+            if trabalho['completa']:
+                self._rodadas(trabalho, lambda: self._executar(limite))
+            else:
+                for id_credito in trabalho['ids_credito']:
+                    self._rodadas(trabalho, lambda id_credito=id_credito: self._executar_credito(id_credito, limite))
+            status, erro = 'CONCLUIDO', None
+        except Exception as e:
+            print(f"ERRO na distribuição agendada (job {trabalho['id_job']}): {e}")
+            status, erro = 'FALHOU', str(e)
+
+        with self._condicao:
+            trabalho['status'] = status
+            trabalho['erro'] = erro
+            trabalho['concluido_em'] = datetime.now().isoformat(timespec='seconds')
+            self._estatisticas['trabalhos'] += 1
+            if erro:
+                self._estatisticas['falhas'] += 1
+            self._em_execucao = None
+            self._historico[trabalho['id_job']] = trabalho
+            while len(self._historico) > self.max_historico:
+                self._historico.popitem(last=False)
+
+    def __repr__(self) -> str:
+        return (f"<AgendadorDistribuicao(trabalhos={self._estatisticas['trabalhos']}, "
+                f"solicitacoes={self._estatisticas['solicitacoes']})>")
@@ -0,0 +1,276 @@
+"""
+Serviço IndicePosicaoFila - posição na fila de espera em memória.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+Chave = Tuple[int, datetime, int]
+
+QUERY_CARGA = """
+    SELECT f.id_fila, f.id_beneficiario, f.prioridade, f.data_entrada
+    FROM fila_espera f
+    JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+    WHERE sf.descricao_status_fila = 'AGUARDANDO'
+"""
+
+
+class IndicePosicaoFila:
+    """
+    Índice ordenado das entradas AGUARDANDO de fila_espera.
+
+    A ordem é a mesma da fila no banco: prioridade DESC, data_entrada ASC
+    (id_fila desempata). As chaves ficam em blocos ordenados de até
+    2 * `tamanho_bloco` itens, com uma árvore de Fenwick sobre o tamanho
+    dos blocos, então posicao() custa O(log n) e inserir()/remover()
+    custam O(log n + tamanho_bloco).
+
+    - carregar(): lê todas as entradas AGUARDANDO do banco
+    - inserir()/atualizar()/remover(): mantêm o índice após cada alteração
+      confirmada na fila
+    - A cada `intervalo_ressincronizacao` segundos a próxima leitura recarrega
+      do banco, corrigindo alterações feitas fora da aplicação (triggers, SQL manual)
+    """
+
+    def __init__(
+        self,
+        buscar_todos: Callable[[str], List[Dict[str, Any]]],
+        intervalo_ressincronizacao: Optional[float] = 300.0,
+        tamanho_bloco: int = 256
+    ):
+        self._buscar_todos = buscar_todos
+        self.intervalo_ressincronizacao = intervalo_ressincronizacao
+        self.tamanho_bloco = tamanho_bloco
+
+        self._blocos: List[List[Chave]] = []
+        self._maximos: List[Chave] = []
+        self._arvore: List[int] = [0]
+        self._chaves: Dict[int, Chave] = {}
+        self._beneficiarios: Dict[int, int] = {}
+        self._carregado_em: Optional[float] = None
+        self._lock = threading.RLock()
+
+    # ============================================
+    # CHAVES
+    # ============================================
+
+    @staticmethod
+    def _normalizar_data(data_entrada) -> datetime:
+        # Os conversores de tipo do Database devolvem datas como string ISO
+        if data_entrada is None:
+            return datetime.max
+        if isinstance(data_entrada, str):
+            return datetime.fromisoformat(data_entrada)
+        return data_entrada
+
+    @classmethod
+    def _chave(cls, id_fila: int, prioridade, data_entrada) -> Chave:
+        return (-int(prioridade or 0), cls._normalizar_data(data_entrada), int(id_fila))
+
+    # ============================================
+    # ÁRVORE DE FENWICK (tamanho dos blocos)
+    # ============================================
+
+    def _reconstruir_arvore(self) -> None:
+        n = len(self._blocos)
+        arvore = [0] * (n + 1)
+        for i, bloco in enumerate(self._blocos, start=1):
+            arvore[i] += len(bloco)
+            pai = i + (i & -i)
+            if pai <= n:
+                arvore[pai] += arvore[i]
+        self._arvore = arvore
+
+    def _somar_arvore(self, indice_bloco: int, delta: int) -> None:
+        i = indice_bloco + 1
+        while i < len(self._arvore):
+            self._arvore[i] += delta
+            i += i & -i
+
+    def _itens_antes_do_bloco(self, indice_bloco: int) -> int:
+        total = 0
+        i = indice_bloco
+        while i > 0:
+            total += self._arvore[i]
+            i -= i & -i
+        return total
+
+    # ============================================
+    # BLOCOS
+    # ============================================
+
+    def _inserir_chave(self, chave: Chave) -> None:
+        if not self._blocos:
+            self._blocos.append([chave])
+            self._maximos.append(chave)
+            self._reconstruir_arvore()
+            return
+
+        i = min(bisect_left(self._maximos, chave), len(self._blocos) - 1)
+        bloco = self._blocos[i]
+        insort(bloco, chave)
+        self._maximos[i] = bloco[-1]
+
+        if len(bloco) > 2 * self.tamanho_bloco:
+            metade = len(bloco) // 2
+            self._blocos[i:i + 1] = [bloco[:metade], bloco[metade:]]
+            self._maximos[i:i + 1] = [bloco[metade - 1], bloco[-1]]
+            self._reconstruir_arvore()
+        else:
+            self._somar_arvore(i, 1)
+
+    def _remover_chave(self, chave: Chave) -> None:
+        i = bisect_left(self._maximos, chave)
+        if i >= len(self._blocos):
+            return
+        bloco = self._blocos[i]
+        j = bisect_left(bloco, chave)
+        if j >= len(bloco) or bloco[j] != chave:
+            return
+
+        del bloco[j]
+        if not bloco:
+            del self._blocos[i]
+            del self._maximos[i]
+            self._reconstruir_arvore()
+        else:
+            self._maximos[i] = bloco[-1]
+            self._somar_arvore(i, -1)
+
+    # ============================================
+    # CARGA
+    # ============================================
+
+    def carregar(self) -> None:
+        """Lê as entradas AGUARDANDO do banco e reconstrói o índice."""
+        with self._lock:
+            linhas = self._buscar_todos(QUERY_CARGA) or []
+
+            chaves: Dict[int, Chave] = {}
+            beneficiarios: Dict[int, int] = {}
+            for linha in linhas:
+                chave = self._chave(linha['id_fila'], linha['prioridade'], linha['data_entrada'])
+                chaves[chave[2]] = chave
+                beneficiarios[chave[2]] = linha['id_beneficiario']
+
+            ordenadas = sorted(chaves.values())
+            self._blocos = [
+                ordenadas[i:i + self.tamanho_bloco]
+                for i in range(0, len(ordenadas), self.tamanho_bloco)
+            ]
+            self._maximos = [bloco[-1] for bloco in self._blocos]
+            self._chaves = chaves
+            self._beneficiarios = beneficiarios
+            self._reconstruir_arvore()
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self) -> None:
+        """Força recarga do banco na próxima leitura."""
+        self._carregado_em = None
+
+    def _garantir_carregado(self) -> None:
+        carregado_em = self._carregado_em
+        if carregado_em is None or (
+            self.intervalo_ressincronizacao is not None
+            and time.monotonic() - carregado_em > self.intervalo_ressincronizacao
+        ):
+            self.carregar()
+
+    # ============================================
+    # ALTERAÇÕES (chamar após o commit)
+    # ============================================
+
+    def inserir(self, id_fila: int, prioridade, data_entrada, id_beneficiario: Optional[int] = None) -> None:
+        """Adiciona (ou reposiciona) uma entrada AGUARDANDO."""
+        with self._lock:
+            if self._carregado_em is None:
+                # Ainda não carregado: a primeira leitura já verá a entrada no banco
+                return
+            self._remover_id(id_fila)
+            chave = self._chave(id_fila, prioridade, data_entrada)
+            self._inserir_chave(chave)
+            self._chaves[chave[2]] = chave
+            self._beneficiarios[chave[2]] = id_beneficiario
+
+    def atualizar(self, id_fila: int, prioridade, data_entrada, id_beneficiario: Optional[int] = None) -> None:
+        """Reposiciona uma entrada após mudança de prioridade/data_entrada."""
+        self.inserir(id_fila, prioridade, data_entrada, id_beneficiario)
+
+    def _remover_id(self, id_fila: int) -> bool:
+        chave = self._chaves.pop(int(id_fila), None)
+        self._beneficiarios.pop(int(id_fila), None)
+        if chave is None:
+            return False
+        self._remover_chave(chave)
+        return True
+
+    def remover(self, id_fila: int) -> bool:
+        """Retira uma entrada (atendida, cancelada ou excluída)."""
+        with self._lock:
+            return self._remover_id(id_fila)
+
+    def sincronizar_beneficiarios(self, ids_beneficiario: Iterable[int], linhas: List[Dict[str, Any]]) -> None:
+        """
+        Substitui todas as entradas dos beneficiários informados pelas `linhas`
+        (id_fila, id_beneficiario, prioridade, data_entrada) lidas do banco.
+        """
+        ids = set(ids_beneficiario)
+        with self._lock:
+            if self._carregado_em is None:
+                return
+            for id_fila in [f for f, b in self._beneficiarios.items() if b in ids]:
+                self._remover_id(id_fila)
+            for linha in linhas:
+                self.inserir(linha['id_fila'], linha['prioridade'], linha['data_entrada'], linha['id_beneficiario'])
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def posicao(self, id_fila: int) -> Optional[int]:
+        """
+        Posição (1 = primeiro) de uma entrada AGUARDANDO.
+
+        Returns:
+            Posição na fila ou None se a entrada não estiver aguardando
+        """
+        with self._lock:
+            self._garantir_carregado()
+            chave = self._chaves.get(int(id_fila))
+            if chave is None:
+                return None
+            i = bisect_left(self._maximos, chave)
+            j = bisect_left(self._blocos[i], chave)
+            return self._itens_antes_do_bloco(i) + j + 1
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """
+        Primeiras `k` entradas da fila, em ordem.
+
+        Returns:
+            Lista de dicts com id_fila, id_beneficiario, prioridade, data_entrada e posicao_fila
+        """
+        resultado: List[Dict[str, Any]] = []
+        with self._lock:
+            self._garantir_carregado()
+            for bloco in self._blocos:
+                for prioridade_neg, data_entrada, id_fila in bloco:
+                    if len(resultado) >= k:
+                        return resultado
+                    resultado.append({
+                        'id_fila': id_fila,
+                        'id_beneficiario': self._beneficiarios.get(id_fila),
+                        'prioridade': -prioridade_neg,
+                        'data_entrada': None if data_entrada == datetime.max else data_entrada,
+                        'posicao_fila': len(resultado) + 1
+                    })
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+    def __repr__(self) -> str:
+        return f"<IndicePosicaoFila(aguardando={len(self._chaves)}, blocos={len(self._blocos)})>"
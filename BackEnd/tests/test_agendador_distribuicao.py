@@ -0,0 +1,119 @@
+"""
+Testes do agrupamento de solicitações do AgendadorDistribuicao.
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.agendador_distribuicao import AgendadorDistribuicao
+
+
+class TestAgendadorDistribuicao(unittest.TestCase):
+
+    def setUp(self):
+        self.chamadas = []
+        self.creditos = []
+        self.agendadores = []
+
+    def tearDown(self):
+        for agendador in self.agendadores:
+            agendador.encerrar(timeout=5)
+
+    def _executar(self, limite):
+        self.chamadas.append(limite)
+        return {'beneficiarios_atendidos': 0, 'transacoes': [], 'total_distribuido': 0}
+
+    def _executar_credito(self, id_credito, limite):
+        self.creditos.append(id_credito)
+        return {'id_credito': id_credito, 'beneficiarios_atendidos': 0, 'transacoes': []}
+
+    def _agendador(self, **parametros):
+        agendador = AgendadorDistribuicao(self._executar, **parametros).iniciar()
+        self.agendadores.append(agendador)
+        return agendador
+
+    def _aguardar(self, agendador, id_job, timeout=5.0):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            status = agendador.status(id_job)
+            if status and status['status'] in ('CONCLUIDO', 'FALHOU'):
+                return status
+            time.sleep(0.01)
+        self.fail(f"job {id_job} não terminou em {timeout}s")
+
+    def test_inativo_devolve_none(self):
+        agendador = AgendadorDistribuicao(self._executar)
+        self.assertIsNone(agendador.solicitar('doacao'))
+
+    def test_varias_solicitacoes_viram_um_trabalho(self):
+        agendador = self._agendador(janela=0.3, atraso_maximo=5.0)
+        trabalhos = [agendador.solicitar('doacao', limite=n) for n in (5, 20, 10)]
+
+        self.assertEqual({t['id_job'] for t in trabalhos}, {trabalhos[0]['id_job']})
+        status = self._aguardar(agendador, trabalhos[0]['id_job'])
+        self.assertEqual(status['status'], 'CONCLUIDO')
+        self.assertEqual(status['solicitacoes'], 3)
+        self.assertEqual(status['motivos'], {'doacao': 3})
+        # Uma rodada só, com o maior limite pedido
+        self.assertEqual(self.chamadas, [20])
+        estatisticas = agendador.estatisticas()
+        self.assertEqual(estatisticas['trabalhos'], 1)
+        self.assertEqual(estatisticas['agrupadas'], 2)
+
+    def test_imediato_dispensa_a_janela(self):
+        agendador = self._agendador(janela=30.0, atraso_maximo=60.0)
+        inicio = time.monotonic()
+        trabalho = agendador.solicitar('admin', imediato=True)
+        status = self._aguardar(agendador, trabalho['id_job'], timeout=5.0)
+        self.assertEqual(status['status'], 'CONCLUIDO')
+        self.assertLess(time.monotonic() - inicio, 5.0)
+        self.assertEqual(len(self.chamadas), 1)
+
+    def test_imediato_leva_o_trabalho_ja_agendado(self):
+        agendador = self._agendador(janela=30.0, atraso_maximo=60.0)
+        primeiro = agendador.solicitar('doacao')
+        segundo = agendador.solicitar('admin', imediato=True)
+        self.assertEqual(primeiro['id_job'], segundo['id_job'])
+        status = self._aguardar(agendador, segundo['id_job'])
+        self.assertEqual(status['motivos'], {'doacao': 1, 'admin': 1})
+        self.assertEqual(len(self.chamadas), 1)
+
+    def test_creditos_novos_usam_rodada_incremental(self):
+        agendador = AgendadorDistribuicao(self._executar, self._executar_credito,
+                                          janela=0.2, atraso_maximo=5.0).iniciar()
+        self.agendadores.append(agendador)
+        for id_credito in (7, 8, 7):
+            trabalho = agendador.solicitar('doacao', id_credito=id_credito)
+        status = self._aguardar(agendador, trabalho['id_job'])
+        self.assertFalse(status['completa'])
+        self.assertEqual(self.creditos, [7, 8])
+        self.assertEqual(self.chamadas, [])
+
+    def test_solicitacao_durante_execucao_vai_para_o_proximo_trabalho(self):
+        liberar = threading.Event()
+        iniciado = threading.Event()
+
+        def executar(limite):
+            iniciado.set()
+            liberar.wait(5)
+            return self._executar(limite)
+
+        agendador = AgendadorDistribuicao(executar, janela=0.05, atraso_maximo=1.0).iniciar()
+        self.agendadores.append(agendador)
+        primeiro = agendador.solicitar('doacao')
+        self.assertTrue(iniciado.wait(5))
+        segundo = agendador.solicitar('doacao')
+        liberar.set()
+
+        self.assertNotEqual(primeiro['id_job'], segundo['id_job'])
+        self._aguardar(agendador, primeiro['id_job'])
+        self._aguardar(agendador, segundo['id_job'])
+        self.assertEqual(len(self.chamadas), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
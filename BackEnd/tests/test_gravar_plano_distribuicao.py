@@ -0,0 +1,107 @@
+"""
+Testes da gravação em lote do plano de distribuição (Database._gravar_plano_distribuicao)
+com um cursor falso no lugar do banco.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class CursorFalso:
+    """Guarda o que foi enviado por execute_values e responde aos RETURNING."""
+
+    def __init__(self):
+        self.comandos = []
+        self.transacoes = []
+
+    def execute_values(self, sql, linhas, fetch):
+        self.comandos.append((' '.join(sql.split()), linhas))
+        if 'INSERT INTO transacao' in sql:
+            retorno = [
+                {'id_transacao': 100 + i, 'id_beneficiario': linha[1], 'id_credito': linha[4]}
+                for i, linha in enumerate(linhas)
+            ]
+            self.transacoes = retorno
+            # Ordem diferente da do VALUES, como o Postgres pode devolver
+            return list(reversed(retorno)) if fetch else None
+        return [] if fetch else None
+
+    def linhas(self, trecho):
+        return [linhas for sql, linhas in self.comandos if trecho in sql]
+
+
+def execute_values_falso(cur, sql, argslist, template=None, page_size=100, fetch=False):
+    return cur.execute_values(sql, list(argslist), fetch)
+
+
+class DominiosFalsos:
+
+    def obter_id(self, tabela, descricao, padrao=None):
+        return {'ESGOTADO': 3, 'PARCIALMENTE_UTILIZADO': 2}.get(descricao, 1)
+
+
+class TestGravarPlanoDistribuicao(unittest.TestCase):
+
+    def setUp(self):
+        self.cursor = CursorFalso()
+        self.db = Database.__new__(Database)
+        self.db.pool = None
+        self.db._conn = mock.Mock()
+        self.db._cursor = self.cursor
+        self.db.dominios = DominiosFalsos()
+        self.db.executar = mock.Mock(return_value=True)
+
+        creditos = [
+            {'id_credito': 10, 'id_doador': 1, 'quantidade_disponivel_kwh': 60},
+            {'id_credito': 11, 'id_doador': 2, 'quantidade_disponivel_kwh': 60},
+        ]
+        beneficiarios = [
+            {'id_beneficiario': 5, 'id_fila': 50, 'nome': 'Ana', 'prioridade': 3, 'consumo_medio_kwh': 90},
+            {'id_beneficiario': 6, 'id_fila': 60, 'nome': 'Bia', 'prioridade': 1, 'consumo_medio_kwh': 30},
+        ]
+        # Ana consome o crédito 10 e parte do 11; Bia o resto do 11
+        self.fatias = Database._planejar_distribuicao(creditos, beneficiarios)
+        self.assertEqual(len(self.fatias), 3)
+
+    def _gravar(self):
+        with mock.patch('psycopg2.extras.execute_values', execute_values_falso):
+            return self.db._gravar_plano_distribuicao(self.fatias)
+
+    def test_ids_vem_da_chave_e_nao_da_ordem_do_returning(self):
+        transacoes = self._gravar()
+
+        id_por_chave = {(t['id_beneficiario'], t['id_credito']): t['id_transacao'] for t in self.cursor.transacoes}
+        self.assertEqual(
+            [t['id_transacao'] for t in transacoes],
+            [id_por_chave[(f['id_beneficiario'], f['id_credito'])] for f in self.fatias]
+        )
+        self.assertEqual([t['quantidade_kwh'] for t in transacoes], [f['quantidade_kwh'] for f in self.fatias])
+
+    def test_historico_ligado_a_transacao_da_fatia(self):
+        transacoes = self._gravar()
+
+        historico, = self.cursor.linhas('INSERT INTO historico_credito')
+        self.assertEqual(
+            historico,
+            [(f['saldo_credito'], f['id_credito'], t['id_transacao']) for f, t in zip(self.fatias, transacoes)]
+        )
+
+    def test_saldo_final_dos_creditos_e_fila_atendida(self):
+        self._gravar()
+
+        creditos, = self.cursor.linhas('UPDATE credito')
+        self.assertEqual(sorted(creditos), [(10, 0.0, 3), (11, 0.0, 3)])
+        sql, params = self.db.executar.call_args[0]
+        self.assertIn('UPDATE fila_espera', sql)
+        self.assertEqual(params[1], [50, 60])
+        agregados, = self.cursor.linhas('INSERT INTO doador_agregado')
+        self.assertEqual(sorted(linha[0] for linha in agregados), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Testes do RegistroInstrucoes com uma conexão falsa (sem Postgres).
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import extensions
+
+from utils.instrucoes_preparadas import (
+    RegistroInstrucoes, SQLSTATE_INSTRUCAO_DUPLICADA, SQLSTATE_INSTRUCAO_INEXISTENTE
+)
+
+
+class ErroBanco(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+class ConexaoFalsa:
+    """Simula as instruções preparadas de uma sessão do servidor."""
+
+    def __init__(self, em_transacao=False):
+        self.no_servidor = set()
+        self.em_transacao = em_transacao
+        self.rollbacks = 0
+        self.erro_execute = None
+        self.comandos = []
+
+    def get_backend_pid(self):
+        return 4242
+
+    def get_transaction_status(self):
+        if self.em_transacao:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cursor(self):
+        return CursorFalso(self)
+
+
+class CursorFalso:
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.comandos.append(sql)
+        nome = sql.split()[1]
+        if sql.startswith('PREPARE'):
+            if nome in self.conn.no_servidor:
+                raise ErroBanco(SQLSTATE_INSTRUCAO_DUPLICADA)
+            self.conn.no_servidor.add(nome)
+            return
+        if nome not in self.conn.no_servidor:
+            raise ErroBanco(SQLSTATE_INSTRUCAO_INEXISTENTE)
+        if self.conn.erro_execute:
+            erro, self.conn.erro_execute = self.conn.erro_execute, None
+            raise erro
+
+
+class TestRegistroInstrucoes(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = RegistroInstrucoes()
+        self.registro.registrar('buscar_x', 'SELECT $1::int')
+
+    def _preparacoes(self, conn):
+        return sum(1 for c in conn.comandos if c.startswith('PREPARE'))
+
+    def test_erro_comum_no_execute_mantem_instrucao_preparada(self):
+        conn = ConexaoFalsa(em_transacao=True)
+        cursor = conn.cursor()
+        self.registro.executar(conn, cursor, 'buscar_x', (1,))
+
+        conn.erro_execute = ErroBanco('23505')
+        with self.assertRaises(ErroBanco):
+            self.registro.executar(conn, cursor, 'buscar_x', (2,))
+
+        # Próximo uso na mesma conexão não tenta PREPARE de novo (evita 42P05)
+        self.registro.executar(conn, cursor, 'buscar_x', (3,))
+        self.assertEqual(self._preparacoes(conn), 1)
+
+    def test_duplicada_em_transacao_marca_como_preparada(self):
+        conn = ConexaoFalsa(em_transacao=True)
+        conn.no_servidor.add('buscar_x')
+        cursor = conn.cursor()
+
+        with self.assertRaises(ErroBanco):
+            self.registro.executar(conn, cursor, 'buscar_x', (1,))
+        self.assertEqual(conn.rollbacks, 0)
+
+        self.registro.executar(conn, cursor, 'buscar_x', (2,))
+        self.assertEqual(self._preparacoes(conn), 1)
+
+    def test_duplicada_ociosa_tenta_de_novo(self):
+        conn = ConexaoFalsa()
+        conn.no_servidor.add('buscar_x')
+        self.registro.executar(conn, conn.cursor(), 'buscar_x', (1,))
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(conn.comandos[-1], 'EXECUTE buscar_x (%s)')
+
+    def test_inexistente_ociosa_prepara_de_novo(self):
+        conn = ConexaoFalsa()
+        cursor = conn.cursor()
+        self.registro.executar(conn, cursor, 'buscar_x', (1,))
+        conn.no_servidor.clear()  # DISCARD ALL
+
+        self.registro.executar(conn, cursor, 'buscar_x', (2,))
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(self._preparacoes(conn), 2)
+
+    def test_estatisticas_contam_execucoes_concorrentes(self):
+        import threading
+
+        conexoes = [ConexaoFalsa() for _ in range(8)]  # vivas: ids distintos
+
+        def executar_varias(conn):
+            cursor = conn.cursor()
+            for i in range(200):
+                self.registro.executar(conn, cursor, 'buscar_x', (i,))
+
+        threads = [threading.Thread(target=executar_varias, args=(c,)) for c in conexoes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        estatisticas = self.registro.estatisticas()['buscar_x']
+        self.assertEqual(estatisticas['execucoes'], 1600)
+        self.assertEqual(estatisticas['preparacoes'], 8)
+        self.assertEqual(estatisticas['erros'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Testes dos cursores e da paginação por chave (utils/paginacao.py).
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.paginacao import (
+    chave_cursor, codificar_cursor, condicao_keyset, decodificar_cursor, paginar_keyset
+)
+
+ORDENACAO = [('c.data', 'data', 'ASC'), ('c.id', 'id', 'ASC')]
+
+
+class BancoFalso:
+    """buscar_todos em memória que entende a consulta montada por paginar_keyset."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+
+    def buscar_todos(self, sql, params):
+        limite, chave = params[-1], tuple(params[:-1])
+        para_tras = 'c.data DESC' in sql
+        linhas = sorted(self.linhas, key=lambda l: (l['data'], l['id']), reverse=para_tras)
+        if chave:
+            if para_tras:
+                linhas = [l for l in linhas if (l['data'], l['id']) < chave]
+            else:
+                linhas = [l for l in linhas if (l['data'], l['id']) > chave]
+        return [dict(l) for l in linhas[:limite]]
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_ida_e_volta(self):
+        valores = {'k': ['2024-01-01', 10, 'AGUARDANDO'], 'a': 1}
+        cursor = codificar_cursor(valores)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decodificar_cursor(cursor), valores)
+
+    def test_vazio_e_primeira_pagina(self):
+        self.assertIsNone(decodificar_cursor(None))
+        self.assertIsNone(decodificar_cursor(''))
+
+    def test_cursor_corrompido(self):
+        for cursor in ('@@@', 'bm8', codificar_cursor([1, 2])):
+            with self.assertRaises(ValueError):
+                decodificar_cursor(cursor)
+
+    def test_cursor_de_outra_listagem(self):
+        posicao = decodificar_cursor(codificar_cursor({'k': [1]}))
+        with self.assertRaises(ValueError):
+            chave_cursor(posicao, 2)
+
+
+class TestCondicaoKeyset(unittest.TestCase):
+
+    def test_mesma_direcao_usa_tupla(self):
+        sql, params = condicao_keyset(ORDENACAO, ['2024-01-01', 5])
+        self.assertEqual(sql, '(c.data, c.id) > (%s, %s)')
+        self.assertEqual(params, ['2024-01-01', 5])
+        sql, _ = condicao_keyset(ORDENACAO, ['2024-01-01', 5], anterior=True)
+        self.assertEqual(sql, '(c.data, c.id) < (%s, %s)')
+
+    def test_direcoes_mistas_expandem_em_or(self):
+        ordenacao = [('f.prioridade', 'prioridade', 'DESC'), ('f.id_fila', 'id_fila', 'ASC')]
+        sql, params = condicao_keyset(ordenacao, [3, 7])
+        self.assertEqual(sql, '((f.prioridade < %s) OR (f.prioridade = %s AND f.id_fila > %s))')
+        self.assertEqual(params, [3, 3, 7])
+
+
+class TestPaginarKeyset(unittest.TestCase):
+
+    def setUp(self):
+        # Só duas datas: o desempate pelo id decide a ordem dentro de cada uma
+        self.banco = BancoFalso([{'id': i, 'data': '2024-01-0%d' % (1 + i % 2)} for i in range(1, 12)])
+        self.esperado = [l['id'] for l in sorted(self.banco.linhas, key=lambda l: (l['data'], l['id']))]
+
+    def _pagina(self, cursor=None):
+        return paginar_keyset(self.banco.buscar_todos, "SELECT * FROM credito c", ORDENACAO, 3, cursor)
+
+    def test_avanca_sem_repetir_nem_pular_em_empates(self):
+        vistos, cursor, paginas = [], None, []
+        while True:
+            pagina = self._pagina(cursor)
+            paginas.append(pagina)
+            vistos += [l['id'] for l in pagina['itens']]
+            cursor = pagina['proximo_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, self.esperado)
+        self.assertIsNone(paginas[0]['cursor_anterior'])
+        self.assertEqual(len(paginas), 4)
+
+    def test_volta_pelas_mesmas_paginas(self):
+        paginas = [self._pagina()]
+        while paginas[-1]['proximo_cursor']:
+            paginas.append(self._pagina(paginas[-1]['proximo_cursor']))
+
+        atual = paginas[-1]
+        for esperada in reversed(paginas[:-1]):
+            atual = self._pagina(atual['cursor_anterior'])
+            self.assertEqual([l['id'] for l in atual['itens']], [l['id'] for l in esperada['itens']])
+            self.assertIsNotNone(atual['proximo_cursor'])
+        self.assertIsNone(atual['cursor_anterior'])
+
+    def test_lista_vazia(self):
+        self.banco.linhas = []
+        pagina = self._pagina()
+        self.assertEqual(pagina, {'itens': [], 'proximo_cursor': None, 'cursor_anterior': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Testes do IndicePosicaoFila contra uma lista ordenada simples (oráculo).
+"""
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.posicao_fila import IndicePosicaoFila
+
+
+class TestIndicePosicaoFila(unittest.TestCase):
+
+    def setUp(self):
+        self.aleatorio = random.Random(1234)
+        self.inicio = datetime(2024, 1, 1)
+        self.linhas = []
+        self.indice = IndicePosicaoFila(lambda sql: list(self.linhas), intervalo_ressincronizacao=None,
+                                        tamanho_bloco=4)
+
+    def _linha(self, id_fila):
+        return {
+            'id_fila': id_fila,
+            'id_beneficiario': id_fila * 10,
+            'prioridade': self.aleatorio.randint(0, 3),
+            # Poucas datas distintas: força empates de prioridade e data
+            'data_entrada': self.inicio + timedelta(minutes=self.aleatorio.randint(0, 5))
+        }
+
+    def _conferir(self, oraculo):
+        # Ordem da fila: prioridade DESC, data_entrada ASC, id_fila ASC
+        ordenadas = sorted(oraculo.values(), key=lambda l: (-l['prioridade'], l['data_entrada'], l['id_fila']))
+        self.assertEqual(len(self.indice), len(ordenadas))
+        for posicao, linha in enumerate(ordenadas, start=1):
+            self.assertEqual(self.indice.posicao(linha['id_fila']), posicao)
+        self.assertEqual([t['id_fila'] for t in self.indice.top(len(ordenadas))],
+                         [l['id_fila'] for l in ordenadas])
+
+    def test_carga_respeita_a_ordem_da_fila(self):
+        self.linhas = [self._linha(i) for i in range(1, 40)]
+        self.indice.carregar()
+        self._conferir({l['id_fila']: l for l in self.linhas})
+
+    def test_inserir_e_remover_contra_oraculo(self):
+        self.linhas = [self._linha(i) for i in range(1, 20)]
+        self.indice.carregar()
+        oraculo = {l['id_fila']: l for l in self.linhas}
+        proximo_id = 20
+
+        for _ in range(300):
+            operacao = self.aleatorio.random()
+            if operacao < 0.5 or not oraculo:
+                linha = self._linha(proximo_id)
+                proximo_id += 1
+                self.indice.inserir(linha['id_fila'], linha['prioridade'], linha['data_entrada'],
+                                    linha['id_beneficiario'])
+                oraculo[linha['id_fila']] = linha
+            elif operacao < 0.8:
+                id_fila = self.aleatorio.choice(list(oraculo))
+                self.assertTrue(self.indice.remover(id_fila))
+                del oraculo[id_fila]
+            else:
+                id_fila = self.aleatorio.choice(list(oraculo))
+                linha = dict(self._linha(id_fila), id_beneficiario=oraculo[id_fila]['id_beneficiario'])
+                self.indice.atualizar(id_fila, linha['prioridade'], linha['data_entrada'],
+                                      linha['id_beneficiario'])
+                oraculo[id_fila] = linha
+        self._conferir(oraculo)
+
+    def test_remover_inexistente_e_posicao_de_ausente(self):
+        self.linhas = [self._linha(1)]
+        self.indice.carregar()
+        self.assertFalse(self.indice.remover(99))
+        self.assertIsNone(self.indice.posicao(99))
+        self.assertTrue(self.indice.remover(1))
+        self.assertIsNone(self.indice.posicao(1))
+        self.assertEqual(len(self.indice), 0)
+
+    def test_data_em_texto_iso(self):
+        self.linhas = [
+            {'id_fila': 1, 'id_beneficiario': 1, 'prioridade': 1, 'data_entrada': '2024-01-02T00:00:00'},
+            {'id_fila': 2, 'id_beneficiario': 2, 'prioridade': 1, 'data_entrada': '2024-01-01T00:00:00'},
+        ]
+        self.indice.carregar()
+        self.assertEqual(self.indice.posicao(2), 1)
+        self.assertEqual(self.indice.posicao(1), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
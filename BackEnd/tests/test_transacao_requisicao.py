@@ -0,0 +1,279 @@
+"""
+Testes da transação da requisição: política de Database._set_autocommit_safe
+(o que a requisição já gravou nunca é desfeito em silêncio), SAVEPOINT dos
+métodos com commit/rollback próprios e ações (eventos, logs de auditoria)
+executadas só depois do commit.
+"""
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import extensions
+
+from database import Database
+
+
+class ConexaoFalsa:
+
+    def __init__(self, status=extensions.TRANSACTION_STATUS_IDLE, autocommit=False):
+        self.status = status
+        self.autocommit = autocommit
+        self.commits = 0
+        self.rollbacks = 0
+        self.comandos = []
+
+    def get_transaction_status(self):
+        return self.status
+
+    def cursor(self):
+        cursor = mock.Mock()
+        cursor.execute.side_effect = lambda sql, *args: self.comandos.append(sql)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class TestPoliticaTransacao(unittest.TestCase):
+
+    def _db(self, conn, escopo):
+        db = Database.__new__(Database)
+        db.pool = mock.Mock()
+        db._local = threading.local()
+        db._local.conn = conn
+        db._local.cursor = mock.Mock()
+        db._local.escopo = escopo
+        return db
+
+    def test_metodo_entra_na_transacao_da_requisicao(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn, escopo=True)
+        db._set_autocommit_safe(False)
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 0))
+        self.assertEqual(conn.status, extensions.TRANSACTION_STATUS_INTRANS)
+        self.assertFalse(conn.autocommit)
+
+    def test_ligar_autocommit_na_requisicao_mantem_a_transacao(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn, escopo=True)
+        db._set_autocommit_safe(True)
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 0))
+        self.assertFalse(conn.autocommit)
+
+    def test_ligar_autocommit_fora_da_requisicao_confirma(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn, escopo=False)
+        db._set_autocommit_safe(True)
+        self.assertEqual((conn.commits, conn.rollbacks), (1, 0))
+        self.assertTrue(conn.autocommit)
+
+    def test_transacao_com_erro_e_encerrada(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INERROR)
+        db = self._db(conn, escopo=True)
+        db._set_autocommit_safe(False)
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 1))
+
+    def test_sem_transacao_so_muda_o_modo(self):
+        conn = ConexaoFalsa()
+        db = self._db(conn, escopo=True)
+        db._set_autocommit_safe(True)
+        self.assertTrue(conn.autocommit)
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 0))
+
+
+class TestPontosRequisicao(unittest.TestCase):
+    """Métodos com commit/rollback próprios dentro da transação da requisição."""
+
+    def _db(self, conn, escopo=True):
+        db = Database.__new__(Database)
+        db.pool = mock.Mock()
+        db._local = threading.local()
+        db._local.conn = conn
+        db._local.cursor = mock.Mock()
+        db._local.escopo = escopo
+        return db
+
+    def test_desfazer_volta_so_ate_o_ponto(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn)
+        ponto = db._abrir_ponto()
+        db._desfazer(ponto)
+        self.assertEqual(conn.rollbacks, 0)
+        self.assertEqual(conn.comandos, [f"SAVEPOINT {ponto}",
+                                         f"ROLLBACK TO SAVEPOINT {ponto}; RELEASE SAVEPOINT {ponto}"])
+
+    def test_confirmar_na_requisicao_nao_encerra_a_transacao(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn)
+        ponto = db._abrir_ponto()
+        db._confirmar(ponto)
+        db._confirmar()
+        self.assertEqual(conn.commits, 0)
+        self.assertEqual(conn.comandos[-1], f"RELEASE SAVEPOINT {ponto}")
+
+    def test_fora_da_requisicao_metodo_e_dono_da_transacao(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn, escopo=False)
+        self.assertIsNone(db._abrir_ponto())
+        db._confirmar()
+        self.assertEqual(conn.commits, 1)
+
+    def test_erro_de_consulta_com_ponto_aberto_fica_para_o_metodo(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn)
+        db.perfilador = None
+        db._local.cursor.execute.side_effect = RuntimeError('falhou')
+        db._abrir_ponto()
+        with self.assertRaises(RuntimeError):
+            db.buscar_um("SELECT 1")
+        self.assertEqual(conn.rollbacks, 0)
+
+    def test_validacao_da_fila_nao_desfaz_a_requisicao(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        db = self._db(conn)
+        db.buscar_um = mock.Mock(return_value={'id_fila': 1})
+        with self.assertRaises(ValueError):
+            db.entrar_na_fila(5, 1000.0, 100.0, 3)
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 0))
+        self.assertTrue(conn.comandos[-1].startswith("ROLLBACK TO SAVEPOINT"))
+
+
+class TestAposCommit(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database.__new__(Database)
+        self.db.pool = mock.Mock()
+        self.db._local = threading.local()
+        self.db.liberar_conexao = mock.Mock()
+        self.db.escritor_auditoria = None
+
+    def test_acao_roda_depois_do_commit_da_requisicao(self):
+        acao = mock.Mock()
+        with self.db.conexao_requisicao():
+            self.db._apos_commit(acao, 1, tipo='x')
+            acao.assert_not_called()
+        self.db.liberar_conexao.assert_called_once_with(confirmar=True)
+        acao.assert_called_once_with(1, tipo='x')
+
+    def test_requisicao_que_falha_descarta_a_acao(self):
+        acao = mock.Mock()
+        with self.assertRaises(RuntimeError):
+            with self.db.conexao_requisicao():
+                self.db._apos_commit(acao)
+                raise RuntimeError('falhou')
+        acao.assert_not_called()
+
+    def test_fora_da_requisicao_roda_na_hora(self):
+        acao = mock.Mock()
+        self.db._apos_commit(acao)
+        acao.assert_called_once_with()
+
+    def test_confirmar_requisicao_roda_acoes_antes_da_saida(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        acao = mock.Mock()
+        with self.db.conexao_requisicao():
+            self.db._local.conn = conn
+            self.db._apos_commit(acao)
+            self.db.confirmar_requisicao()
+            self.assertEqual(conn.commits, 1)
+            acao.assert_called_once_with()
+        acao.assert_called_once_with()
+
+    def test_commit_que_falha_descarta_acoes_e_sobe(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        conn.commit = mock.Mock(side_effect=RuntimeError('sem disco'))
+        acao = mock.Mock()
+        with self.assertRaises(RuntimeError):
+            with self.db.conexao_requisicao():
+                self.db._local.conn = conn
+                self.db._apos_commit(acao)
+        acao.assert_not_called()
+        self.assertEqual(conn.rollbacks, 1)
+        self.db.liberar_conexao.assert_called_once_with(confirmar=False)
+
+    def test_transacao_abortada_nao_conta_como_gravada(self):
+        conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INERROR)
+        acao = mock.Mock()
+        with self.assertRaises(Exception):
+            with self.db.conexao_requisicao():
+                self.db._local.conn = conn
+                self.db._apos_commit(acao)
+        acao.assert_not_called()
+        self.assertEqual(conn.commits, 0)
+
+    def test_agendamento_da_distribuicao_espera_o_commit(self):
+        agendador = self.db.agendador_distribuicao = mock.Mock(ativo=True)
+        agendador.solicitar.return_value = {'id_job': 1, 'status': 'AGENDADO'}
+        with self.db.conexao_requisicao():
+            self.db._local.conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+            resultado = self.db.solicitar_distribuicao('doacao', id_credito=9)
+            self.assertTrue(resultado['agendada'])
+            agendador.solicitar.assert_not_called()
+        agendador.solicitar.assert_called_once_with('doacao', id_credito=9, limite=10, imediato=False)
+
+    def test_agendamento_sem_transacao_aberta_sai_na_hora(self):
+        agendador = self.db.agendador_distribuicao = mock.Mock(ativo=True)
+        agendador.solicitar.return_value = {'id_job': 1, 'status': 'AGENDADO'}
+        with self.db.conexao_requisicao():
+            self.db._local.conn = ConexaoFalsa()
+            resultado = self.db.solicitar_distribuicao('admin', imediato=True)
+            self.assertEqual(resultado['id_job'], 1)
+
+    def test_exclusao_de_usuario_publica_depois_do_commit(self):
+        self.db._local.conn = ConexaoFalsa(extensions.TRANSACTION_STATUS_INTRANS)
+        self.db._local.cursor = mock.Mock()
+        self.db.eventos = mock.Mock()
+        self.db.buscar_um = mock.Mock(return_value={
+            'id_usuario': 3, 'id_credencial': None, 'id_doador': None, 'id_beneficiario': None
+        })
+        self.db.executar = mock.Mock()
+        with self.db.conexao_requisicao():
+            self.assertTrue(self.db.excluir_usuario_por_email('a@b.c'))
+            self.db.eventos.publicar.assert_not_called()
+        self.db.eventos.publicar.assert_called_once()
+
+
+class TestAuditoriaRequisicao(unittest.TestCase):
+
+    def setUp(self):
+        self.db = Database.__new__(Database)
+        self.db.pool = mock.Mock()
+        self.db._local = threading.local()
+        self.db.liberar_conexao = mock.Mock()
+        self.db.escritor_auditoria = mock.Mock()
+
+    def test_logs_seguem_para_o_escritor_depois_do_commit(self):
+        with self.db.conexao_requisicao():
+            self.assertIsNone(self.db.registrar_log_auditoria(7, 'DOACAO', detalhes='a'))
+            self.db.registrar_log_auditoria(7, 'DOACAO', detalhes='b')
+            self.db.escritor_auditoria.enfileirar.assert_not_called()
+
+        self.db.liberar_conexao.assert_called_once_with(confirmar=True)
+        detalhes = [c.kwargs['detalhes'] for c in self.db.escritor_auditoria.enfileirar.call_args_list]
+        self.assertEqual(detalhes, ['a', 'b'])
+
+    def test_requisicao_que_falha_nao_deixa_log(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.conexao_requisicao():
+                self.db.registrar_log_auditoria(7, 'DOACAO')
+                raise RuntimeError('falhou')
+
+        self.db.liberar_conexao.assert_called_once_with(confirmar=False)
+        self.db.escritor_auditoria.enfileirar.assert_not_called()
+
+    def test_fora_da_requisicao_enfileira_na_hora(self):
+        self.db.registrar_log_auditoria(None, 'DISTRIBUICAO')
+        self.db.escritor_auditoria.enfileirar.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,33 @@ Módulo de utilitários do sistema.
 """
 
 from utils.logger_auditoria import LoggerAuditoria, TipoAcao, StatusLog
+from utils.pool_conexoes import PoolConexoes, PoolEsgotadoError
+from utils.cache_dominios import CacheDominios
+from utils.escritor_auditoria import EscritorAuditoria
+from utils.eventos import BarramentoEventos, TipoEvento
+from utils.paginacao import codificar_cursor, decodificar_cursor, paginar_keyset, montar_pagina
+from utils.instrucoes_preparadas import RegistroInstrucoes
+from utils.custo_banco import CursorMedido, custo_atual, iniciar_medicao
+from utils.perfilador_sql import PerfiladorSQL, impressao_digital
 
 __all__ = [
     'LoggerAuditoria',
     'TipoAcao',
-    'StatusLog'
+    'StatusLog',
+    'PoolConexoes',
+    'PoolEsgotadoError',
+    'CacheDominios',
+    'EscritorAuditoria',
+    'BarramentoEventos',
+    'TipoEvento',
+    'codificar_cursor',
+    'decodificar_cursor',
+    'paginar_keyset',
+    'montar_pagina',
+    'RegistroInstrucoes',
+    'CursorMedido',
+    'custo_atual',
+    'iniciar_medicao',
+    'PerfiladorSQL',
+    'impressao_digital'
 ]
\ No newline at end of file
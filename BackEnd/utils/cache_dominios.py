@@ -0,0 +1,122 @@
+"""
+Cache em memória das tabelas de domínio (status, tipos e classificações).
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# tabela -> (coluna de id, coluna de descrição)
+TABELAS_DOMINIO: Dict[str, Tuple[str, str]] = {
+    'tipo_usuario': ('id_tipo', 'descricao_tipo'),
+    'status': ('id_status', 'descricao_status'),
+    'classificacao_doador': ('id_classificacao', 'descricao_classificacao'),
+    'status_beneficiario': ('id_status_beneficiario', 'descricao_status_beneficiario'),
+    'status_credito': ('id_status_credito', 'descricao_status'),
+    'tipo_movimento': ('id_tipo_movimentacao', 'descricao_tipo'),
+    'status_transacao': ('id_status_transacao', 'descricao_status'),
+    'tipo_acao': ('id_tipo_acao', 'descricao_tipo_acao'),
+    'tipo_dispositivo': ('id_tipo_dispositivo', 'descricao_tipo_dispositivo'),
+    'status_log': ('id_status_log', 'descricao_status_log'),
+    'status_fila': ('id_status_fila', 'descricao_status_fila'),
+}
+
+
+def _montar_query_carga() -> str:
+    partes = [
+        f"SELECT '{tabela}' AS tabela, {col_id} AS id, {col_desc} AS descricao FROM {tabela}"
+        for tabela, (col_id, col_desc) in TABELAS_DOMINIO.items()
+    ]
+    return "\nUNION ALL\n".join(partes)
+
+
+QUERY_CARGA = _montar_query_carga()
+
+
+class CacheDominios:
+    """
+    Mantém descrição -> id e id -> descrição de todas as tabelas de domínio.
+
+    - carregar(): lê todas as tabelas em uma única consulta (UNION ALL)
+    - ttl: após esse tempo (segundos) a próxima leitura recarrega; None = nunca expira
+    - invalidar(): força recarga na próxima leitura
+    - Descrição desconhecida provoca no máximo uma recarga a cada
+      `intervalo_recarga_falta` segundos (valores novos inseridos no banco)
+    """
+
+    def __init__(
+        self,
+        buscar_todos: Callable[[str], List[Dict[str, Any]]],
+        ttl: Optional[float] = 600.0,
+        intervalo_recarga_falta: float = 5.0
+    ):
+        self._buscar_todos = buscar_todos
+        self.ttl = ttl
+        self.intervalo_recarga_falta = intervalo_recarga_falta
+
+        self._por_descricao: Dict[str, Dict[str, int]] = {}
+        self._por_id: Dict[str, Dict[int, str]] = {}
+        self._carregado_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def carregar(self) -> None:
+        """Lê todas as tabelas de domínio e substitui o conteúdo do cache."""
+        with self._lock:
+            linhas = self._buscar_todos(QUERY_CARGA)
+
+            por_descricao: Dict[str, Dict[str, int]] = {t: {} for t in TABELAS_DOMINIO}
+            por_id: Dict[str, Dict[int, str]] = {t: {} for t in TABELAS_DOMINIO}
+            for linha in linhas or []:
+                por_descricao[linha['tabela']][linha['descricao']] = linha['id']
+                por_id[linha['tabela']][linha['id']] = linha['descricao']
+
+            # Troca atômica: leitores concorrentes nunca veem o cache pela metade
+            self._por_descricao, self._por_id = por_descricao, por_id
+            self._carregado_em = time.monotonic()
+
+    def invalidar(self) -> None:
+        """Descarta o conteúdo atual; a próxima leitura recarrega do banco."""
+        self._carregado_em = None
+
+    def _garantir_carregado(self) -> None:
+        carregado_em = self._carregado_em
+        if carregado_em is None or (self.ttl is not None and time.monotonic() - carregado_em > self.ttl):
+            self.carregar()
+
+    def obter_id(self, tabela: str, descricao: str, padrao: Optional[int] = None) -> Optional[int]:
+        """
+        Retorna o id de uma descrição (ex.: obter_id('status_fila', 'AGUARDANDO')).
+
+        Args:
+            tabela: Nome da tabela de domínio
+            descricao: Descrição procurada
+            padrao: Valor retornado se a descrição não existir
+
+        Returns:
+            id correspondente ou `padrao`
+        """
+        if tabela not in TABELAS_DOMINIO:
+            raise KeyError(f"Tabela de domínio desconhecida: {tabela}")
+
+        self._garantir_carregado()
+        valor = self._por_descricao[tabela].get(descricao)
+        if valor is not None:
+            return valor
+
+        if time.monotonic() - (self._carregado_em or 0) > self.intervalo_recarga_falta:
+            self.carregar()
+            valor = self._por_descricao[tabela].get(descricao)
+
+        return valor if valor is not None else padrao
+
+    def obter_descricao(self, tabela: str, id_dominio: int, padrao: Optional[str] = None) -> Optional[str]:
+        """Retorna a descrição de um id (ex.: obter_descricao('status_credito', 3))."""
+        if tabela not in TABELAS_DOMINIO:
+            raise KeyError(f"Tabela de domínio desconhecida: {tabela}")
+
+        self._garantir_carregado()
+        return self._por_id[tabela].get(id_dominio, padrao)
+
+    def __repr__(self) -> str:
+        total = sum(len(v) for v in self._por_descricao.values())
+        return f"<CacheDominios(tabelas={len(self._por_descricao)}, valores={total})>"
@@ -0,0 +1,55 @@
+"""
+Custo de banco por thread: quantas consultas a requisição atual executou e
+quanto tempo esperou por elas.
+
+O Database cria seus cursores com CursorMedido, então toda consulta feita
+pela thread (helpers, execute_values, EXECUTE de instruções preparadas)
+entra na conta sem mudar quem chama. Cada thread só escreve nos próprios
+contadores: não há lock no caminho da consulta.
+"""
+import threading
+import time
+from typing import Tuple
+
+from psycopg2.extras import RealDictCursor
+
+_local = threading.local()
+
+
+def iniciar_medicao() -> None:
+    """Zera os contadores da thread atual (início de uma requisição)."""
+    _local.consultas = 0
+    _local.segundos = 0.0
+
+
+def custo_atual() -> Tuple[int, float]:
+    """(consultas, segundos) acumulados pela thread desde iniciar_medicao()."""
+    return getattr(_local, 'consultas', 0), getattr(_local, 'segundos', 0.0)
+
+
+def _registrar(inicio: float) -> None:
+    try:
+        _local.consultas += 1
+        _local.segundos += time.perf_counter() - inicio
+    except AttributeError:
+        # Thread que nunca chamou iniciar_medicao() (tarefas em segundo plano)
+        _local.consultas = 1
+        _local.segundos = time.perf_counter() - inicio
+
+
+class CursorMedido(RealDictCursor):
+    """RealDictCursor que soma cada execute() ao custo da thread."""
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _registrar(inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _registrar(inicio)
@@ -0,0 +1,213 @@
+"""
+Escritor assíncrono de logs de auditoria (fila em memória + gravação em lote).
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_FIM = object()
+
+
+class EscritorAuditoria:
+    """
+    Recebe eventos de auditoria e os grava em lote em log_auditoria.
+
+    - enfileirar() só resolve os IDs de domínio (em memória) e coloca o evento
+      numa fila limitada; a requisição não espera o banco
+    - Uma thread de fundo grava com INSERT multi-linha quando o lote atinge
+      `tamanho_lote` eventos ou quando passa `intervalo_flush` segundos
+    - Backpressure: com a fila cheia, o produtor espera até
+      `timeout_enfileirar` segundos; depois disso o evento é descartado e
+      contabilizado em estatisticas()['descartados']
+    - encerrar() (também registrado em atexit) grava tudo que estiver na fila
+    """
+
+    QUERY_INSERT = """
+        INSERT INTO log_auditoria
+        (ip_acesso, data_hora, detalhes, id_usuario, id_tipo_acao, id_tipo_dispositivo, id_status_log)
+        VALUES %s
+    """
+
+    def __init__(
+        self,
+        pool,
+        dominios,
+        tamanho_fila: int = 10000,
+        tamanho_lote: int = 200,
+        intervalo_flush: float = 1.0,
+        timeout_enfileirar: float = 0.5
+    ):
+        self._pool = pool
+        self._dominios = dominios
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.timeout_enfileirar = timeout_enfileirar
+
+        self._fila: "queue.Queue[Any]" = queue.Queue(maxsize=tamanho_fila)
+        self._thread: Optional[threading.Thread] = None
+        self._encerrado = False
+        # Produtores (threads das requisições) e a thread de gravação contam juntos
+        self._lock = threading.Lock()
+        self._estatisticas = {
+            'enfileirados': 0,
+            'gravados': 0,
+            'lotes': 0,
+            'descartados': 0,
+            'falhas': 0
+        }
+
+    # ============================================
+    # CICLO DE VIDA
+    # ============================================
+
+    def iniciar(self) -> 'EscritorAuditoria':
+        """Inicia a thread de gravação (idempotente)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='escritor-auditoria', daemon=True)
+            self._thread.start()
+            atexit.register(self.encerrar)
+        return self
+
+    def encerrar(self, timeout: float = 10.0) -> None:
+        """Para de aceitar eventos e grava os que ainda estão na fila."""
+        if self._encerrado:
+            return
+        self._encerrado = True
+        if self._thread is not None:
+            self._fila.put(_FIM)
+            self._thread.join(timeout)
+
+    def descarregar(self) -> None:
+        """Bloqueia até que todos os eventos enfileirados tenham sido gravados."""
+        self._fila.join()
+
+    def _contar(self, nome: str, quantidade: int = 1) -> None:
+        with self._lock:
+            self._estatisticas[nome] += quantidade
+
+    # ============================================
+    # PRODUTORES
+    # ============================================
+
+    def enfileirar(
+        self,
+        tipo_acao: str,
+        id_usuario: Optional[int] = None,
+        ip_acesso: Optional[str] = None,
+        detalhes: Optional[str] = None,
+        status: str = 'SUCESSO',
+        dispositivo: str = 'WEB',
+        data_hora: Optional[datetime] = None
+    ) -> bool:
+        """
+        Enfileira um evento de auditoria.
+
+        Args:
+            tipo_acao: Descrição do tipo de ação (LOGIN, DOACAO, ...)
+            id_usuario: Usuário que executou a ação (opcional)
+            ip_acesso: IP de origem (opcional)
+            detalhes: Texto livre
+            status: Descrição do status do log (SUCESSO, FALHA, ...)
+            dispositivo: Descrição do tipo de dispositivo
+            data_hora: Momento do evento (padrão: agora)
+
+        Returns:
+            True se o evento entrou na fila, False se foi descartado
+        """
+        if self._encerrado:
+            self._contar('descartados')
+            return False
+
+        linha = (
+            ip_acesso,
+            data_hora or datetime.now(),
+            detalhes,
+            id_usuario,
+            self._dominios.obter_id('tipo_acao', tipo_acao, padrao=1),
+            self._dominios.obter_id('tipo_dispositivo', dispositivo, padrao=1),
+            self._dominios.obter_id('status_log', status, padrao=1)
+        )
+        try:
+            self._fila.put(linha, timeout=self.timeout_enfileirar)
+        except queue.Full:
+            self._contar('descartados')
+            print(f"Aviso: fila de auditoria cheia, evento {tipo_acao} descartado")
+            return False
+
+        self._contar('enfileirados')
+        return True
+
+    # ============================================
+    # CONSUMIDOR
+    # ============================================
+
+    def _loop(self) -> None:
+        lote: List[Tuple] = []
+        prazo = time.monotonic() + self.intervalo_flush
+        encerrar = False
+
+        while not encerrar:
+            try:
+                item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+                if item is _FIM:
+                    encerrar = True
+                    self._fila.task_done()
+                else:
+                    lote.append(item)
+            except queue.Empty:
+                pass
+
+            if encerrar:
+                # Drena o que sobrou antes de sair
+                while True:
+                    try:
+                        lote.append(self._fila.get_nowait())
+                    except queue.Empty:
+                        break
+
+            if lote and (encerrar or len(lote) >= self.tamanho_lote or time.monotonic() >= prazo):
+                self._gravar(lote)
+                for _ in lote:
+                    self._fila.task_done()
+                lote = []
+
+            if time.monotonic() >= prazo:
+                prazo = time.monotonic() + self.intervalo_flush
+
+    def _gravar(self, lote: List[Tuple]) -> None:
+        """Grava um lote com INSERT multi-linha numa conexão emprestada do pool."""
+        from psycopg2.extras import execute_values
+
+        conn = None
+        try:
+            conn = self._pool.obter()
+            with conn.cursor() as cur:
+                execute_values(cur, self.QUERY_INSERT, lote, page_size=len(lote))
+            conn.commit()
+            with self._lock:
+                self._estatisticas['gravados'] += len(lote)
+                self._estatisticas['lotes'] += 1
+        except Exception as e:
+            # Auditoria nunca derruba o fluxo principal
+            self._contar('falhas', len(lote))
+            print(f"ERRO ao gravar lote de auditoria ({len(lote)} eventos): {e}")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+        finally:
+            if conn is not None:
+                self._pool.devolver(conn)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores do escritor e tamanho atual da fila."""
+        with self._lock:
+            return {**self._estatisticas, 'pendentes': self._fila.qsize()}
+
+    def __repr__(self) -> str:
+        return f"<EscritorAuditoria(pendentes={self._fila.qsize()}, gravados={self._estatisticas['gravados']})>"
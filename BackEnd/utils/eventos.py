@@ -0,0 +1,70 @@
+"""
+Barramento de eventos em processo (publicação/inscrição).
+"""
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class TipoEvento(Enum):
+    """Alterações de dados que outras partes do sistema podem acompanhar."""
+    DOACAO = "DOACAO"              # crédito criado, editado ou excluído
+    DISTRIBUICAO = "DISTRIBUICAO"  # transações de distribuição gravadas
+    CADASTRO = "CADASTRO"          # usuário/doador/beneficiário criado ou excluído
+    FILA = "FILA"                  # entrada na fila criada, editada ou cancelada
+
+
+Ouvinte = Callable[[TipoEvento, Dict[str, Any]], None]
+
+
+class BarramentoEventos:
+    """
+    Singleton que entrega eventos "dados alterados" aos ouvintes inscritos.
+
+    - publicar() chama os ouvintes de forma síncrona, na thread de quem publicou;
+      deve ser chamado depois do commit que alterou os dados
+    - Erro em um ouvinte é registrado e não interrompe os demais nem o publicador
+    """
+
+    _instancia: Optional['BarramentoEventos'] = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock_instancia:
+            if cls._instancia is None:
+                cls._instancia = super().__new__(cls)
+                cls._instancia._ouvintes: Dict[TipoEvento, List[Ouvinte]] = {}
+                cls._instancia._lock = threading.Lock()
+        return cls._instancia
+
+    def inscrever(self, tipo: TipoEvento, ouvinte: Ouvinte) -> None:
+        """Passa a chamar `ouvinte(tipo, dados)` a cada evento do tipo informado."""
+        with self._lock:
+            ouvintes = list(self._ouvintes.get(tipo, []))
+            if ouvinte not in ouvintes:
+                ouvintes.append(ouvinte)
+            self._ouvintes[tipo] = ouvintes
+
+    def cancelar(self, tipo: TipoEvento, ouvinte: Ouvinte) -> None:
+        """Remove um ouvinte inscrito."""
+        with self._lock:
+            self._ouvintes[tipo] = [o for o in self._ouvintes.get(tipo, []) if o != ouvinte]
+
+    def publicar(self, tipo: TipoEvento, **dados) -> None:
+        """
+        Notifica os ouvintes de um tipo de evento.
+
+        Args:
+            tipo: Tipo do evento
+            **dados: Informações adicionais (ex.: id_credito, id_doador)
+        """
+        # Lista copiada na inscrição: leitura sem lock
+        for ouvinte in self._ouvintes.get(tipo, []):
+            try:
+                ouvinte(tipo, dados)
+            except Exception as e:
+                print(f"ERRO no ouvinte do evento {tipo.value}: {e}")
+
+    def __repr__(self) -> str:
+        total = sum(len(v) for v in self._ouvintes.values())
+        return f"<BarramentoEventos(ouvintes={total})>"
@@ -0,0 +1,153 @@
+"""
+Registro de instruções preparadas no servidor (PREPARE/EXECUTE) por conexão.
+"""
+import threading
+import time
+from typing import Any, Dict, Sequence, Set, Tuple
+
+
+# SQLSTATE de "prepared statement não existe" (ex.: após DISCARD ALL)
+SQLSTATE_INSTRUCAO_INEXISTENTE = '26000'
+# SQLSTATE de "prepared statement já existe" (controle local perdido)
+SQLSTATE_INSTRUCAO_DUPLICADA = '42P05'
+
+
+class RegistroInstrucoes:
+    """
+    Mantém as consultas quentes preparadas em cada conexão que as usa.
+
+    - registrar(nome, sql): define a consulta uma vez, com parâmetros $1, $2, ...
+    - executar(conn, cursor, nome, params): faz PREPARE na primeira vez em que
+      a conexão usa a instrução e depois só EXECUTE (sem parse/plano a cada chamada)
+    - Conexões são reconhecidas pelo PID do backend: conexão nova (reconexão,
+      conexão trocada pelo pool) é preparada de novo; erro 26000 também força
+      nova preparação
+    - estatisticas(): execuções, preparações e tempo por instrução
+    """
+
+    def __init__(self):
+        self._instrucoes: Dict[str, str] = {}
+        # id(conn) -> (pid do backend, nomes já preparados nessa sessão)
+        self._preparadas: Dict[int, Tuple[int, Set[str]]] = {}
+        self._lock = threading.Lock()
+        self._estatisticas: Dict[str, Dict[str, float]] = {}
+
+    def registrar(self, nome: str, sql: str) -> None:
+        """
+        Registra uma instrução.
+
+        Args:
+            nome: Identificador SQL (letras, números e _)
+            sql: Consulta com parâmetros posicionais $1, $2, ... (tipos explícitos
+                 com ::tipo quando o Postgres não conseguir inferir)
+        """
+        if not nome.replace('_', '').isalnum():
+            raise ValueError(f"Nome de instrução inválido: {nome}")
+        with self._lock:
+            self._instrucoes[nome] = sql
+            self._estatisticas.setdefault(nome, {
+                'execucoes': 0,
+                'preparacoes': 0,
+                'erros': 0,
+                'tempo_total_ms': 0.0
+            })
+
+    def _nomes_preparados(self, conn) -> Set[str]:
+        pid = conn.get_backend_pid()
+        with self._lock:
+            atual = self._preparadas.get(id(conn))
+            if atual is None or atual[0] != pid:
+                # Conexão nova (ou reconectada com o mesmo id): nada preparado ainda
+                if len(self._preparadas) > 256:
+                    self._preparadas.clear()
+                atual = (pid, set())
+                self._preparadas[id(conn)] = atual
+            return atual[1]
+
+    def _preparar(self, cursor, nome: str, preparadas: Set[str]) -> None:
+        cursor.execute(f"PREPARE {nome} AS {self._instrucoes[nome]}")
+        preparadas.add(nome)
+        self._contar(nome, 'preparacoes')
+
+    def _contar(self, nome: str, campo: str, valor: float = 1) -> None:
+        # Várias threads executam a mesma instrução: += sem lock perde contagens
+        with self._lock:
+            self._estatisticas[nome][campo] += valor
+
+    def executar(self, conn, cursor, nome: str, params: Sequence[Any] = ()):
+        """
+        Executa uma instrução registrada, preparando-a se necessário.
+
+        Args:
+            conn: Conexão psycopg2 em uso
+            cursor: Cursor dessa conexão
+            nome: Nome usado em registrar()
+            params: Valores dos parâmetros $1, $2, ... (na ordem)
+
+        Returns:
+            O cursor, pronto para fetchone()/fetchall()
+        """
+        from psycopg2 import extensions
+
+        if nome not in self._instrucoes:
+            raise KeyError(f"Instrução não registrada: {nome}")
+
+        params = tuple(params)
+        comando = f"EXECUTE {nome}" + (f" ({', '.join(['%s'] * len(params))})" if params else "")
+        preparadas = self._nomes_preparados(conn)
+        ociosa = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+        inicio = time.perf_counter()
+        try:
+            if nome not in preparadas:
+                # _preparar só marca o nome depois que o PREPARE deu certo
+                self._preparar(cursor, nome, preparadas)
+            cursor.execute(comando, params)
+        except Exception as e:
+            codigo = getattr(e, 'pgcode', None)
+            if codigo == SQLSTATE_INSTRUCAO_DUPLICADA:
+                # A sessão já tinha a instrução sem que soubéssemos
+                preparadas.add(nome)
+            elif codigo == SQLSTATE_INSTRUCAO_INEXISTENTE:
+                # A sessão perdeu a instrução (DISCARD ALL, reset do pooler...)
+                preparadas.discard(nome)
+            # Demais erros (constraint, parâmetro inválido...) não afetam uma
+            # instrução já preparada, que continua existindo no servidor
+            if codigo not in (SQLSTATE_INSTRUCAO_INEXISTENTE, SQLSTATE_INSTRUCAO_DUPLICADA) or not ociosa:
+                self._contar(nome, 'erros')
+                raise
+            # Sem transação anterior a preservar: desfaz e tenta uma vez mais
+            conn.rollback()
+            if nome not in preparadas:
+                self._preparar(cursor, nome, preparadas)
+            cursor.execute(comando, params)
+        finally:
+            self._contar(nome, 'tempo_total_ms', (time.perf_counter() - inicio) * 1000)
+
+        self._contar(nome, 'execucoes')
+        return cursor
+
+    def sql(self, nome: str) -> str:
+        """Texto registrado da instrução (com $1, $2, ...)."""
+        return self._instrucoes[nome]
+
+    def esquecer(self, conn) -> None:
+        """Descarta o controle de uma conexão (ex.: antes de fechá-la)."""
+        with self._lock:
+            self._preparadas.pop(id(conn), None)
+
+    def estatisticas(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores por instrução (inclui tempo médio em ms)."""
+        with self._lock:
+            resultado = {}
+            for nome, valores in self._estatisticas.items():
+                execucoes = valores['execucoes']
+                resultado[nome] = {
+                    **valores,
+                    'tempo_total_ms': round(valores['tempo_total_ms'], 3),
+                    'tempo_medio_ms': round(valores['tempo_total_ms'] / execucoes, 3) if execucoes else 0.0
+                }
+            return resultado
+
+    def __repr__(self) -> str:
+        return f"<RegistroInstrucoes(instrucoes={len(self._instrucoes)}, conexoes={len(self._preparadas)})>"
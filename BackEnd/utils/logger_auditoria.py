@@ -40,8 +40,17 @@ class LoggerAuditoria:
         if cls._instancia is None:
             cls._instancia = super().__new__(cls)
             cls._instancia._logs: List[Dict[str, Any]] = []
+            cls._instancia._destino = None
         return cls._instancia
     
+    def definir_destino(self, destino) -> None:
+        """
+        Define um destino persistente para os logs (ex.: EscritorAuditoria).
+        Cada registro continua em memória e também é enfileirado no destino.
+        Use None para voltar ao modo somente memória.
+        """
+        self._destino = destino
+    
     def registrar(
         self,
         tipo_acao: TipoAcao,
@@ -79,6 +88,16 @@ class LoggerAuditoria:
         }
         
         self._logs.append(log_entry)
+        
+        if self._destino is not None:
+            self._destino.enfileirar(
+                tipo_acao=tipo_acao.value,
+                status=status.value,
+                id_usuario=usuario_id,
+                ip_acesso=ip_acesso,
+                detalhes=detalhes,
+                data_hora=log_entry['data_hora']
+            )
         return log_id
     
     def obter_logs(
@@ -0,0 +1,190 @@
+"""
+Cursores opacos para paginação por chave (keyset).
+"""
+import base64
+import binascii
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def codificar_cursor(valores: Dict[str, Any]) -> str:
+    """
+    Transforma os valores da última linha de uma página em um cursor opaco.
+
+    Args:
+        valores: Colunas de ordenação da última linha (ex.: {'data': ..., 'id': 10})
+
+    Returns:
+        String base64 segura para URL
+    """
+    bruto = json.dumps(valores, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(bruto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Inverte codificar_cursor().
+
+    Args:
+        cursor: Cursor recebido do cliente (None ou vazio = primeira página)
+
+    Returns:
+        Dict com os valores da última linha da página anterior, ou None
+
+    Raises:
+        ValueError: se o cursor estiver corrompido
+    """
+    if not cursor:
+        return None
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento).decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Cursor de paginação inválido")
+    if not isinstance(valores, dict):
+        raise ValueError("Cursor de paginação inválido")
+    return valores
+
+
+# (expressão SQL, campo na linha do resultado, 'ASC' | 'DESC')
+Ordenacao = Sequence[Tuple[str, str, str]]
+
+
+def condicao_keyset(ordenacao: Ordenacao, valores: Sequence[Any], anterior: bool = False) -> Tuple[str, List[Any]]:
+    """
+    Monta o WHERE que seleciona as linhas depois (ou antes) de uma chave,
+    na ordem dada.
+
+    Com todas as colunas na mesma direção usa comparação de tuplas, que o
+    Postgres resolve com um índice composto; com direções mistas (ex.:
+    prioridade DESC, data_entrada ASC) expande em OR de prefixos iguais.
+
+    Args:
+        ordenacao: Colunas de ordenação; a última deve ser única (desempate)
+        valores: Valores dessas colunas na linha de referência
+        anterior: True para as linhas que vêm antes da referência
+
+    Returns:
+        (sql, parâmetros) para usar com %s
+    """
+    def operador(direcao: str) -> str:
+        crescente = direcao.upper() == 'ASC'
+        return '>' if crescente != anterior else '<'
+
+    direcoes = {d.upper() for _, _, d in ordenacao}
+    if len(direcoes) == 1:
+        colunas = ', '.join(expr for expr, _, _ in ordenacao)
+        marcadores = ', '.join(['%s'] * len(ordenacao))
+        return f"({colunas}) {operador(ordenacao[0][2])} ({marcadores})", list(valores)
+
+    termos = []
+    parametros: List[Any] = []
+    for i, (expr, _, direcao) in enumerate(ordenacao):
+        iguais = [f"{ordenacao[j][0]} = %s" for j in range(i)]
+        termos.append('(' + ' AND '.join(iguais + [f"{expr} {operador(direcao)} %s"]) + ')')
+        parametros.extend(valores[:i])
+        parametros.append(valores[i])
+    return '(' + ' OR '.join(termos) + ')', parametros
+
+
+def ordem_keyset(ordenacao: Ordenacao, inverter: bool = False) -> str:
+    """Cláusula ORDER BY da ordenação (invertida para buscar a página anterior)."""
+    partes = []
+    for expr, _, direcao in ordenacao:
+        crescente = direcao.upper() == 'ASC'
+        partes.append(f"{expr} {'ASC' if crescente != inverter else 'DESC'}")
+    return ', '.join(partes)
+
+
+def paginar_keyset(
+    buscar_todos: Callable[[str, Sequence[Any]], List[dict]],
+    consulta: str,
+    ordenacao: Ordenacao,
+    limite: int,
+    cursor: Optional[str] = None,
+    condicoes: Sequence[str] = (),
+    parametros: Sequence[Any] = ()
+) -> Dict[str, Any]:
+    """
+    Busca uma página por chave: o custo não depende de quantas páginas já
+    foram percorridas (ao contrário de OFFSET).
+
+    Args:
+        buscar_todos: Database.buscar_todos
+        consulta: SELECT ... FROM ... JOIN ... sem WHERE/ORDER BY/LIMIT
+        ordenacao: Colunas de ordenação, terminando em uma coluna única
+        limite: Linhas por página
+        cursor: proximo_cursor/cursor_anterior de uma página anterior (None = primeira)
+        condicoes: Filtros (SQL com %s) combinados com AND
+        parametros: Valores dos %s de `condicoes`, na ordem
+
+    Returns:
+        {'itens': [...], 'proximo_cursor': str|None, 'cursor_anterior': str|None}
+
+    Raises:
+        ValueError: cursor inválido ou de outra listagem
+    """
+    posicao = decodificar_cursor(cursor)
+    chave = chave_cursor(posicao, len(ordenacao))
+    anterior = bool(posicao and posicao.get('a'))
+    where = list(condicoes)
+    params = list(parametros)
+    if chave is not None:
+        sql_chave, params_chave = condicao_keyset(ordenacao, chave, anterior)
+        where.append(sql_chave)
+        params.extend(params_chave)
+
+    sql = consulta
+    if where:
+        sql += "\nWHERE " + "\n  AND ".join(where)
+    sql += f"\nORDER BY {ordem_keyset(ordenacao, inverter=anterior)}\nLIMIT %s"
+    params.append(limite + 1)
+
+    linhas = buscar_todos(sql, params) or []
+    return montar_pagina(linhas, ordenacao, limite, posicao)
+
+
+def montar_pagina(
+    linhas: List[dict],
+    ordenacao: Ordenacao,
+    limite: int,
+    posicao: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Corta a linha extra (limite + 1) e gera os cursores da página.
+
+    Args:
+        linhas: Resultado da consulta, na ordem em que foi buscado
+        ordenacao: A mesma usada na consulta
+        limite: Linhas por página
+        posicao: Cursor decodificado que originou a busca (None = primeira página)
+    """
+    anterior = bool(posicao and posicao.get('a'))
+    # A linha extra só indica que há mais na direção buscada
+    ha_mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    if anterior:
+        linhas.reverse()
+
+    def cursor_da(linha: dict, para_tras: bool) -> str:
+        return codificar_cursor({'k': [linha[campo] for _, campo, _ in ordenacao], 'a': int(para_tras)})
+
+    proximo = cursor_anterior = None
+    if linhas:
+        # Voltando, sempre há a página de onde se veio; avançando, só se sobrou linha
+        if anterior or ha_mais:
+            proximo = cursor_da(linhas[-1], False)
+        if (anterior and ha_mais) or (posicao is not None and not anterior):
+            cursor_anterior = cursor_da(linhas[0], True)
+
+    return {'itens': linhas, 'proximo_cursor': proximo, 'cursor_anterior': cursor_anterior}
+
+
+def chave_cursor(posicao: Optional[Dict[str, Any]], tamanho: int) -> Optional[List[Any]]:
+    """Valores da chave guardados no cursor (ValueError se não baterem com a ordenação)."""
+    if posicao is None:
+        return None
+    chave = posicao.get('k')
+    if not isinstance(chave, list) or len(chave) != tamanho:
+        raise ValueError("Cursor de paginação inválido")
+    return chave
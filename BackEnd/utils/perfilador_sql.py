@@ -0,0 +1,243 @@
+"""
+Perfilador de SQL opcional para os helpers do Database (executar, buscar_um,
+buscar_todos e as variantes preparadas).
+
+Agrupa as consultas por impressão digital (literais e parâmetros trocados
+por ?), acumula chamadas/tempo/linhas, registra as lentas com os parâmetros
+ocultados e, se pedido, guarda o EXPLAIN (ANALYZE, BUFFERS) das piores.
+Ver Database.ativar_perfilador().
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETROS = re.compile(r'%\([^)]+\)s|%s|\$\d+')
+_NUMEROS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_LINHAS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_ESPACOS = re.compile(r'\s+')
+
+# Só consultas de leitura podem passar por EXPLAIN ANALYZE (que executa a consulta)
+_ESCRITA = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|GRANT|COPY|CALL|DO)\b', re.I)
+_TRAVA = re.compile(r'\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b|\bNOWAIT\b|\bSKIP\s+LOCKED\b', re.I)
+
+
+def impressao_digital(sql: str) -> str:
+    """
+    Forma normalizada da consulta: sem comentários, espaços colapsados e
+    textos/números/parâmetros trocados por ?; listas (?, ?, ...) e várias
+    linhas de VALUES viram um único (...).
+    """
+    texto = _COMENTARIOS.sub(' ', sql)
+    texto = _TEXTOS.sub('?', texto)
+    texto = _PARAMETROS.sub('?', texto)
+    texto = _NUMEROS.sub('?', texto)
+    texto = _LISTAS.sub('(...)', texto)
+    texto = _LINHAS.sub('(...)', texto)
+    return _ESPACOS.sub(' ', texto).strip()
+
+
+def ocultar_parametros(params: Any) -> Any:
+    """Troca cada valor por tipo e tamanho (ex.: <str:14>), preservando a forma."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {chave: ocultar_parametros(valor) for chave, valor in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [ocultar_parametros(valor) for valor in params]
+    if isinstance(params, (str, bytes)):
+        return f"<{type(params).__name__}:{len(params)}>"
+    return f"<{type(params).__name__}>"
+
+
+def somente_leitura(sql: str) -> bool:
+    """SELECT/WITH sem comandos de escrita nem travas de linha."""
+    texto = _COMENTARIOS.sub(' ', sql).lstrip().upper()
+    if not texto.startswith(('SELECT', 'WITH', 'VALUES', 'TABLE')):
+        return False
+    texto = _TEXTOS.sub("''", texto)
+    return not _ESCRITA.search(texto) and not _TRAVA.search(texto)
+
+
+class PerfiladorSQL:
+    """
+    Estatísticas por impressão digital de consulta.
+
+    - limite_lento_ms: consultas acima disso vão para o log de lentas
+      (print + últimas `max_lentas` em memória), com parâmetros ocultados
+    - explicar: guarda o EXPLAIN (ANALYZE, BUFFERS) quando uma consulta de
+      leitura passa de `limite_explain_ms` e bate o próprio máximo (no
+      máximo um plano por consulta a cada `intervalo_explain` segundos).
+      O EXPLAIN roda numa transação/savepoint desfeita logo em seguida
+    - relatorio(top): consultas ordenadas por tempo total
+    """
+
+    def __init__(
+        self,
+        limite_lento_ms: float = 200.0,
+        explicar: bool = False,
+        limite_explain_ms: Optional[float] = None,
+        intervalo_explain: float = 60.0,
+        max_lentas: int = 200,
+        max_consultas: int = 2000,
+        imprimir_lentas: bool = True
+    ):
+        self.limite_lento_ms = limite_lento_ms
+        self.explicar = explicar
+        self.limite_explain_ms = limite_lento_ms if limite_explain_ms is None else limite_explain_ms
+        self.intervalo_explain = intervalo_explain
+        self.max_consultas = max_consultas
+        self.imprimir_lentas = imprimir_lentas
+
+        self._consultas: Dict[str, Dict[str, Any]] = {}
+        self._lentas: Deque[Dict[str, Any]] = deque(maxlen=max_lentas)
+        # Texto original -> impressão digital (os textos das consultas se repetem)
+        self._digitais: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digital(self, sql: str) -> str:
+        digital = self._digitais.get(sql)
+        if digital is None:
+            digital = impressao_digital(sql)
+            with self._lock:
+                self._digitais[sql] = digital
+                if len(self._digitais) > self.max_consultas:
+                    self._digitais.popitem(last=False)
+        return digital
+
+    def executar(self, conn, cursor, query: str, params=None):
+        """cursor.execute() medido (usado pelos helpers do Database)."""
+        inicio = time.perf_counter()
+        cursor.execute(query, params or ())
+        self.registrar(query, params, (time.perf_counter() - inicio) * 1000, cursor.rowcount, conn)
+        return cursor
+
+    def registrar(
+        self,
+        sql: str,
+        params: Any,
+        duracao_ms: float,
+        linhas: int,
+        conn=None,
+        comando_explain: Optional[str] = None
+    ) -> None:
+        """
+        Soma uma execução às estatísticas da consulta.
+
+        Args:
+            sql: Texto da consulta (agrupado pela impressão digital)
+            params: Parâmetros usados (só aparecem ocultados)
+            duracao_ms: Tempo da execução
+            linhas: Linhas devolvidas/afetadas (rowcount)
+            conn: Conexão, necessária para o EXPLAIN
+            comando_explain: O que explicar no lugar de `sql` (ex.: EXECUTE nome (%s))
+        """
+        digital = self._digital(sql)
+        linhas = max(linhas or 0, 0)
+        with self._lock:
+            estatistica = self._consultas.get(digital)
+            if estatistica is None:
+                if len(self._consultas) >= self.max_consultas:
+                    return
+                estatistica = self._consultas[digital] = {
+                    'consulta': digital,
+                    'chamadas': 0,
+                    'tempo_total_ms': 0.0,
+                    'tempo_max_ms': 0.0,
+                    'linhas': 0,
+                    'lentas': 0,
+                    'plano': None,
+                    'plano_em': None,
+                }
+            novo_maximo = duracao_ms > estatistica['tempo_max_ms']
+            estatistica['chamadas'] += 1
+            estatistica['tempo_total_ms'] += duracao_ms
+            estatistica['tempo_max_ms'] = max(estatistica['tempo_max_ms'], duracao_ms)
+            estatistica['linhas'] += linhas
+            lenta = duracao_ms >= self.limite_lento_ms
+            if lenta:
+                estatistica['lentas'] += 1
+
+        if lenta:
+            registro = {
+                'quando': datetime.now().isoformat(timespec='seconds'),
+                'duracao_ms': round(duracao_ms, 3),
+                'linhas': linhas,
+                'consulta': digital,
+                'parametros': ocultar_parametros(params),
+            }
+            self._lentas.append(registro)
+            if self.imprimir_lentas:
+                print(f"🐢 SQL lenta ({registro['duracao_ms']} ms, {linhas} linhas): {digital[:300]} "
+                      f"params={registro['parametros']}")
+
+        if (self.explicar and conn is not None and novo_maximo
+                and duracao_ms >= self.limite_explain_ms and somente_leitura(sql)):
+            agora = time.monotonic()
+            if estatistica['plano_em'] is None or agora - estatistica['plano_em'] >= self.intervalo_explain:
+                estatistica['plano_em'] = agora
+                plano = self._explain(conn, comando_explain or sql, params)
+                if plano is not None:
+                    estatistica['plano'] = plano
+
+    @staticmethod
+    def _explain(conn, sql: str, params: Any) -> Optional[str]:
+        """EXPLAIN (ANALYZE, BUFFERS) desfeito em seguida, sem afetar a transação de quem chamou."""
+        cursor = conn.cursor()
+        em_transacao = not conn.autocommit
+        try:
+            cursor.execute("SAVEPOINT perfilador_explain" if em_transacao else "BEGIN")
+            try:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params or ())
+                return '\n'.join(linha[0] for linha in cursor.fetchall())
+            finally:
+                cursor.execute("ROLLBACK TO SAVEPOINT perfilador_explain" if em_transacao else "ROLLBACK")
+                if em_transacao:
+                    cursor.execute("RELEASE SAVEPOINT perfilador_explain")
+        except Exception as e:
+            print(f"Aviso: EXPLAIN do perfilador falhou: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def relatorio(self, top: int = 20, ordenar_por: str = 'tempo_total_ms') -> List[Dict[str, Any]]:
+        """
+        Consultas mais caras.
+
+        Args:
+            top: Quantas devolver
+            ordenar_por: 'tempo_total_ms', 'tempo_max_ms', 'tempo_medio_ms', 'chamadas' ou 'linhas'
+
+        Returns:
+            Lista de dicts (consulta, chamadas, tempos em ms, % do tempo total, linhas, plano)
+        """
+        with self._lock:
+            copias = [dict(e) for e in self._consultas.values()]
+        total = sum(e['tempo_total_ms'] for e in copias) or 1.0
+        for e in copias:
+            e.pop('plano_em', None)
+            e['tempo_medio_ms'] = round(e['tempo_total_ms'] / e['chamadas'], 3) if e['chamadas'] else 0.0
+            e['percentual_tempo'] = round(100 * e['tempo_total_ms'] / total, 2)
+            e['linhas_por_chamada'] = round(e['linhas'] / e['chamadas'], 2) if e['chamadas'] else 0.0
+            e['tempo_total_ms'] = round(e['tempo_total_ms'], 3)
+            e['tempo_max_ms'] = round(e['tempo_max_ms'], 3)
+        copias.sort(key=lambda e: e.get(ordenar_por, 0), reverse=True)
+        return copias[:top]
+
+    def lentas(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Últimas consultas lentas (mais recentes primeiro)."""
+        return list(self._lentas)[::-1][:limite]
+
+    def zerar(self) -> None:
+        """Descarta estatísticas, planos e o log de lentas."""
+        with self._lock:
+            self._consultas.clear()
+            self._lentas.clear()
+
+    def __repr__(self) -> str:
+        return f"<PerfiladorSQL(consultas={len(self._consultas)}, limite_lento_ms={self.limite_lento_ms})>"
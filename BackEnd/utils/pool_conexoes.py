@@ -0,0 +1,218 @@
+"""
+Pool de conexões PostgreSQL thread-safe (checkout/checkin).
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera."""
+
+
+class PoolConexoes:
+    """
+    Pool de conexões com tamanho mínimo/máximo configurável.
+
+    - obter(): empresta uma conexão (bloqueia até `timeout` se o pool estiver cheio)
+    - devolver(): devolve a conexão, confirmando ou desfazendo transação pendente
+    - Conexões ociosas há mais de `verificar_apos` segundos passam por um
+      health check (SELECT 1) no checkout; conexões quebradas são descartadas
+      e substituídas por uma nova.
+    """
+
+    def __init__(
+        self,
+        minimo: int = 1,
+        maximo: int = 10,
+        timeout: float = 30.0,
+        verificar_apos: float = 30.0,
+        **parametros_conexao
+    ):
+        if minimo < 0 or maximo < 1 or minimo > maximo:
+            raise ValueError("Tamanhos inválidos para o pool (0 <= minimo <= maximo, maximo >= 1)")
+
+        self.minimo = minimo
+        self.maximo = maximo
+        self.timeout = timeout
+        self.verificar_apos = verificar_apos
+        self._parametros = parametros_conexao
+
+        self._livres: Deque[Tuple[Any, float]] = deque()
+        self._total = 0
+        self._emprestadas = 0
+        self._fechado = False
+        self._condicao = threading.Condition(threading.Lock())
+
+        self._estatisticas = {
+            'checkouts': 0,
+            'esperas': 0,
+            'descartadas': 0,
+            'criadas': 0
+        }
+
+        for _ in range(minimo):
+            conn = self._nova_conexao()
+            self._livres.append((conn, time.monotonic()))
+            self._total += 1
+
+    # ============================================
+    # CONEXÕES
+    # ============================================
+
+    def _nova_conexao(self):
+        """Abre uma conexão física nova com os parâmetros do pool."""
+        import psycopg2
+
+        conn = psycopg2.connect(**self._parametros)
+        with self._condicao:
+            self._estatisticas['criadas'] += 1
+        return conn
+
+    @staticmethod
+    def _conexao_saudavel(conn) -> bool:
+        """Executa um SELECT 1 para confirmar que a conexão responde."""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar_silenciosamente(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # ============================================
+    # CHECKOUT / CHECKIN
+    # ============================================
+
+    def obter(self, timeout: Optional[float] = None):
+        """
+        Empresta uma conexão do pool.
+
+        Args:
+            timeout: Tempo máximo de espera em segundos (padrão: o do pool)
+
+        Returns:
+            Conexão psycopg2 pronta para uso (autocommit desligado)
+
+        Raises:
+            PoolEsgotadoError: se nenhuma conexão ficar livre a tempo
+        """
+        espera = self.timeout if timeout is None else timeout
+        limite = time.monotonic() + espera
+
+        with self._condicao:
+            while True:
+                if self._fechado:
+                    raise PoolEsgotadoError("Pool de conexões encerrado")
+
+                if self._livres:
+                    conn, ociosa_desde = self._livres.pop()
+                    self._emprestadas += 1
+                    break
+
+                if self._total < self.maximo:
+                    # Reserva a vaga antes de abrir a conexão fora do lock
+                    self._total += 1
+                    self._emprestadas += 1
+                    conn, ociosa_desde = None, None
+                    break
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolEsgotadoError(
+                        f"Nenhuma conexão livre em {espera:.1f}s (máximo={self.maximo})"
+                    )
+                self._estatisticas['esperas'] += 1
+                self._condicao.wait(restante)
+
+            self._estatisticas['checkouts'] += 1
+
+        try:
+            if conn is None:
+                conn = self._nova_conexao()
+            elif conn.closed or (
+                time.monotonic() - ociosa_desde >= self.verificar_apos
+                and not self._conexao_saudavel(conn)
+            ):
+                self._fechar_silenciosamente(conn)
+                with self._condicao:
+                    self._estatisticas['descartadas'] += 1
+                conn = self._nova_conexao()
+        except Exception:
+            # Libera a vaga reservada se não foi possível (re)conectar
+            with self._condicao:
+                self._total -= 1
+                self._emprestadas -= 1
+                self._condicao.notify()
+            raise
+
+        return conn
+
+    def devolver(self, conn, descartar: bool = False, confirmar: bool = True) -> None:
+        """
+        Devolve uma conexão ao pool.
+
+        Args:
+            conn: Conexão obtida com obter()
+            descartar: Fecha a conexão em vez de reaproveitá-la
+            confirmar: Se houver transação aberta, faz commit (True) ou rollback (False)
+        """
+        from psycopg2 import extensions
+
+        if not descartar and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_INTRANS and confirmar:
+                    conn.commit()
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                # Volta ao estado padrão de uma conexão recém-aberta
+                conn.autocommit = False
+            except Exception:
+                descartar = True
+
+        with self._condicao:
+            self._emprestadas -= 1
+            if descartar or conn.closed or self._fechado:
+                self._total -= 1
+                self._estatisticas['descartadas'] += 1
+                self._fechar_silenciosamente(conn)
+            else:
+                self._livres.append((conn, time.monotonic()))
+            self._condicao.notify()
+
+    def fechar(self) -> None:
+        """Fecha todas as conexões ociosas e impede novos checkouts."""
+        with self._condicao:
+            self._fechado = True
+            while self._livres:
+                conn, _ = self._livres.pop()
+                self._total -= 1
+                self._fechar_silenciosamente(conn)
+            self._condicao.notify_all()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna contadores de uso do pool."""
+        with self._condicao:
+            return {
+                'minimo': self.minimo,
+                'maximo': self.maximo,
+                'total': self._total,
+                'livres': len(self._livres),
+                'emprestadas': self._emprestadas,
+                **self._estatisticas
+            }
+
+    def __repr__(self) -> str:
+        return f"<PoolConexoes(total={self._total}, livres={len(self._livres)}, maximo={self.maximo})>"
@@ -0,0 +1,283 @@
+"""
+Entrega de arquivos estáticos (FrontEnd/assets) com cache de metadados,
+GET condicional, variantes gzip e sendfile.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import stat
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+
+# Mesmos tipos que o servidor sempre usou; o resto vem de mimetypes
+TIPOS_CONTEUDO = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.svg': 'image/svg+xml',
+    '.ico': 'image/x-icon',
+}
+
+TIPOS_COMPRIMIVEIS = (
+    'text/', 'application/javascript', 'application/json', 'image/svg+xml'
+)
+
+# nome.<hash hex de 8+ dígitos>.ext (ex.: main.3f2a9c1b.js) -> conteúdo imutável
+PADRAO_FINGERPRINT = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+
+
+class _Descritor:
+    """Descritor de arquivo aberto, fechado quando ninguém mais o usa."""
+
+    def __init__(self, caminho: str):
+        self.fd = os.open(caminho, os.O_RDONLY)
+
+    def __del__(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class ArquivoEstatico:
+    """Metadados (e, para arquivos pequenos, o conteúdo) de um arquivo servido."""
+
+    def __init__(self, caminho: str, estado: os.stat_result, fingerprint: bool):
+        self.caminho = caminho
+        self.tamanho = estado.st_size
+        self.mtime_ns = estado.st_mtime_ns
+        self.etag = f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+        self.ultima_modificacao = formatdate(estado.st_mtime, usegmt=True)
+        self.mtime_segundos = int(estado.st_mtime)
+
+        extensao = os.path.splitext(caminho)[1].lower()
+        self.tipo_conteudo = (
+            TIPOS_CONTEUDO.get(extensao)
+            or mimetypes.guess_type(caminho)[0]
+            or 'application/octet-stream'
+        )
+        self.comprimivel = self.tipo_conteudo.startswith(TIPOS_COMPRIMIVEIS)
+        self.cache_control = CACHE_IMUTAVEL if fingerprint else CACHE_REVALIDAR
+
+        self.conteudo: Optional[bytes] = None
+        self.conteudo_gzip: Optional[bytes] = None
+        self.descritor: Optional[_Descritor] = None
+        self.verificado_em = time.monotonic()
+
+
+class ServidorEstatico:
+    """
+    Serve arquivos de um diretório raiz.
+
+    - Metadados (tamanho, mtime, ETag) ficam em memória; o disco só é
+      consultado (os.stat) a cada `intervalo_verificacao` segundos por arquivo
+    - If-None-Match / If-Modified-Since respondem 304 sem corpo
+    - Arquivos com fingerprint no nome (main.3f2a9c1b.js) ou pedidos com
+      ?v=... recebem cache de um ano (immutable); os demais, no-cache
+      (o navegador revalida e normalmente recebe 304)
+    - Arquivos até `limite_memoria` bytes ficam em memória; os de texto
+      ganham uma variante gzip, escolhida via Accept-Encoding
+    - Arquivos maiores são enviados com os.sendfile a partir de um descritor
+      mantido aberto (com fallback para leitura em blocos)
+    """
+
+    def __init__(
+        self,
+        raiz: str,
+        limite_memoria: int = 256 * 1024,
+        intervalo_verificacao: float = 2.0,
+        nivel_gzip: int = 6
+    ):
+        self.raiz = os.path.realpath(raiz)
+        self.limite_memoria = limite_memoria
+        self.intervalo_verificacao = intervalo_verificacao
+        self.nivel_gzip = nivel_gzip
+
+        self._arquivos: Dict[str, ArquivoEstatico] = {}
+        self._lock = threading.Lock()
+
+    # ============================================
+    # RESOLUÇÃO / CACHE DE METADADOS
+    # ============================================
+
+    def _caminho_seguro(self, rel_path: str) -> Optional[str]:
+        caminho = os.path.realpath(os.path.join(self.raiz, rel_path.lstrip('/')))
+        if os.path.commonpath([self.raiz, caminho]) != self.raiz:
+            return None
+        return caminho
+
+    def _carregar(self, caminho: str, estado: os.stat_result, fingerprint: bool) -> ArquivoEstatico:
+        arquivo = ArquivoEstatico(caminho, estado, fingerprint)
+        if arquivo.tamanho <= self.limite_memoria:
+            with open(caminho, 'rb') as f:
+                arquivo.conteudo = f.read()
+            if arquivo.comprimivel and arquivo.tamanho > 256:
+                comprimido = gzip.compress(arquivo.conteudo, compresslevel=self.nivel_gzip, mtime=0)
+                if len(comprimido) < arquivo.tamanho:
+                    arquivo.conteudo_gzip = comprimido
+        else:
+            arquivo.descritor = _Descritor(caminho)
+        return arquivo
+
+    def resolver(self, rel_path: str, fingerprint: bool = False) -> Optional[ArquivoEstatico]:
+        """
+        Retorna o arquivo (do cache, revalidado com os.stat periodicamente).
+
+        Args:
+            rel_path: Caminho relativo à raiz
+            fingerprint: Pedido versionado (ex.: ?v=...), cacheável por um ano
+
+        Returns:
+            ArquivoEstatico ou None se não existir/estiver fora da raiz
+        """
+        fingerprint = fingerprint or bool(PADRAO_FINGERPRINT.search(rel_path))
+        chave = f"{rel_path}|{int(fingerprint)}"
+
+        arquivo = self._arquivos.get(chave)
+        agora = time.monotonic()
+        if arquivo is not None and agora - arquivo.verificado_em < self.intervalo_verificacao:
+            return arquivo
+
+        caminho = self._caminho_seguro(rel_path)
+        if caminho is None:
+            return None
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            with self._lock:
+                self._arquivos.pop(chave, None)
+            return None
+        if not stat.S_ISREG(estado.st_mode):
+            return None
+
+        if arquivo is not None and arquivo.mtime_ns == estado.st_mtime_ns and arquivo.tamanho == estado.st_size:
+            arquivo.verificado_em = agora
+            return arquivo
+
+        # Novo ou alterado no disco; o descritor antigo fecha quando sair de uso
+        arquivo = self._carregar(caminho, estado, fingerprint)
+        with self._lock:
+            self._arquivos[chave] = arquivo
+        return arquivo
+
+    # ============================================
+    # RESPOSTA HTTP
+    # ============================================
+
+    @staticmethod
+    def _nao_modificado(handler, arquivo: ArquivoEstatico) -> bool:
+        se_nenhum = handler.headers.get('If-None-Match')
+        if se_nenhum:
+            # Compara ignorando W/ e o sufixo da variante gzip
+            etags = [e.strip().removeprefix('W/').replace('-gz"', '"') for e in se_nenhum.split(',')]
+            return '*' in etags or arquivo.etag in etags
+
+        se_modificado = handler.headers.get('If-Modified-Since')
+        if se_modificado:
+            try:
+                return arquivo.mtime_segundos <= int(parsedate_to_datetime(se_modificado).timestamp())
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _aceita_gzip(handler) -> bool:
+        for item in handler.headers.get('Accept-Encoding', '').split(','):
+            partes = [p.strip() for p in item.split(';')]
+            if partes[0].lower() in ('gzip', '*'):
+                for parametro in partes[1:]:
+                    if parametro.startswith('q='):
+                        try:
+                            return float(parametro[2:]) > 0
+                        except ValueError:
+                            return False
+                return True
+        return False
+
+    def servir(self, handler, rel_path: str, fingerprint: bool = False) -> bool:
+        """
+        Responde a requisição GET com o arquivo.
+
+        Args:
+            handler: BaseHTTPRequestHandler da requisição
+            rel_path: Caminho relativo à raiz
+            fingerprint: Pedido versionado (?v=...)
+
+        Returns:
+            False se o arquivo não existir (quem chama responde 404)
+        """
+        arquivo = self.resolver(rel_path, fingerprint)
+        if arquivo is None:
+            return False
+
+        usar_gzip = arquivo.conteudo_gzip is not None and self._aceita_gzip(handler)
+        corpo = arquivo.conteudo_gzip if usar_gzip else arquivo.conteudo
+        etag = arquivo.etag[:-1] + '-gz"' if usar_gzip else arquivo.etag
+
+        if self._nao_modificado(handler, arquivo):
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.send_header('Cache-Control', arquivo.cache_control)
+            if arquivo.comprimivel:
+                handler.send_header('Vary', 'Accept-Encoding')
+            handler.end_headers()
+            return True
+
+        handler.send_response(200)
+        handler.send_header('Content-type', arquivo.tipo_conteudo)
+        handler.send_header('Content-Length', str(len(corpo) if corpo is not None else arquivo.tamanho))
+        handler.send_header('ETag', etag)
+        handler.send_header('Last-Modified', arquivo.ultima_modificacao)
+        handler.send_header('Cache-Control', arquivo.cache_control)
+        if arquivo.comprimivel:
+            handler.send_header('Vary', 'Accept-Encoding')
+        if usar_gzip:
+            handler.send_header('Content-Encoding', 'gzip')
+        handler.end_headers()
+
+        if corpo is not None:
+            handler.wfile.write(corpo)
+        else:
+            self._enviar_arquivo(handler, arquivo)
+        return True
+
+    @staticmethod
+    def _enviar_arquivo(handler, arquivo: ArquivoEstatico) -> None:
+        """Envia o arquivo grande com sendfile (zero cópia) ou em blocos."""
+        descritor = arquivo.descritor
+        enviado = 0
+        if hasattr(os, 'sendfile'):
+            try:
+                destino = handler.connection.fileno()
+                while enviado < arquivo.tamanho:
+                    n = os.sendfile(destino, descritor.fd, enviado, arquivo.tamanho - enviado)
+                    if n == 0:
+                        break
+                    enviado += n
+                # sendfile não passa pelo wfile: informa os bytes às métricas
+                contar = getattr(handler.wfile, 'contar', None)
+                if contar is not None:
+                    contar(enviado)
+                return
+            except (OSError, ValueError, AttributeError):
+                # Socket sem fd real (TLS, testes) ou não bloqueante: segue em blocos
+                pass
+
+        while enviado < arquivo.tamanho:
+            bloco = os.pread(descritor.fd, min(256 * 1024, arquivo.tamanho - enviado), enviado)
+            if not bloco:
+                break
+            handler.wfile.write(bloco)
+            enviado += len(bloco)
+
+    def __repr__(self) -> str:
+        return f"<ServidorEstatico(raiz={self.raiz!r}, arquivos={len(self._arquivos)})>"
@@ -0,0 +1,142 @@
+"""
+Cache de respostas das rotas de leitura (TTL + invalidação por evento + single-flight).
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from utils.eventos import BarramentoEventos, TipoEvento
+
+
+class _Calculo:
+    """Cálculo em andamento de uma chave; outras threads esperam por ele."""
+
+    def __init__(self, geracao: int):
+        self.geracao = geracao
+        self.pronto = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class CacheRespostas:
+    """
+    Guarda respostas por chave durante `ttl` segundos.
+
+    - obter(chave, calcular, ttl): devolve do cache ou chama `calcular()`;
+      várias requisições simultâneas sem cache para a mesma chave resultam
+      em uma única chamada (as demais esperam e recebem o mesmo resultado)
+    - invalidar(chave): descarta a entrada; um cálculo iniciado antes da
+      invalidação entrega seu resultado a quem esperava, mas não é guardado
+    - conectar(): inscreve o cache no BarramentoEventos, invalidando as
+      chaves associadas a cada TipoEvento
+    """
+
+    def __init__(self):
+        self._entradas: Dict[str, Tuple[Any, float]] = {}
+        self._geracoes: Dict[str, int] = {}
+        self._calculos: Dict[str, _Calculo] = {}
+        self._dependencias: Dict[TipoEvento, set] = {}
+        self._lock = threading.Lock()
+        self._estatisticas = {
+            'acertos': 0,
+            'faltas': 0,
+            'esperas': 0,
+            'invalidacoes': 0
+        }
+
+    def obter(
+        self,
+        chave: str,
+        calcular: Callable[[], Any],
+        ttl: float,
+        guardar_se: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Retorna a resposta da chave, calculando-a se necessário.
+
+        Args:
+            chave: Identificador da resposta (ex.: 'estatisticas-gerais')
+            calcular: Função que consulta o banco e monta a resposta
+            ttl: Validade em segundos
+            guardar_se: Critério para guardar o resultado (ex.: só respostas com sucesso)
+
+        Returns:
+            Resposta em cache ou recém-calculada
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[1] > time.monotonic():
+                self._estatisticas['acertos'] += 1
+                return entrada[0]
+
+            calculo = self._calculos.get(chave)
+            if calculo is None:
+                calculo = _Calculo(self._geracoes.get(chave, 0))
+                self._calculos[chave] = calculo
+                lider = True
+                self._estatisticas['faltas'] += 1
+            else:
+                lider = False
+                self._estatisticas['esperas'] += 1
+
+        if not lider:
+            calculo.pronto.wait()
+            if calculo.erro is not None:
+                raise calculo.erro
+            return calculo.resultado
+
+        try:
+            calculo.resultado = calcular()
+        except BaseException as e:
+            calculo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._calculos.pop(chave, None)
+                if (
+                    calculo.erro is None
+                    and calculo.geracao == self._geracoes.get(chave, 0)
+                    and (guardar_se is None or guardar_se(calculo.resultado))
+                ):
+                    self._entradas[chave] = (calculo.resultado, time.monotonic() + ttl)
+            calculo.pronto.set()
+
+        return calculo.resultado
+
+    def invalidar(self, chave: str) -> None:
+        """Descarta a resposta guardada para a chave."""
+        with self._lock:
+            self._entradas.pop(chave, None)
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._estatisticas['invalidacoes'] += 1
+
+    def limpar(self) -> None:
+        """Descarta todas as respostas guardadas."""
+        with self._lock:
+            for chave in list(self._entradas) + list(self._calculos):
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._entradas.clear()
+
+    def conectar(self, dependencias: Dict[TipoEvento, Iterable[str]]) -> None:
+        """
+        Associa tipos de evento às chaves que eles tornam obsoletas.
+
+        Args:
+            dependencias: TipoEvento -> chaves a invalidar quando o evento ocorrer
+        """
+        barramento = BarramentoEventos()
+        for tipo, chaves in dependencias.items():
+            self._dependencias.setdefault(tipo, set()).update(chaves)
+            barramento.inscrever(tipo, self._ao_receber_evento)
+
+    def _ao_receber_evento(self, tipo: TipoEvento, dados: Dict[str, Any]) -> None:
+        for chave in self._dependencias.get(tipo, ()):
+            self.invalidar(chave)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores de acertos/faltas e número de entradas guardadas."""
+        with self._lock:
+            return {**self._estatisticas, 'entradas': len(self._entradas)}
+
+    def __repr__(self) -> str:
+        return f"<CacheRespostas(entradas={len(self._entradas)})>"
@@ -0,0 +1,256 @@
+"""
+Controle de admissão das rotas que verificam senha (login e recuperação):
+limite de tentativas por IP e por conta (token bucket) e teto de
+verificações simultâneas, com rejeição rápida e Retry-After.
+"""
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+
+class AdmissaoNegadaError(Exception):
+    """Tentativa recusada antes de chegar ao banco."""
+
+    def __init__(self, mensagem: str, retry_after: float, status: int = 429):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+        self.status = status
+
+    @property
+    def retry_after_segundos(self) -> int:
+        """Valor para o cabeçalho Retry-After (inteiro, mínimo 1)."""
+        return max(1, math.ceil(self.retry_after))
+
+
+class BackendAdmissao(ABC):
+    """Armazenamento dos baldes (compartilhado entre processos, se preciso)."""
+
+    @abstractmethod
+    def consumir(self, chave: str, capacidade: float, taxa: float) -> float:
+        """
+        Reabastece o balde (taxa tokens/s até a capacidade) e retira um token.
+
+        Returns:
+            Tokens restantes; negativo = sem token (tentativa recusada)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def devolver(self, chave: str, capacidade: float) -> None:
+        """Devolve um token ao balde (sem passar da capacidade)."""
+        raise NotImplementedError
+
+
+class BackendAdmissaoMemoria(BackendAdmissao):
+    """
+    Baldes em memória, divididos em faixas com lock próprio (threads
+    consultando chaves diferentes raramente disputam o mesmo lock).
+    Cada faixa guarda até max_chaves / num_faixas baldes (LRU).
+    """
+
+    def __init__(self, num_faixas: int = 32, max_chaves: int = 100_000):
+        self.num_faixas = num_faixas
+        self.max_por_faixa = max(1, max_chaves // num_faixas)
+        self._locks = [threading.Lock() for _ in range(num_faixas)]
+        self._baldes = [OrderedDict() for _ in range(num_faixas)]
+
+    def consumir(self, chave: str, capacidade: float, taxa: float) -> float:
+        i = hash(chave) % self.num_faixas
+        baldes: 'OrderedDict[str, Tuple[float, float]]' = self._baldes[i]
+        agora = time.monotonic()
+        with self._locks[i]:
+            tokens, atualizado = baldes.get(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - atualizado) * taxa)
+            if tokens >= 1:
+                tokens -= 1
+                restante = tokens
+            else:
+                restante = tokens - 1
+            baldes[chave] = (tokens, agora)
+            baldes.move_to_end(chave)
+            if len(baldes) > self.max_por_faixa:
+                baldes.popitem(last=False)
+        return restante
+
+    def devolver(self, chave: str, capacidade: float) -> None:
+        i = hash(chave) % self.num_faixas
+        with self._locks[i]:
+            balde = self._baldes[i].get(chave)
+            if balde is not None:
+                tokens, atualizado = balde
+                self._baldes[i][chave] = (min(capacidade, tokens + 1), atualizado)
+
+
+class BackendAdmissaoPostgres(BackendAdmissao):
+    """
+    Baldes na tabela UNLOGGED limite_taxa (ver script_banco.sql), para que
+    vários processos do servidor apliquem o mesmo limite. Reabastecimento e
+    consumo acontecem em um único UPSERT. Usa um pool próprio.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def consumir(self, chave: str, capacidade: float, taxa: float) -> float:
+        # O reabastecimento usa a versão travada da linha (l.*), então
+        # tentativas simultâneas de processos diferentes não gastam o mesmo token
+        reabastecido = "LEAST(%(capacidade)s, l.tokens + EXTRACT(EPOCH FROM clock_timestamp() - l.atualizado_em) * %(taxa)s)"
+        conn = self.pool.obter()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    INSERT INTO limite_taxa AS l (chave, tokens, admitida, atualizado_em)
+                    VALUES (%(chave)s, %(capacidade)s - 1, TRUE, clock_timestamp())
+                    ON CONFLICT (chave) DO UPDATE
+                    SET admitida = {reabastecido} >= 1,
+                        tokens = CASE WHEN {reabastecido} >= 1
+                                      THEN {reabastecido} - 1
+                                      ELSE {reabastecido} END,
+                        atualizado_em = clock_timestamp()
+                    RETURNING tokens, admitida
+                """, {'chave': chave, 'capacidade': capacidade, 'taxa': taxa})
+                tokens, admitida = cursor.fetchone()
+            self.pool.devolver(conn, confirmar=True)
+        except Exception:
+            self.pool.devolver(conn, confirmar=False)
+            raise
+        tokens = float(tokens)
+        return tokens if admitida else tokens - 1
+
+    def devolver(self, chave: str, capacidade: float) -> None:
+        conn = self.pool.obter()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE limite_taxa SET tokens = LEAST(%s, tokens + 1) WHERE chave = %s",
+                    (capacidade, chave)
+                )
+            self.pool.devolver(conn, confirmar=True)
+        except Exception:
+            self.pool.devolver(conn, confirmar=False)
+            raise
+
+
+class ControleAdmissao:
+    """
+    Admissão das tentativas de senha antes de consultar o banco.
+
+    - entrar(ip, conta): consome um token do balde do IP e um do balde da
+      conta (e-mail); sem token, levanta AdmissaoNegadaError (429) com o
+      tempo até o próximo token
+    - sucesso(conta): devolve o token da conta após um login certo, para
+      que só as tentativas erradas esgotem o balde da conta
+    - verificacao(): reserva uma das `max_verificacoes` vagas de verificação
+      de senha (crypt/bcrypt no banco); se nenhuma liberar em `espera_maxima`
+      segundos, levanta AdmissaoNegadaError (503)
+    - Falha no backend compartilhado não bloqueia o login: a tentativa passa
+    """
+
+    def __init__(
+        self,
+        capacidade_ip: float = 20,
+        taxa_ip: float = 20 / 60,
+        capacidade_conta: float = 5,
+        taxa_conta: float = 5 / 300,
+        max_verificacoes: int = 4,
+        espera_maxima: float = 2.0,
+        backend: Optional[BackendAdmissao] = None
+    ):
+        self.capacidade_ip = capacidade_ip
+        self.taxa_ip = taxa_ip
+        self.capacidade_conta = capacidade_conta
+        self.taxa_conta = taxa_conta
+        self.max_verificacoes = max_verificacoes
+        self.espera_maxima = espera_maxima
+        self.backend = backend or BackendAdmissaoMemoria()
+        self._vagas = threading.BoundedSemaphore(max_verificacoes)
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self._estatisticas = {
+            'admitidas': 0,
+            'negadas_ip': 0,
+            'negadas_conta': 0,
+            'negadas_concorrencia': 0
+        }
+
+    def definir_backend(self, backend: BackendAdmissao) -> None:
+        """Troca o armazenamento dos baldes (ex.: BackendAdmissaoPostgres)."""
+        self.backend = backend
+
+    def _contar(self, nome: str) -> None:
+        with self._lock:
+            self._estatisticas[nome] += 1
+
+    def _consumir(self, chave: str, capacidade: float, taxa: float) -> float:
+        try:
+            return self.backend.consumir(chave, capacidade, taxa)
+        except Exception as e:
+            print(f"Aviso: controle de admissão indisponível ({e}); tentativa liberada")
+            return capacidade
+
+    def entrar(self, ip: Optional[str], conta: Optional[str]) -> None:
+        """
+        Registra uma tentativa.
+
+        Args:
+            ip: Endereço do cliente
+            conta: Login/e-mail informado (None se ausente)
+
+        Raises:
+            AdmissaoNegadaError: limite do IP ou da conta esgotado
+        """
+        if ip:
+            restante = self._consumir(f"ip:{ip}", self.capacidade_ip, self.taxa_ip)
+            if restante < 0:
+                self._contar('negadas_ip')
+                raise AdmissaoNegadaError(
+                    'Muitas tentativas deste endereço. Aguarde e tente novamente.',
+                    -restante / self.taxa_ip
+                )
+        if conta:
+            conta = str(conta).strip().lower()
+            restante = self._consumir(f"conta:{conta}", self.capacidade_conta, self.taxa_conta)
+            if restante < 0:
+                self._contar('negadas_conta')
+                raise AdmissaoNegadaError(
+                    'Muitas tentativas para esta conta. Aguarde e tente novamente.',
+                    -restante / self.taxa_conta
+                )
+        self._contar('admitidas')
+
+    def sucesso(self, conta: Optional[str]) -> None:
+        """Devolve o token gasto por entrar() em uma tentativa que deu certo."""
+        if not conta:
+            return
+        conta = str(conta).strip().lower()
+        try:
+            self.backend.devolver(f"conta:{conta}", self.capacidade_conta)
+        except Exception as e:
+            print(f"Aviso: não foi possível devolver o token da conta ({e})")
+
+    @contextmanager
+    def verificacao(self):
+        """Vaga para uma verificação de senha; levanta AdmissaoNegadaError (503) se lotado."""
+        if not self._vagas.acquire(timeout=self.espera_maxima):
+            self._contar('negadas_concorrencia')
+            raise AdmissaoNegadaError('Servidor ocupado, tente novamente', 1.0, status=503)
+        with self._lock:
+            self._em_andamento += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._em_andamento -= 1
+            self._vagas.release()
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores de tentativas admitidas/negadas e verificações em andamento."""
+        with self._lock:
+            return {**self._estatisticas, 'verificacoes_em_andamento': self._em_andamento}
+
+    def __repr__(self) -> str:
+        return f"<ControleAdmissao(max_verificacoes={self.max_verificacoes}, backend={type(self.backend).__name__})>"
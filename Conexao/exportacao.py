@@ -0,0 +1,193 @@
+"""
+Exportação completa de tabelas para o admin (CSV ou NDJSON), lida com cursor
+no servidor e enviada em partes, opcionalmente comprimida com gzip.
+"""
+import csv
+import io
+import zlib
+from typing import Any, Iterable, Iterator, List, Sequence
+
+from respostas_json import CODIFICADOR, TAMANHO_BLOCO, escrever_em_partes
+
+# Extrações disponíveis (ordem estável pela chave primária). Sem hashes de senha.
+CONSULTAS_EXPORTACAO = {
+    'usuarios': """
+        SELECT
+            u.id_usuario,
+            u.nome,
+            u.email,
+            tu.descricao_tipo AS tipo,
+            s.descricao_status AS status,
+            d.id_doador,
+            b.id_beneficiario,
+            cu.data_ultimo_login
+        FROM usuario u
+        LEFT JOIN tipo_usuario tu ON u.id_tipo = tu.id_tipo
+        LEFT JOIN status s ON u.id_status = s.id_status
+        LEFT JOIN credencial_usuario cu ON u.id_credencial = cu.id_credencial
+        LEFT JOIN doador d ON d.id_usuario = u.id_usuario
+        LEFT JOIN beneficiario b ON b.id_usuario = u.id_usuario
+        ORDER BY u.id_usuario
+    """,
+    'creditos': """
+        SELECT
+            c.id_credito,
+            c.id_doador,
+            c.quantidade_inicial_kwh,
+            c.quantidade_disponivel_kwh,
+            c.data_expiracao,
+            sc.descricao_status AS status
+        FROM credito c
+        LEFT JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
+        ORDER BY c.id_credito
+    """,
+    'fila': """
+        SELECT
+            f.id_fila,
+            f.id_beneficiario,
+            f.prioridade,
+            f.data_entrada,
+            f.renda_familiar,
+            f.consumo_medio_kwh,
+            f.num_moradores,
+            sf.descricao_status_fila AS status
+        FROM fila_espera f
+        LEFT JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+        ORDER BY f.id_fila
+    """,
+    'transacoes': """
+        SELECT
+            t.id_transacao,
+            t.id_credito,
+            t.id_beneficiario,
+            t.quantidade_kwh,
+            t.data_transacao,
+            st.descricao_status AS status,
+            tm.descricao_tipo AS tipo_movimento
+        FROM transacao t
+        LEFT JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
+        LEFT JOIN tipo_movimento tm ON t.id_tipo_movimentacao = tm.id_tipo_movimentacao
+        ORDER BY t.id_transacao
+    """,
+    'logs': """
+        SELECT
+            la.id_log,
+            la.data_hora,
+            la.id_usuario,
+            ta.descricao_tipo_acao AS tipo_acao,
+            sl.descricao_status_log AS status,
+            la.ip_acesso,
+            la.detalhes
+        FROM log_auditoria la
+        LEFT JOIN tipo_acao ta ON la.id_tipo_acao = ta.id_tipo_acao
+        LEFT JOIN status_log sl ON la.id_status_log = sl.id_status_log
+        ORDER BY la.id_log
+    """,
+}
+
+FORMATOS_EXPORTACAO = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _texto_csv(colunas: Sequence[str], linhas: Iterable[Sequence[Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\n')
+    escritor.writerow(colunas)
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _texto_ndjson(colunas: Sequence[str], linhas: Iterable[Sequence[Any]]) -> Iterator[str]:
+    pendentes: List[str] = []
+    tamanho = 0
+    for linha in linhas:
+        texto = CODIFICADOR.encode(dict(zip(colunas, linha))) + '\n'
+        pendentes.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(pendentes)
+            pendentes.clear()
+            tamanho = 0
+    yield ''.join(pendentes)
+
+
+def blocos_exportacao(cursor, formato: str, comprimir: bool = False) -> Iterator[bytes]:
+    """
+    Converte as linhas de um cursor em blocos do arquivo exportado.
+
+    Args:
+        cursor: Cursor (nomeado) já executado; iterado uma única vez
+        formato: 'csv' ou 'ndjson'
+        comprimir: Comprime com gzip à medida que gera
+
+    Returns:
+        Iterador de blocos de bytes
+    """
+    linhas = iter(cursor)
+    # Cursor nomeado só preenche description depois da primeira busca
+    primeira = next(linhas, None)
+    colunas = [d[0] for d in cursor.description] if cursor.description else []
+
+    def todas():
+        if primeira is not None:
+            yield primeira
+            yield from linhas
+
+    gerar = _texto_csv if formato == 'csv' else _texto_ndjson
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # wbits=31: formato gzip
+    for texto in gerar(colunas, todas()):
+        bloco = texto.encode('utf-8')
+        if compressor is not None:
+            bloco = compressor.compress(bloco)
+        if bloco:
+            yield bloco
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def exportar_tabela(handler, db, tabela: str, formato: str = 'csv', comprimir: bool = False,
+                    itersize: int = 2000) -> None:
+    """
+    Envia a extração completa de uma tabela como resposta (Transfer-Encoding: chunked).
+
+    Args:
+        handler: SimpleHandler da requisição
+        db: Database da requisição
+        tabela: Chave de CONSULTAS_EXPORTACAO
+        formato: Chave de FORMATOS_EXPORTACAO
+        comprimir: Envia com Content-Encoding: gzip
+        itersize: Linhas trazidas do banco por ida
+    """
+    with db.cursor_servidor(CONSULTAS_EXPORTACAO[tabela], itersize=itersize) as cursor:
+        blocos = blocos_exportacao(cursor, formato, comprimir)
+        # Primeiro bloco antes dos cabeçalhos: erro na consulta ainda vira resposta 500
+        primeiro = next(blocos, b'')
+
+        handler.send_response(200)
+        handler.send_header('Content-type', FORMATOS_EXPORTACAO[formato])
+        handler.send_header('Content-Disposition', f'attachment; filename="{tabela}.{formato}"')
+        handler.send_header('Cache-Control', 'no-store')
+        if comprimir:
+            handler.send_header('Content-Encoding', 'gzip')
+        # HTTP/1.0 não tem chunked: o fim do corpo é o fechamento da conexão
+        em_partes = handler.request_version == 'HTTP/1.1'
+        if em_partes:
+            handler.send_header('Transfer-Encoding', 'chunked')
+        handler.end_headers()
+
+        def todos():
+            yield primeiro
+            yield from blocos
+
+        if em_partes:
+            escrever_em_partes(handler.wfile, todos())
+        else:
+            for bloco in todos():
+                handler.wfile.write(bloco)
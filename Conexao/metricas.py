@@ -0,0 +1,241 @@
+"""
+Métricas por rota do servidor HTTP: latência (histograma), códigos de status,
+bytes enviados e custo de banco (consultas e tempo), expostas em JSON
+(/api/admin/perf) e no formato texto do Prometheus (/metrics).
+
+Cada thread de atendimento escreve apenas nos próprios contadores; a leitura
+soma os contadores de todas as threads. Nenhum lock no caminho da requisição.
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Limites dos baldes de latência em segundos (mesmos padrões dos clientes Prometheus)
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIXO = 'energia'
+
+
+class ContadoresRota:
+    """Contadores de uma rota em uma thread."""
+
+    __slots__ = ('baldes', 'requisicoes', 'segundos', 'bytes_enviados',
+                 'consultas_db', 'segundos_db', 'status')
+
+    def __init__(self):
+        self.baldes = [0] * (len(LIMITES_LATENCIA) + 1)
+        self.requisicoes = 0
+        self.segundos = 0.0
+        self.bytes_enviados = 0
+        self.consultas_db = 0
+        self.segundos_db = 0.0
+        self.status: Dict[int, int] = {}
+
+    def somar(self, outro: 'ContadoresRota') -> None:
+        for i, n in enumerate(outro.baldes):
+            self.baldes[i] += n
+        self.requisicoes += outro.requisicoes
+        self.segundos += outro.segundos
+        self.bytes_enviados += outro.bytes_enviados
+        self.consultas_db += outro.consultas_db
+        self.segundos_db += outro.segundos_db
+        for status, n in list(outro.status.items()):
+            self.status[status] = self.status.get(status, 0) + n
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Limite superior (s) do balde que contém o percentil; None acima do último limite."""
+        if not self.requisicoes:
+            return 0.0
+        alvo = max(1, math.ceil(p / 100 * self.requisicoes))
+        acumulado = 0
+        for i, n in enumerate(self.baldes):
+            acumulado += n
+            if acumulado >= alvo:
+                return LIMITES_LATENCIA[i] if i < len(LIMITES_LATENCIA) else None
+        return None
+
+
+class MetricasRotas:
+    """
+    Registro das requisições atendidas.
+
+    - registrar(): chamado no fim de cada requisição pela própria thread
+    - consolidado(): soma das threads, por rota (leitura concorrente; pode
+      não incluir a requisição que está terminando naquele instante)
+    - Rotas são rótulos fixos (ver rotulo_rota) para não criar uma série
+      nova por URL
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._por_thread: List[Dict[str, ContadoresRota]] = []
+        self._lock = threading.Lock()  # só no primeiro uso de cada thread
+        self.iniciado_em = time.time()
+
+    def _contadores_thread(self) -> Dict[str, ContadoresRota]:
+        contadores = getattr(self._local, 'rotas', None)
+        if contadores is None:
+            contadores = {}
+            self._local.rotas = contadores
+            with self._lock:
+                self._por_thread.append(contadores)
+        return contadores
+
+    def registrar(self, rota: str, status: int, segundos: float, bytes_enviados: int,
+                  consultas_db: int, segundos_db: float) -> None:
+        contadores = self._contadores_thread()
+        rota_atual = contadores.get(rota)
+        if rota_atual is None:
+            rota_atual = contadores[rota] = ContadoresRota()
+        rota_atual.baldes[bisect.bisect_left(LIMITES_LATENCIA, segundos)] += 1
+        rota_atual.requisicoes += 1
+        rota_atual.segundos += segundos
+        rota_atual.bytes_enviados += bytes_enviados
+        rota_atual.consultas_db += consultas_db
+        rota_atual.segundos_db += segundos_db
+        rota_atual.status[status] = rota_atual.status.get(status, 0) + 1
+
+    def consolidado(self) -> Dict[str, ContadoresRota]:
+        with self._lock:
+            threads = list(self._por_thread)
+        total: Dict[str, ContadoresRota] = {}
+        for contadores in threads:
+            for rota, valores in list(contadores.items()):
+                total.setdefault(rota, ContadoresRota()).somar(valores)
+        return total
+
+    def resumo(self) -> Dict[str, Any]:
+        """Visão JSON: por rota, percentis (ms), médias e totais."""
+        rotas = {}
+        for rota, c in sorted(self.consolidado().items()):
+            n = c.requisicoes or 1
+
+            def ms(valor):
+                return None if valor is None else round(valor * 1000, 3)
+
+            rotas[rota] = {
+                'requisicoes': c.requisicoes,
+                'status': {str(s): q for s, q in sorted(c.status.items())},
+                'latencia_media_ms': round(c.segundos / n * 1000, 3),
+                'latencia_p50_ms': ms(c.percentil(50)),
+                'latencia_p95_ms': ms(c.percentil(95)),
+                'latencia_p99_ms': ms(c.percentil(99)),
+                'bytes_enviados': c.bytes_enviados,
+                'consultas_db': c.consultas_db,
+                'consultas_db_por_requisicao': round(c.consultas_db / n, 2),
+                'tempo_db_ms': round(c.segundos_db * 1000, 3),
+                'tempo_db_medio_ms': round(c.segundos_db / n * 1000, 3),
+            }
+        return {'desde': round(self.iniciado_em, 3), 'uptime_s': round(time.time() - self.iniciado_em, 1), 'rotas': rotas}
+
+
+class EscritorContado:
+    """Envolve o wfile do handler e soma os bytes escritos na resposta."""
+
+    def __init__(self, destino):
+        self._destino = destino
+        self.bytes_enviados = 0
+
+    def write(self, dados) -> int:
+        n = self._destino.write(dados)
+        self.bytes_enviados += len(dados)
+        return n
+
+    def contar(self, n: int) -> None:
+        """Bytes enviados por fora do wfile (os.sendfile)."""
+        self.bytes_enviados += n
+
+    def __getattr__(self, nome):
+        return getattr(self._destino, nome)
+
+
+def rotulo_rota(metodo: str, caminho: str, inexistente: bool = False) -> str:
+    """
+    Rótulo da rota para as métricas: 'GET /api/admin/fila', 'GET /assets/*'...
+    Caminhos respondidos com a página 404 (inexistente=True) viram 'GET outras'.
+    """
+    if caminho.startswith(('/assets/', '/static/', '/images/')):
+        return f"{metodo} /{caminho.split('/', 2)[1]}/*"
+    if inexistente:
+        return f"{metodo} outras"
+    return f"{metodo} {caminho}"
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def formato_prometheus(metricas: MetricasRotas, componentes: Dict[str, Callable[[], Any]]) -> str:
+    """
+    Texto de exposição do Prometheus (versão 0.0.4).
+
+    Args:
+        metricas: Métricas das rotas
+        componentes: nome -> função que devolve o dict de estatisticas() do
+            componente (pool, cache, sessões...); valores numéricos viram gauges
+    """
+    linhas: List[str] = []
+
+    def metrica(nome: str, tipo: str, ajuda: str):
+        linhas.append(f"# HELP {PREFIXO}_{nome} {ajuda}")
+        linhas.append(f"# TYPE {PREFIXO}_{nome} {tipo}")
+
+    rotas = metricas.consolidado()
+
+    metrica('http_requisicoes_total', 'counter', 'Requisições atendidas por rota e status')
+    for rota, c in sorted(rotas.items()):
+        for status, n in sorted(c.status.items()):
+            linhas.append(f'{PREFIXO}_http_requisicoes_total{{rota="{_escapar(rota)}",status="{status}"}} {n}')
+
+    metrica('http_duracao_segundos', 'histogram', 'Latência das requisições por rota')
+    for rota, c in sorted(rotas.items()):
+        r = _escapar(rota)
+        acumulado = 0
+        for limite, n in zip(LIMITES_LATENCIA, c.baldes):
+            acumulado += n
+            linhas.append(f'{PREFIXO}_http_duracao_segundos_bucket{{rota="{r}",le="{limite}"}} {acumulado}')
+        linhas.append(f'{PREFIXO}_http_duracao_segundos_bucket{{rota="{r}",le="+Inf"}} {c.requisicoes}')
+        linhas.append(f'{PREFIXO}_http_duracao_segundos_sum{{rota="{r}"}} {_numero(c.segundos)}')
+        linhas.append(f'{PREFIXO}_http_duracao_segundos_count{{rota="{r}"}} {c.requisicoes}')
+
+    for nome, ajuda, campo in (
+        ('http_bytes_enviados_total', 'Bytes enviados (cabeçalhos + corpo)', 'bytes_enviados'),
+        ('db_consultas_total', 'Consultas ao banco feitas pelas requisições', 'consultas_db'),
+        ('db_duracao_segundos_total', 'Tempo esperando o banco', 'segundos_db'),
+    ):
+        metrica(nome, 'counter', ajuda)
+        for rota, c in sorted(rotas.items()):
+            linhas.append(f'{PREFIXO}_{nome}{{rota="{_escapar(rota)}"}} {_numero(getattr(c, campo))}')
+
+    for componente, obter in componentes.items():
+        try:
+            valores = obter() or {}
+        except Exception as e:
+            linhas.append(f"# {componente} indisponível: {_escapar(e)}")
+            continue
+        numericos = {k: v for k, v in valores.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        if numericos:
+            metrica(componente, 'gauge', f'Estatísticas de {componente} (rótulo chave)')
+            for chave, valor in sorted(numericos.items()):
+                linhas.append(f'{PREFIXO}_{componente}{{chave="{_escapar(chave)}"}} {_numero(valor)}')
+        # Um nível de aninhamento (ex.: instrucoes -> nome -> contadores)
+        aninhados = {k: v for k, v in valores.items() if isinstance(v, dict)}
+        if aninhados:
+            metrica(f'{componente}_item', 'gauge', f'Estatísticas de {componente} por item')
+            for item, campos in sorted(aninhados.items()):
+                for chave, valor in sorted(campos.items()):
+                    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                        linhas.append(
+                            f'{PREFIXO}_{componente}_item{{item="{_escapar(item)}",chave="{_escapar(chave)}"}} '
+                            f'{_numero(valor)}'
+                        )
+
+    metrica('uptime_segundos', 'gauge', 'Segundos desde o início do servidor')
+    linhas.append(f"{PREFIXO}_uptime_segundos {_numero(round(time.time() - metricas.iniciado_em, 3))}")
+    return '\n'.join(linhas) + '\n'
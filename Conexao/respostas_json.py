@@ -0,0 +1,101 @@
+"""
+Serialização das respostas JSON em uma única passagem, com envio em partes
+(Transfer-Encoding: chunked) para listas grandes.
+"""
+import decimal
+import json
+from datetime import date, datetime
+from typing import Any, Iterator
+
+# Listas a partir deste tamanho são serializadas item a item e enviadas em partes
+LIMITE_LISTA_STREAM = 200
+# Tamanho aproximado de cada parte enviada
+TAMANHO_BLOCO = 64 * 1024
+
+
+def converter_tipos(obj):
+    """Tipos que não vieram do banco já convertidos (Decimal/datas calculados em Python)."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f'Tipo {type(obj)} não é serializável')
+
+
+# Um codificador para o processo todo (o json.dumps montava um a cada chamada)
+CODIFICADOR = json.JSONEncoder(ensure_ascii=False, default=converter_tipos)
+
+
+def codificar_json(dados: Any) -> bytes:
+    """Serializa a resposta inteira (payloads pequenos)."""
+    return CODIFICADOR.encode(dados).encode('utf-8')
+
+
+def tem_lista_grande(dados: Any, limite: int = LIMITE_LISTA_STREAM) -> bool:
+    """Indica se a resposta (lista, ou dict com alguma lista) merece envio em partes."""
+    if isinstance(dados, list):
+        return len(dados) >= limite
+    if isinstance(dados, dict):
+        return any(isinstance(v, list) and len(v) >= limite for v in dados.values())
+    return False
+
+
+def _fragmentos(valor: Any, limite: int) -> Iterator[str]:
+    # Só as listas grandes são percorridas em Python; cada item (e qualquer
+    # outro valor) passa inteiro pelo codificador em C
+    if isinstance(valor, list) and len(valor) >= limite:
+        yield '['
+        for i, item in enumerate(valor):
+            if i:
+                yield ', '
+            yield CODIFICADOR.encode(item)
+        yield ']'
+    elif isinstance(valor, dict) and tem_lista_grande(valor, limite):
+        yield '{'
+        for i, (chave, item) in enumerate(valor.items()):
+            if i:
+                yield ', '
+            yield CODIFICADOR.encode(str(chave))
+            yield ': '
+            yield from _fragmentos(item, limite)
+        yield '}'
+    else:
+        yield CODIFICADOR.encode(valor)
+
+
+def blocos_json(
+    dados: Any,
+    limite: int = LIMITE_LISTA_STREAM,
+    tamanho_bloco: int = TAMANHO_BLOCO
+) -> Iterator[bytes]:
+    """
+    Serializa a resposta em blocos UTF-8 de ~tamanho_bloco bytes.
+
+    Args:
+        dados: Resposta (dict/list)
+        limite: Tamanho mínimo de lista para serializar item a item
+        tamanho_bloco: Bytes acumulados antes de entregar um bloco
+
+    Returns:
+        Iterador de blocos; concatenados, formam o mesmo JSON de codificar_json()
+    """
+    pendentes = []
+    acumulado = 0
+    for fragmento in _fragmentos(dados, limite):
+        parte = fragmento.encode('utf-8')
+        pendentes.append(parte)
+        acumulado += len(parte)
+        if acumulado >= tamanho_bloco:
+            yield b''.join(pendentes)
+            pendentes.clear()
+            acumulado = 0
+    if pendentes:
+        yield b''.join(pendentes)
+
+
+def escrever_em_partes(wfile, blocos: Iterator[bytes]) -> None:
+    """Escreve os blocos no formato chunked (cabeçalhos já enviados)."""
+    for bloco in blocos:
+        if bloco:
+            wfile.write(b'%x\r\n%s\r\n' % (len(bloco), bloco))
+    wfile.write(b'0\r\n\r\n')
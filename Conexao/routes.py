@@ -7,9 +7,62 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from datetime import datetime, timedelta
+from collections.abc import MutableMapping
+import contextvars
 from database import Database
+from utils.eventos import TipoEvento
+from utils.paginacao import codificar_cursor, decodificar_cursor, paginar_keyset
 import json
 
+
+class SessaoRequisicao(MutableMapping):
+    """
+    Dicionário de sessão isolado por requisição.
+
+    Cada thread (ou contexto) enxerga o seu próprio dict, então requisições
+    concorrentes não sobrescrevem a sessão umas das outras. O servidor chama
+    definir() no início de cada requisição com os dados do cookie.
+    """
+
+    def __init__(self):
+        self._atual = contextvars.ContextVar('sessao_requisicao')
+
+    def _dados(self) -> dict:
+        try:
+            return self._atual.get()
+        except LookupError:
+            dados = {}
+            self._atual.set(dados)
+            return dados
+
+    def definir(self, dados: dict) -> None:
+        """Substitui a sessão da requisição atual."""
+        self._atual.set(dados)
+
+    def limpar(self) -> None:
+        self._atual.set({})
+
+    def copy(self) -> dict:
+        return dict(self._dados())
+
+    def __getitem__(self, chave):
+        return self._dados()[chave]
+
+    def __setitem__(self, chave, valor):
+        self._dados()[chave] = valor
+
+    def __delitem__(self, chave):
+        del self._dados()[chave]
+
+    def __iter__(self):
+        return iter(self._dados())
+
+    def __len__(self):
+        return len(self._dados())
+
+    def __repr__(self) -> str:
+        return repr(self._dados())
+
 class Routes:
     """
     Classe responsável por gerenciar as rotas da aplicação.
@@ -23,11 +76,21 @@ class Routes:
     - Funcionalidades do Doador
     """
     
-    _sessao_global = {}
+    # Sessão da requisição atual (isolada por thread, ver SessaoRequisicao)
+    _sessao_global = SessaoRequisicao()
 
-    def __init__(self):
-        self.db = Database()
-        self.sessao = Routes._sessao_global
+    def __init__(self, db=None):
+        # db pode ser um Database em modo pool (ver database.criar_pool)
+        self.db = db if db is not None else Database()
+
+    @property
+    def sessao(self):
+        return Routes._sessao_global
+
+    @sessao.setter
+    def sessao(self, dados):
+        if dados is not Routes._sessao_global:
+            Routes._sessao_global.definir(dict(dados))
     
     # AUTENTICAÇÃO
     def login(self, dados):
@@ -288,131 +351,145 @@ class Routes:
             return {'sucesso': False, 'mensagem': str(e)}
     
     # DASHBOARD DO BENEFICIÁRIO
-    def obter_dados_beneficiario(self):
+    def obter_dados_beneficiario(self, limite=50, cursor=None):
+        """
+        Monta o painel do beneficiário em uma única consulta (CTEs): dados
+        básicos, entrada atual na fila, total recebido e uma página do histórico.
+
+        Args:
+            limite: Itens do histórico por página (máx. 200)
+            cursor: Cursor devolvido em historico_paginacao.proximo_cursor
+        """
         try:
             id_beneficiario = self.sessao.get('id_beneficiario')
             usuario_id = self.sessao.get('usuario_id')
 
-            print(f"📦 Sessão atual em obter_dados_beneficiario: {self.sessao}")
             print(f"🔍 obter_dados_beneficiario: id_beneficiario={id_beneficiario}, usuario_id={usuario_id}")
-        
-            if not id_beneficiario and usuario_id:
-                query_benef = "SELECT id_beneficiario FROM beneficiario WHERE id_usuario = %s"
-                result = self.db.buscar_um(query_benef, (usuario_id,))
-            
-                if result:
-                    id_beneficiario = result['id_beneficiario']
-                    Routes._sessao_global['id_beneficiario'] = id_beneficiario
-                    print(f"id_beneficiario recuperado da base: {id_beneficiario}")
-                else:
-                    print(f"Beneficiário não existe no banco para usuario_id={usuario_id}")
-                    return {'sucesso': False, 'mensagem': 'Beneficiário não encontrado. Complete seu cadastro.'}
-        
-            if not id_beneficiario:
+
+            if not id_beneficiario and not usuario_id:
                 print(f"id_beneficiario não encontrado na sessão")
                 return {'sucesso': False, 'mensagem': 'Sessão inválida. Faça login novamente.'}
-    
-            print(f"🔍 Buscando dados do beneficiário id={id_beneficiario}")
-    
-            # Dados básicos
-            query_dados = """
-                SELECT b.id_beneficiario, 
-                    COALESCE(b.num_moradores, 0) AS num_moradores,
-                    COALESCE(rb.valor_renda, 0) AS valor_renda, 
-                    COALESCE(cb.media_kwh, 0) AS media_kwh,
-                    COALESCE(sb.descricao_status_beneficiario, 'AGUARDANDO_APROVACAO') AS descricao_status_beneficiario,
-                    u.nome, u.email
-                FROM beneficiario b
-                JOIN usuario u ON b.id_usuario = u.id_usuario
-                LEFT JOIN renda_beneficiario rb ON b.id_renda = rb.id_renda
-                LEFT JOIN consumo_beneficiario cb ON b.id_consumo = cb.id_consumo
-                LEFT JOIN status_beneficiario sb ON b.id_status_beneficiario = sb.id_status_beneficiario
-                WHERE b.id_beneficiario = %s
-            """
-            dados_basicos = self.db.buscar_um(query_dados, (id_beneficiario,))
 
-            if not dados_basicos:
-                print(f"ERRO: Nenhum dado retornado para id_beneficiario={id_beneficiario}")
-                return {'sucesso': False, 'mensagem': 'Dados do beneficiário não encontrados'}
-        
-            print(f"Dados básicos encontrados: {dados_basicos}")
-
-            # Posição na fila
-            query_fila = """
+            try:
+                limite = max(1, min(int(limite), 200))
+                pos = decodificar_cursor(cursor)
+            except (TypeError, ValueError) as e:
+                return {'sucesso': False, 'mensagem': str(e), 'http_status': 400}
+
+            query_painel = """
+                WITH benef AS (
+                    SELECT b.id_beneficiario, 
+                        COALESCE(b.num_moradores, 0) AS num_moradores,
+                        COALESCE(rb.valor_renda, 0) AS valor_renda, 
+                        COALESCE(cb.media_kwh, 0) AS media_kwh,
+                        COALESCE(sb.descricao_status_beneficiario, 'AGUARDANDO_APROVACAO') AS descricao_status_beneficiario,
+                        u.nome, u.email
+                    FROM beneficiario b
+                    JOIN usuario u ON b.id_usuario = u.id_usuario
+                    LEFT JOIN renda_beneficiario rb ON b.id_renda = rb.id_renda
+                    LEFT JOIN consumo_beneficiario cb ON b.id_consumo = cb.id_consumo
+                    LEFT JOIN status_beneficiario sb ON b.id_status_beneficiario = sb.id_status_beneficiario
+                    WHERE (%(id_beneficiario)s::int IS NOT NULL AND b.id_beneficiario = %(id_beneficiario)s::int)
+                       OR (%(id_beneficiario)s::int IS NULL AND b.id_usuario = %(id_usuario)s::int)
+                    LIMIT 1
+                ),
+                entradas AS (
+                    SELECT f.id_fila, f.consumo_medio_kwh, f.data_entrada, f.prioridade, sf.descricao_status_fila
+                    FROM fila_espera f
+                    JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
+                    WHERE f.id_beneficiario = (SELECT id_beneficiario FROM benef)
+                ),
+                pagina AS (
+                    SELECT e.*
+                    FROM entradas e
+                    WHERE %(cursor_data)s::timestamp IS NULL
+                       OR (e.data_entrada, e.id_fila) < (%(cursor_data)s::timestamp, %(cursor_id)s::int)
+                    ORDER BY e.data_entrada DESC, e.id_fila DESC
+                    LIMIT %(limite)s + 1
+                )
                 SELECT 
-                    f.id_fila, 
-                    f.prioridade, 
-                    f.data_entrada,
-                    sf.descricao_status_fila,
+                    b.*,
                     (
-                        SELECT COUNT(*) + 1 
-                        FROM fila_espera f2 
-                        JOIN status_fila sf2 ON f2.id_status_fila = sf2.id_status_fila
-                        WHERE sf2.descricao_status_fila = 'AGUARDANDO'
-                          AND (
-                            f2.prioridade > f.prioridade 
-                            OR (f2.prioridade = f.prioridade AND f2.data_entrada < f.data_entrada)
-                        )
-                    ) AS posicao_fila
-                FROM fila_espera f
-                JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
-                WHERE f.id_beneficiario = %s
-                    AND sf.descricao_status_fila = 'AGUARDANDO'
-                ORDER BY f.data_entrada DESC
-                LIMIT 1
-            """
-            fila_info = self.db.buscar_um(query_fila, (id_beneficiario,))
-    
-            # Histórico
-            query_historico = """
-                SELECT 
-                    f.id_fila,
-                    f.consumo_medio_kwh AS quantidade_kwh,
-                    f.data_entrada AS data_transacao,
-                    sf.descricao_status_fila AS descricao_status,
+                        SELECT COALESCE(SUM(e.consumo_medio_kwh), 0)
+                        FROM entradas e
+                        WHERE e.descricao_status_fila = 'ATENDIDO'
+                    ) AS total_recebido,
+                    (
+                        SELECT row_to_json(atual)
+                        FROM (
+                            SELECT e.id_fila, e.prioridade, e.data_entrada, e.descricao_status_fila
+                            FROM entradas e
+                            WHERE e.descricao_status_fila = 'AGUARDANDO'
+                            ORDER BY e.data_entrada DESC
+                            LIMIT 1
+                        ) atual
+                    ) AS fila,
                     COALESCE(
                         (
-                            SELECT COUNT(*) + 1 
-                            FROM fila_espera f2 
-                            JOIN status_fila sf2 ON f2.id_status_fila = sf2.id_status_fila
-                            WHERE sf2.descricao_status_fila = 'AGUARDANDO'
-                                AND (
-                                    f2.prioridade > f.prioridade 
-                                    OR (f2.prioridade = f.prioridade AND f2.data_entrada < f.data_entrada)
-                                )
+                            SELECT json_agg(json_build_object(
+                                'id_fila', p.id_fila,
+                                'quantidade_kwh', p.consumo_medio_kwh,
+                                'data_transacao', p.data_entrada,
+                                'descricao_status', p.descricao_status_fila,
+                                'foi_atendido', CASE 
+                                    WHEN p.descricao_status_fila = 'ATENDIDO' THEN 'SIM'
+                                    WHEN p.descricao_status_fila = 'AGUARDANDO' THEN 'NÃO'
+                                    ELSE 'CANCELADO'
+                                END
+                            ) ORDER BY p.data_entrada DESC, p.id_fila DESC)
+                            FROM pagina p
                         ),
-                        0
-                    ) AS posicao_fila,
-                    CASE 
-                        WHEN sf.descricao_status_fila = 'ATENDIDO' THEN 'SIM'
-                        WHEN sf.descricao_status_fila = 'AGUARDANDO' THEN 'NÃO'
-                        ELSE 'CANCELADO'
-                    END AS foi_atendido
-                FROM fila_espera f
-                JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
-                WHERE f.id_beneficiario = %s
-                ORDER BY f.data_entrada DESC
+                        '[]'::json
+                    ) AS historico
+                FROM benef b
             """
-            historico = self.db.buscar_todos(query_historico, (id_beneficiario,))
-    
-            #Total recebido APENAS de solicitações ATENDIDAS na fila
-            query_total = """
-                SELECT COALESCE(SUM(f.consumo_medio_kwh), 0) AS total_recebido
-                FROM fila_espera f
-                JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
-                WHERE f.id_beneficiario = %s
-                    AND sf.descricao_status_fila = 'ATENDIDO'
-            """
-            result_total = self.db.buscar_um(query_total, (id_beneficiario,))
-            total_recebido = float(result_total['total_recebido']) if result_total else 0
-    
+            painel = self.db.buscar_um(query_painel, {
+                'id_beneficiario': id_beneficiario,
+                'id_usuario': usuario_id,
+                'cursor_data': pos.get('data') if pos else None,
+                'cursor_id': pos.get('id') if pos else None,
+                'limite': limite
+            })
+
+            if not painel:
+                print(f"Beneficiário não existe no banco para usuario_id={usuario_id}")
+                return {'sucesso': False, 'mensagem': 'Beneficiário não encontrado. Complete seu cadastro.'}
+
+            if not id_beneficiario:
+                Routes._sessao_global['id_beneficiario'] = painel['id_beneficiario']
+                print(f"id_beneficiario recuperado da base: {painel['id_beneficiario']}")
+
+            fila_info = painel.pop('fila')
+            historico = painel.pop('historico') or []
+            total_recebido = float(painel.pop('total_recebido') or 0)
+
+            # Página do histórico: a linha extra só indica que há mais
+            proximo_cursor = None
+            if len(historico) > limite:
+                historico = historico[:limite]
+                ultimo = historico[-1]
+                proximo_cursor = codificar_cursor({'data': ultimo['data_transacao'], 'id': ultimo['id_fila']})
+
+            # Posições vêm do índice em memória (db.posicoes_fila); só AGUARDANDO tem posição
+            if fila_info:
+                fila_info['posicao_fila'] = self.db.posicoes_fila.posicao(fila_info['id_fila']) or 0
+            for item in historico:
+                item['posicao_fila'] = (
+                    self.db.posicoes_fila.posicao(item['id_fila']) or 0
+                    if item['descricao_status'] == 'AGUARDANDO' else 0
+                )
+
             return {
                 'sucesso': True,
                 'dados': {
-                    **dados_basicos,
+                    **painel,
                     'total_recebido_kwh': round(total_recebido, 2),
                     'fila': fila_info,
-                    'historico': historico
+                    'historico': historico,
+                    'historico_paginacao': {
+                        'limite': limite,
+                        'proximo_cursor': proximo_cursor
+                    }
                 }
             }
     
@@ -512,10 +589,10 @@ class Routes:
     
             mensagem = f'Solicitação de {quantidade_solicitada} kWh registrada! Você entrou na fila.'
     
-            # ✅ Tenta distribuição
+            # ✅ Tenta distribuição (em segundo plano quando o agendador está ativo)
             try:
-                resultado_dist = self.db.executar_distribuicao(limite=10)
-                if resultado_dist.get('beneficiarios_atendidos', 0) > 0:
+                resultado_dist = self.db.solicitar_distribuicao('fila')
+                if resultado_dist.get('beneficiarios_atendidos', 0) > 0 and not resultado_dist['agendada']:
                     mensagem += f" {resultado_dist['beneficiarios_atendidos']} beneficiário(s) atendido(s)!"
             except Exception as e:
                 print(f"Distribuição falhou: {e}")
@@ -551,7 +628,7 @@ class Routes:
             if not id_doador:
                 return {'sucesso': False, 'mensagem': 'Doador não encontrado. Complete seu cadastro.'}
 
-            #Busca dados básicos do doador
+            #Busca dados básicos do doador + totais mantidos em doador_agregado
             doador = self.db.buscar_um("""
                 SELECT 
                     u.nome, 
@@ -559,10 +636,14 @@ class Routes:
                     d.id_doador,
                     d.razao_social,
                     d.cnpj,
-                    cd.descricao_classificacao as classificacao
+                    cd.descricao_classificacao as classificacao,
+                    COALESCE(da.total_doado_kwh, 0) as total_doado,
+                    COALESCE(da.total_distribuido_kwh, 0) as total_distribuido,
+                    COALESCE(da.familias_atendidas, 0) as familias_atendidas
                 FROM usuario u 
                 JOIN doador d ON d.id_usuario = u.id_usuario
                 LEFT JOIN classificacao_doador cd ON d.id_classificacao = cd.id_classificacao
+                LEFT JOIN doador_agregado da ON da.id_doador = d.id_doador
                 WHERE d.id_doador = %s
             """, (id_doador,))
 
@@ -571,52 +652,13 @@ class Routes:
 
             print(f"Buscando dados do doador id={id_doador}")
 
-            #TOTAL DOADO = Soma da quantidade INICIAL de todos os créditos criados
-            #Nota: quantidade_disponivel_kwh diminui conforme distribui, por isso usamos ela como "total doado"
-            #(assumindo que no momento da criação, quantidade_disponivel = quantidade_inicial)
-            query_total_doado = """
-                SELECT COALESCE(
-                    SUM(
-                        c.quantidade_disponivel_kwh + 
-                        COALESCE(
-                            (SELECT SUM(t.quantidade_kwh)
-                             FROM transacao t
-                             JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                             WHERE t.id_credito = c.id_credito 
-                               AND st.descricao_status = 'CONCLUIDA'),
-                            0
-                        )
-                    ), 0
-                ) as total
-                FROM credito c
-                WHERE c.id_doador = %s
-            """
-            result_doado = self.db.buscar_um(query_total_doado, (id_doador,))
-            total_doado = float(result_doado['total']) if result_doado else 0.0
-
-            #TOTAL DISTRIBUÍDO = Soma de TODAS as transações CONCLUÍDAS deste doador
-            query_distribuido = """
-                SELECT COALESCE(SUM(t.quantidade_kwh), 0) as total
-                FROM transacao t
-                JOIN credito c ON t.id_credito = c.id_credito
-                JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                WHERE c.id_doador = %s 
-                  AND st.descricao_status = 'CONCLUIDA'
-            """
-            result_distribuido = self.db.buscar_um(query_distribuido, (id_doador,))
-            total_distribuido = float(result_distribuido['total']) if result_distribuido else 0.0
-
-            #FAMÍLIAS ATENDIDAS = Número ÚNICO de beneficiários que receberam créditos
-            query_familias = """
-                SELECT COUNT(DISTINCT t.id_beneficiario) as total
-                FROM transacao t
-                JOIN credito c ON t.id_credito = c.id_credito
-                JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                WHERE c.id_doador = %s 
-                  AND st.descricao_status = 'CONCLUIDA'
-            """
-            result_familias = self.db.buscar_um(query_familias, (id_doador,))
-            familias_atendidas = int(result_familias['total']) if result_familias else 0
+            #TOTAL DOADO = Soma da quantidade inicial de todos os créditos criados
+            #TOTAL DISTRIBUÍDO = Soma das transações CONCLUÍDAS dos créditos do doador
+            #FAMÍLIAS ATENDIDAS = Beneficiários distintos que receberam créditos do doador
+            #(atualizados junto de criar_credito/executar_distribuicao; ver Database.reconstruir_agregados_doador)
+            total_doado = float(doador['total_doado'] or 0)
+            total_distribuido = float(doador['total_distribuido'] or 0)
+            familias_atendidas = int(doador['familias_atendidas'] or 0)
 
             #CO2 REDUZIDO = Total distribuído * fator de conversão (0.356 kg CO2/kWh é uma estimativa comum)
             co2_reduzido = round(total_distribuido * 0.356, 2)
@@ -628,14 +670,7 @@ class Routes:
                     c.quantidade_disponivel_kwh,
                     c.data_expiracao,
                     sc.descricao_status,
-                    -- Calcula quanto foi consumido deste crédito
-                    (
-                        SELECT COALESCE(SUM(t.quantidade_kwh), 0)
-                        FROM transacao t
-                        JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                        WHERE t.id_credito = c.id_credito 
-                          AND st.descricao_status = 'CONCLUIDA'
-                    ) as quantidade_consumida
+                    COALESCE(c.quantidade_inicial_kwh, c.quantidade_disponivel_kwh) as quantidade_inicial_kwh
                 FROM credito c
                 JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
                 WHERE c.id_doador = %s
@@ -644,11 +679,12 @@ class Routes:
             """
             creditos = self.db.buscar_todos(query_creditos, (id_doador,))
 
-            #Adiciona campo quantidade_inicial calculado (disponível + consumido)
+            #Adiciona quantidade_inicial e quantidade_consumida (inicial - disponível)
             for credito in creditos:
                 qtd_disponivel = float(credito['quantidade_disponivel_kwh'] or 0)
-                qtd_consumida = float(credito['quantidade_consumida'] or 0)
-                credito['quantidade_inicial'] = round(qtd_disponivel + qtd_consumida, 2)
+                qtd_inicial = float(credito.pop('quantidade_inicial_kwh') or 0)
+                credito['quantidade_inicial'] = round(qtd_inicial, 2)
+                credito['quantidade_consumida'] = round(qtd_inicial - qtd_disponivel, 2)
 
             print(f"Dados carregados: doado={total_doado}, distribuído={total_distribuido}, famílias={familias_atendidas}")
 
@@ -723,17 +759,10 @@ class Routes:
 
             # garante id_doador
             if not id_doador:
-                q = "SELECT id_doador FROM doador WHERE id_usuario = %s"
-                r = self.db.buscar_um(q, (usuario_id,))
-                if r:
-                    id_doador = r['id_doador']
-                    Routes._sessao_global['id_doador'] = id_doador
-                else:
-                    id_doador = self.db.criar_doador(usuario_id)
-                    Routes._sessao_global['id_doador'] = id_doador
+                id_doador = self._garantir_id_doador(usuario_id)
 
-            quantidade = float(dados.get('quantidade_kwh', 0))
-            if quantidade <= 0:
+            quantidade, erro = self._quantidade_kwh(dados.get('quantidade_kwh', 0))
+            if erro:
                 return {'sucesso': False, 'mensagem': 'Quantidade inválida'}
 
             # Cria crédito
@@ -742,9 +771,9 @@ class Routes:
             # Log
             self.db.registrar_log_auditoria(id_usuario=usuario_id, tipo_acao='DOACAO', detalhes=f'Criação de crédito id={id_credito} q={quantidade}')
 
-            # Tenta distribuir automaticamente
+            # Tenta distribuir automaticamente (agendado quando o agendador está ativo)
             try:
-                resultado = self.db.executar_distribuicao(limite=10)
+                resultado = self.db.solicitar_distribuicao('doacao', id_credito=id_credito)
             except Exception as e:
                 print(f"⚠️ Distribuição automática falhou ao criar doação: {e}")
                 resultado = {'mensagem': 'Distribuição falhou', 'error': str(e)}
@@ -757,6 +786,165 @@ class Routes:
             traceback.print_exc()
             return {'sucesso': False, 'mensagem': str(e)}
     
+    def _garantir_id_doador(self, usuario_id):
+        """Busca (ou cria) o doador do usuário e guarda o id na sessão."""
+        q = "SELECT id_doador FROM doador WHERE id_usuario = %s"
+        r = self.db.buscar_um(q, (usuario_id,))
+        if r:
+            id_doador = r['id_doador']
+        else:
+            id_doador = self.db.criar_doador(usuario_id)
+            # Confirma o doador (dentro da requisição, só libera o ponto): o id vai
+            # para a sessão mesmo que a operação seguinte (ex.: lote de créditos)
+            # falhe, pois ela desfaz só até o próprio ponto
+            self.db._confirmar()
+        Routes._sessao_global['id_doador'] = id_doador
+        return id_doador
+
+    MAX_CREDITOS_LOTE = 1000
+    # Maior valor de DECIMAL(10,2) (credito.quantidade_disponivel_kwh)
+    MAX_KWH_CREDITO = 99999999.99
+
+    @classmethod
+    def _quantidade_kwh(cls, valor):
+        """
+        Converte a quantidade de um crédito ("12,5", 12.5...).
+
+        Returns:
+            (quantidade arredondada a 2 casas, None) ou (None, mensagem de erro);
+            NaN, infinito e valores acima de DECIMAL(10,2) são recusados
+        """
+        import math
+
+        try:
+            quantidade = float(str(valor if valor is not None else '').strip().replace(',', '.'))
+        except ValueError:
+            return None, 'quantidade inválida'
+        if not math.isfinite(quantidade):
+            return None, 'quantidade inválida'
+        quantidade = round(quantidade, 2)
+        if quantidade <= 0:
+            return None, 'quantidade deve ser maior que zero'
+        if quantidade > cls.MAX_KWH_CREDITO:
+            return None, f'quantidade deve ser no máximo {cls.MAX_KWH_CREDITO:.2f} kWh'
+        return quantidade, None
+
+    @staticmethod
+    def _linhas_lote(dados):
+        """
+        Separa as linhas de um lote, sem validar: lista JSON, {"creditos": [...]}
+        ou {"csv": "quantidade_kwh,data_expiracao\n..."} (cabeçalho opcional).
+        """
+        import csv
+        import io
+
+        if isinstance(dados, dict) and 'csv' in dados:
+            # Guarda a linha física de cada registro para as mensagens de erro
+            leitor = csv.reader(io.StringIO(str(dados['csv'])))
+            linhas = [(leitor.line_num, l) for l in leitor if any(c.strip() for c in l)]
+            if linhas and linhas[0][1][0].strip().lower() == 'quantidade_kwh':
+                linhas = linhas[1:]  # cabeçalho
+            return [
+                {'quantidade_kwh': l[0], 'data_expiracao': l[1] if len(l) > 1 else None, 'linha': n}
+                for n, l in linhas
+            ]
+        if isinstance(dados, dict):
+            brutos = dados.get('creditos') or []
+        else:
+            brutos = dados or []
+        return brutos if isinstance(brutos, list) else [brutos]
+
+    @classmethod
+    def _itens_lote(cls, brutos):
+        """
+        Valida as linhas de um lote (ver _linhas_lote).
+
+        Returns:
+            (itens, erros): itens como (quantidade, data_expiracao|None); erros
+            como mensagens com o número da linha (a linha física, no CSV)
+        """
+        from datetime import date
+
+        itens, erros = [], []
+        hoje = date.today()
+        for n, bruto in enumerate(brutos, start=1):
+            if not isinstance(bruto, dict):
+                bruto = {'quantidade_kwh': bruto}
+            n = bruto.get('linha') or n
+            quantidade, erro = cls._quantidade_kwh(bruto.get('quantidade_kwh'))
+            if erro:
+                erros.append(f'Linha {n}: {erro}')
+                continue
+
+            data_expiracao = str(bruto.get('data_expiracao') or '').strip() or None
+            if data_expiracao:
+                try:
+                    data_expiracao = date.fromisoformat(data_expiracao)
+                except ValueError:
+                    erros.append(f'Linha {n}: data_expiracao deve estar no formato AAAA-MM-DD')
+                    continue
+                if data_expiracao <= hoje:
+                    erros.append(f'Linha {n}: data_expiracao já passou')
+                    continue
+            itens.append((quantidade, data_expiracao))
+        return itens, erros
+
+    def criar_doacoes_em_lote(self, dados):
+        """
+        Registra vários créditos do doador logado de uma vez (tudo ou nada):
+        uma transação, um registro de auditoria e uma única distribuição no fim.
+        """
+        try:
+            usuario_id = self.sessao.get('usuario_id')
+            if not usuario_id:
+                return {'sucesso': False, 'mensagem': 'Usuário não autenticado', 'http_status': 401}
+
+            # Tamanho antes de validar linha a linha: lote grande demais sai barato
+            brutos = self._linhas_lote(dados)
+            if len(brutos) > self.MAX_CREDITOS_LOTE:
+                return {
+                    'sucesso': False,
+                    'mensagem': f'Máximo de {self.MAX_CREDITOS_LOTE} créditos por lote',
+                    'http_status': 413
+                }
+
+            itens, erros = self._itens_lote(brutos)
+            if erros:
+                return {'sucesso': False, 'mensagem': 'Lote rejeitado', 'erros': erros[:50], 'http_status': 400}
+            if not itens:
+                return {'sucesso': False, 'mensagem': 'Nenhum crédito informado', 'http_status': 400}
+
+            id_doador = self.sessao.get('id_doador') or self._garantir_id_doador(usuario_id)
+            ids = self.db.criar_creditos_em_lote(id_doador, itens)
+            total = round(sum(q for q, _ in itens), 2)
+
+            self.db.registrar_log_auditoria(
+                id_usuario=usuario_id,
+                tipo_acao='DOACAO',
+                detalhes=f'Lote de {len(ids)} créditos ({total} kWh) ids={ids[0]}..{ids[-1]}'
+            )
+
+            try:
+                # Muitos créditos de uma vez: rodada completa em vez de uma incremental por crédito
+                distribuicao = self.db.solicitar_distribuicao('doacao_lote')
+            except Exception as e:
+                print(f"⚠️ Distribuição automática falhou após lote de doações: {e}")
+                distribuicao = {'mensagem': 'Distribuição falhou', 'error': str(e)}
+
+            return {
+                'sucesso': True,
+                'mensagem': f'{len(ids)} créditos registrados ({total} kWh).',
+                'ids_credito': ids,
+                'total_kwh': total,
+                'distribuicao': distribuicao
+            }
+
+        except Exception as e:
+            print(f"ERRO CRIAR DOACOES EM LOTE: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'sucesso': False, 'mensagem': str(e)}
+
     # UTILITÁRIOS
     def verificar_perfil_completo(self, usuario_id, tipo_usuario):
         #Verifica se perfil está completo.
@@ -919,10 +1107,11 @@ class Routes:
             print(f"❌ Erro ao obter estatísticas gerais: {e}")
             import traceback
             traceback.print_exc()
-            # Retorna valores padrão em caso de erro
+            # Retorna valores padrão em caso de erro (marcados: não vão para o cache)
             return {
                 "total_kwh": 0.0,
-                "familias_atendidas": 0
+                "familias_atendidas": 0,
+                "indisponivel": True
             }
     
     # CRUD: EDITAR / EXCLUIR SOLICITAÇÃO (BENEFICIÁRIO)
@@ -1024,30 +1213,36 @@ class Routes:
             )
             prioridade = pri['prioridade'] if pri else 0
 
-            # Atualização
-            self.db.executar("""
-                UPDATE fila_espera
-                SET consumo_medio_kwh = %s, 
-                    num_moradores = %s, 
-                    renda_familiar = %s, 
-                    prioridade = %s, 
-                    data_entrada = NOW()
-                WHERE id_fila = %s
-            """, (nova_qtd, num_moradores, renda_familiar, prioridade, id_fila))
-
-            self.db.registrar_log_auditoria(
-                id_usuario=usuario_id, 
-                tipo_acao='EDITAR_SOLICITACAO', 
-                detalhes=f'id_fila={id_fila} nova_qtd={nova_qtd}'
-            )
-
+            ponto = self.db._abrir_ponto()
             try:
-                self.db.conn.commit()
+                # Atualização
+                cursor = self.db.executar("""
+                    UPDATE fila_espera
+                    SET consumo_medio_kwh = %s, 
+                        num_moradores = %s, 
+                        renda_familiar = %s, 
+                        prioridade = %s, 
+                        data_entrada = NOW()
+                    WHERE id_fila = %s
+                    RETURNING data_entrada
+                """, (nova_qtd, num_moradores, renda_familiar, prioridade, id_fila))
+                atualizado = cursor.fetchone()
+
+                self.db.registrar_log_auditoria(
+                    id_usuario=usuario_id, 
+                    tipo_acao='EDITAR_SOLICITACAO', 
+                    detalhes=f'id_fila={id_fila} nova_qtd={nova_qtd}'
+                )
+                self.db._confirmar(ponto)
             except Exception:
-                try:
-                    self.db.conn.rollback()
-                except Exception:
-                    pass
+                self.db._desfazer(ponto)
+                raise
+
+            if atualizado:
+                self.db._apos_commit(
+                    self.db.posicoes_fila.atualizar, id_fila, prioridade, atualizado['data_entrada'], id_benef
+                )
+            self.db._apos_commit(self.db.eventos.publicar, TipoEvento.FILA, id_fila=id_fila, id_beneficiario=id_benef)
 
             return {'sucesso': True, 'mensagem': 'Solicitação atualizada! Você foi reposicionado no final da fila.'}
 
@@ -1092,24 +1287,24 @@ class Routes:
             if row['descricao_status_fila'] != 'AGUARDANDO':
                 return {'sucesso': False, 'mensagem': 'Só é possível excluir solicitações que estejam aguardando.', 'http_status': 400}
 
-            # EXCLUSÃO
-            self.db.executar("DELETE FROM fila_espera WHERE id_fila = %s", (id_fila,))
-        
-            #  LOG
-            self.db.registrar_log_auditoria(
-                id_usuario=usuario_id, 
-                tipo_acao='EXCLUIR_SOLICITACAO', 
-                detalhes=f'id_fila={id_fila}'
-            )
-
-            # COMMIT
+            ponto = self.db._abrir_ponto()
             try:
-                self.db.conn.commit()
+                # EXCLUSÃO
+                self.db.executar("DELETE FROM fila_espera WHERE id_fila = %s", (id_fila,))
+        
+                #  LOG
+                self.db.registrar_log_auditoria(
+                    id_usuario=usuario_id, 
+                    tipo_acao='EXCLUIR_SOLICITACAO', 
+                    detalhes=f'id_fila={id_fila}'
+                )
+                self.db._confirmar(ponto)
             except Exception:
-                try:
-                    self.db.conn.rollback()
-                except Exception:
-                    pass
+                self.db._desfazer(ponto)
+                raise
+
+            self.db._apos_commit(self.db.posicoes_fila.remover, id_fila)
+            self.db._apos_commit(self.db.eventos.publicar, TipoEvento.FILA, id_fila=id_fila, id_beneficiario=id_benef)
 
             return {'sucesso': True, 'mensagem': 'Solicitação cancelada com sucesso'}
 
@@ -1131,9 +1326,16 @@ class Routes:
                 return {'sucesso': False, 'mensagem': 'Usuário não autenticado'}
 
             id_credito = int(dados.get('id_credito', 0))
-            nova_qtd = float(dados.get('quantidade_kwh', 0))
+            nova_qtd, erro = self._quantidade_kwh(dados.get('quantidade_kwh', 0))
+            if erro:
+                return {'sucesso': False, 'mensagem': 'Quantidade inválida'}
 
-            row = self.db.buscar_um("SELECT id_doador FROM credito WHERE id_credito = %s", (id_credito,))
+            # Sem transações, o disponível ainda é o doado (créditos antigos sem a coluna)
+            row = self.db.buscar_um("""
+                SELECT id_doador,
+                       COALESCE(quantidade_inicial_kwh, quantidade_disponivel_kwh) AS quantidade_inicial_kwh
+                FROM credito WHERE id_credito = %s
+            """, (id_credito,))
             if not row:
                 return {'sucesso': False, 'mensagem': 'Crédito não encontrado'}
             if row['id_doador'] != id_doador:
@@ -1144,21 +1346,26 @@ class Routes:
             if trans and int(trans['cnt']) > 0:
                 return {'sucesso': False, 'mensagem': 'Não é possível editar uma doação que já foi distribuída.'}
 
-            self.db.executar("UPDATE credito SET quantidade_disponivel_kwh = %s WHERE id_credito = %s", (nova_qtd, id_credito))
-            self.db.registrar_log_auditoria(
-                id_usuario=usuario_id, 
-                tipo_acao='EDITAR_DOACAO', 
-                detalhes=f'id_credito={id_credito} nova_qtd={nova_qtd}'
-            )
-
+            ponto = self.db._abrir_ponto()
             try:
-                self.db.conn.commit()
+                self.db.executar(
+                    "UPDATE credito SET quantidade_disponivel_kwh = %s, quantidade_inicial_kwh = %s WHERE id_credito = %s",
+                    (nova_qtd, nova_qtd, id_credito)
+                )
+                self.db.ajustar_agregado_doador(
+                    id_doador, doado_kwh=nova_qtd - float(row['quantidade_inicial_kwh'] or 0)
+                )
+                self.db.registrar_log_auditoria(
+                    id_usuario=usuario_id, 
+                    tipo_acao='EDITAR_DOACAO', 
+                    detalhes=f'id_credito={id_credito} nova_qtd={nova_qtd}'
+                )
+                self.db._confirmar(ponto)
             except Exception:
-                try:
-                    self.db.conn.rollback()
-                except Exception:
-                    pass
+                self.db._desfazer(ponto)
+                raise
 
+            self.db._apos_commit(self.db.eventos.publicar, TipoEvento.DOACAO, id_credito=id_credito, id_doador=id_doador)
             return {'sucesso': True, 'mensagem': 'Doação atualizada com sucesso'}
 
         except Exception as e:
@@ -1179,7 +1386,12 @@ class Routes:
 
             id_credito = int(dados.get('id_credito', 0))
 
-            row = self.db.buscar_um("SELECT id_doador FROM credito WHERE id_credito = %s", (id_credito,))
+            # Como em editar_doacao: créditos antigos não têm quantidade_inicial_kwh
+            row = self.db.buscar_um("""
+                SELECT id_doador,
+                       COALESCE(quantidade_inicial_kwh, quantidade_disponivel_kwh) AS quantidade_inicial_kwh
+                FROM credito WHERE id_credito = %s
+            """, (id_credito,))
             if not row:
                 return {'sucesso': False, 'mensagem': 'Crédito não encontrado'}
             if row['id_doador'] != id_doador:
@@ -1189,23 +1401,25 @@ class Routes:
             if trans and int(trans['cnt']) > 0:
                 return {'sucesso': False, 'mensagem': 'Não é possível excluir uma doação que já foi distribuída.'}
 
-            # Remove histórico e crédito
-            self.db.executar("DELETE FROM historico_credito WHERE id_credito = %s", (id_credito,))
-            self.db.executar("DELETE FROM credito WHERE id_credito = %s", (id_credito,))
-            self.db.registrar_log_auditoria(
-                id_usuario=usuario_id, 
-                tipo_acao='EXCLUIR_DOACAO', 
-                detalhes=f'id_credito={id_credito}'
-            )
-
+            ponto = self.db._abrir_ponto()
             try:
-                self.db.conn.commit()
+                # Remove histórico e crédito
+                self.db.executar("DELETE FROM historico_credito WHERE id_credito = %s", (id_credito,))
+                self.db.executar("DELETE FROM credito WHERE id_credito = %s", (id_credito,))
+                self.db.ajustar_agregado_doador(
+                    id_doador, doado_kwh=-float(row['quantidade_inicial_kwh'] or 0)
+                )
+                self.db.registrar_log_auditoria(
+                    id_usuario=usuario_id, 
+                    tipo_acao='EXCLUIR_DOACAO', 
+                    detalhes=f'id_credito={id_credito}'
+                )
+                self.db._confirmar(ponto)
             except Exception:
-                try:
-                    self.db.conn.rollback()
-                except Exception:
-                    pass
+                self.db._desfazer(ponto)
+                raise
 
+            self.db._apos_commit(self.db.eventos.publicar, TipoEvento.DOACAO, id_credito=id_credito, id_doador=id_doador)
             return {'sucesso': True, 'mensagem': 'Doação excluída com sucesso'}
 
         except Exception as e:
@@ -1425,8 +1639,50 @@ class Routes:
             print(f"Erro ao obter métricas: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
-    def listar_beneficiarios_admin(self):
-        """Lista todos os beneficiários para o admin."""
+    def _pagina_admin(self, lista, consulta, ordenacao, limite, cursor, filtros, filtros_aceitos, limite_padrao=100):
+        """
+        Página de uma listagem do admin (paginação por chave + filtros).
+
+        Args:
+            lista: Nome da lista na resposta (ex.: 'beneficiarios')
+            consulta: SELECT ... FROM ... JOIN ... sem WHERE/ORDER BY/LIMIT
+            ordenacao: [(expressão SQL, campo, 'ASC'|'DESC')], terminando em coluna única
+            limite: Itens por página (máx. 500)
+            cursor: paginacao.proximo_cursor / paginacao.cursor_anterior
+            filtros: Filtros recebidos (ex.: {'status': 'ATIVO'})
+            filtros_aceitos: nome do filtro -> condição SQL com %s
+                (condições com ILIKE recebem o valor entre %...%)
+        """
+        try:
+            limite = max(1, min(int(limite or limite_padrao), 500))
+            condicoes, parametros = [], []
+            for nome, valor in (filtros or {}).items():
+                condicao = filtros_aceitos.get(nome)
+                if condicao is None or valor in (None, ''):
+                    continue
+                if 'ILIKE' in condicao:
+                    valor = f"%{valor}%"
+                condicoes.append(condicao)
+                parametros.extend([valor] * condicao.count('%s'))
+            pagina = paginar_keyset(
+                self.db.buscar_todos, consulta, ordenacao, limite, cursor,
+                condicoes=condicoes, parametros=parametros
+            )
+        except (TypeError, ValueError) as e:
+            return {'sucesso': False, 'mensagem': str(e), 'http_status': 400}
+
+        return {
+            'sucesso': True,
+            lista: pagina['itens'],
+            'paginacao': {
+                'limite': limite,
+                'proximo_cursor': pagina['proximo_cursor'],
+                'cursor_anterior': pagina['cursor_anterior']
+            }
+        }
+
+    def listar_beneficiarios_admin(self, limite=100, cursor=None, filtros=None):
+        """Lista os beneficiários para o admin (filtros: status, busca)."""
         try:
             query = """
                 SELECT 
@@ -1442,21 +1698,22 @@ class Routes:
                 LEFT JOIN renda_beneficiario rb ON b.id_renda = rb.id_renda
                 LEFT JOIN consumo_beneficiario cb ON b.id_consumo = cb.id_consumo
                 LEFT JOIN status_beneficiario sb ON b.id_status_beneficiario = sb.id_status_beneficiario
-                ORDER BY b.id_beneficiario DESC
-                LIMIT 100
             """
-            beneficiarios = self.db.buscar_todos(query)
-            
-            return {
-                'sucesso': True,
-                'beneficiarios': beneficiarios or []
-            }
+            return self._pagina_admin(
+                'beneficiarios', query,
+                [('b.id_beneficiario', 'id_beneficiario', 'DESC')],
+                limite, cursor, filtros,
+                {
+                    'status': "sb.descricao_status_beneficiario = %s",
+                    'busca': "(u.nome ILIKE %s OR u.email ILIKE %s)"
+                }
+            )
         except Exception as e:
             print(f"Erro ao listar beneficiários: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
-    def listar_doadores_admin(self):
-        """Lista todos os doadores para o admin."""
+    def listar_doadores_admin(self, limite=100, cursor=None, filtros=None):
+        """Lista os doadores para o admin (filtros: classificacao, busca)."""
         try:
             query = """
                 SELECT 
@@ -1465,33 +1722,27 @@ class Routes:
                     u.nome,
                     u.email,
                     cd.descricao_classificacao,
-                    COALESCE(
-                        (SELECT SUM(c.quantidade_disponivel_kwh + 
-                            COALESCE((SELECT SUM(t.quantidade_kwh)
-                                      FROM transacao t
-                                      JOIN status_transacao st ON t.id_status_transacao = st.id_status_transacao
-                                      WHERE t.id_credito = c.id_credito AND st.descricao_status = 'CONCLUIDA'), 0))
-                         FROM credito c
-                         WHERE c.id_doador = d.id_doador), 0
-                    ) as total_doado
+                    COALESCE(da.total_doado_kwh, 0) as total_doado
                 FROM doador d
                 JOIN usuario u ON d.id_usuario = u.id_usuario
                 LEFT JOIN classificacao_doador cd ON d.id_classificacao = cd.id_classificacao
-                ORDER BY d.id_doador DESC
-                LIMIT 100
+                LEFT JOIN doador_agregado da ON da.id_doador = d.id_doador
             """
-            doadores = self.db.buscar_todos(query)
-            
-            return {
-                'sucesso': True,
-                'doadores': doadores or []
-            }
+            return self._pagina_admin(
+                'doadores', query,
+                [('d.id_doador', 'id_doador', 'DESC')],
+                limite, cursor, filtros,
+                {
+                    'classificacao': "cd.descricao_classificacao = %s",
+                    'busca': "(u.nome ILIKE %s OR u.email ILIKE %s)"
+                }
+            )
         except Exception as e:
             print(f"Erro ao listar doadores: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
-    def listar_creditos_admin(self):
-        """Lista todos os créditos para o admin."""
+    def listar_creditos_admin(self, limite=100, cursor=None, filtros=None):
+        """Lista os créditos para o admin (filtros: status, id_doador)."""
         try:
             query = """
                 SELECT 
@@ -1505,21 +1756,22 @@ class Routes:
                 JOIN status_credito sc ON c.id_status_credito = sc.id_status_credito
                 JOIN doador d ON c.id_doador = d.id_doador
                 JOIN usuario u ON d.id_usuario = u.id_usuario
-                ORDER BY c.id_credito DESC
-                LIMIT 100
             """
-            creditos = self.db.buscar_todos(query)
-            
-            return {
-                'sucesso': True,
-                'creditos': creditos or []
-            }
+            return self._pagina_admin(
+                'creditos', query,
+                [('c.id_credito', 'id_credito', 'DESC')],
+                limite, cursor, filtros,
+                {
+                    'status': "sc.descricao_status = %s",
+                    'id_doador': "c.id_doador = %s::int"
+                }
+            )
         except Exception as e:
             print(f"Erro ao listar créditos: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
-    def listar_fila_admin(self):
-        """Lista fila de espera completa para o admin."""
+    def listar_fila_admin(self, limite=100, cursor=None, filtros=None):
+        """Lista a fila de espera para o admin, na ordem de atendimento (filtro: status)."""
         try:
             query = """
                 SELECT 
@@ -1536,21 +1788,23 @@ class Routes:
                 JOIN beneficiario b ON f.id_beneficiario = b.id_beneficiario
                 JOIN usuario u ON b.id_usuario = u.id_usuario
                 JOIN status_fila sf ON f.id_status_fila = sf.id_status_fila
-                ORDER BY f.prioridade DESC, f.data_entrada ASC
-                LIMIT 100
             """
-            fila = self.db.buscar_todos(query)
-            
-            return {
-                'sucesso': True,
-                'fila': fila or []
-            }
+            return self._pagina_admin(
+                'fila', query,
+                [
+                    ('f.prioridade', 'prioridade', 'DESC'),
+                    ('f.data_entrada', 'data_entrada', 'ASC'),
+                    ('f.id_fila', 'id_fila', 'ASC')
+                ],
+                limite, cursor, filtros,
+                {'status': "sf.descricao_status_fila = %s"}
+            )
         except Exception as e:
             print(f"Erro ao listar fila: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
-    def listar_logs_admin(self, limite=50):
-        """Lista logs de auditoria para o admin."""
+    def listar_logs_admin(self, limite=50, cursor=None, filtros=None):
+        """Lista logs de auditoria para o admin (filtros: tipo_acao, id_usuario)."""
         try:
             query = """
                 SELECT 
@@ -1565,32 +1819,81 @@ class Routes:
                 LEFT JOIN usuario u ON la.id_usuario = u.id_usuario
                 LEFT JOIN tipo_acao ta ON la.id_tipo_acao = ta.id_tipo_acao
                 LEFT JOIN status_log sl ON la.id_status_log = sl.id_status_log
-                ORDER BY la.data_hora DESC
-                LIMIT %s
             """
-            logs = self.db.buscar_todos(query, (limite,))
-            
-            return {
-                'sucesso': True,
-                'logs': logs or []
-            }
+            return self._pagina_admin(
+                'logs', query,
+                [('la.data_hora', 'data_hora', 'DESC'), ('la.id_log', 'id_log', 'DESC')],
+                limite, cursor, filtros,
+                {
+                    'tipo_acao': "ta.descricao_tipo_acao = %s",
+                    'id_usuario': "la.id_usuario = %s::int"
+                },
+                limite_padrao=50
+            )
         except Exception as e:
             print(f"Erro ao listar logs: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
     def executar_distribuicao_admin(self, limite=10):
-        """Executa distribuição de créditos (admin)."""
+        """
+        Executa distribuição de créditos (admin).
+        Com o agendador ativo, agenda sem janela de espera e responde 202 com
+        o id do trabalho (acompanhar em /api/distribuicao/status).
+        """
         try:
-            resultado = self.db.executar_distribuicao(limite=limite)
-            
+            limite = int(limite or 10)
+            if limite <= 0:
+                return {'sucesso': False, 'mensagem': 'Limite inválido', 'http_status': 400}
+
+            # Nada a gravar antes: confirma já para o agendamento sair com id_job
+            self.db.confirmar_requisicao()
+            resultado = self.db.solicitar_distribuicao('admin', limite=limite, imediato=True)
+
             return {
                 'sucesso': True,
-                'resultado': resultado
+                'resultado': resultado,
+                'http_status': 202 if resultado['agendada'] else 200
             }
+        except (TypeError, ValueError):
+            return {'sucesso': False, 'mensagem': 'Limite inválido', 'http_status': 400}
         except Exception as e:
             print(f"Erro na distribuição: {e}")
             return {'sucesso': False, 'mensagem': str(e)}
 
+    def status_distribuicao(self, id_job=None):
+        """
+        Progresso e resultado dos trabalhos do agendador de distribuição.
+        Com id_job: um trabalho (qualquer usuário logado, ex.: o doador que
+        recebeu o id ao doar). Sem id_job: visão geral, só administrador.
+        """
+        try:
+            if not self.sessao.get('usuario_id'):
+                return {'sucesso': False, 'mensagem': 'Usuário não está logado', 'http_status': 401}
+
+            agendador = self.db.agendador_distribuicao
+            if agendador is None:
+                return {'sucesso': False, 'mensagem': 'Distribuição em segundo plano desativada', 'http_status': 404}
+
+            if id_job is not None:
+                try:
+                    trabalho = agendador.status(int(id_job))
+                except (TypeError, ValueError):
+                    return {'sucesso': False, 'mensagem': 'id_job inválido', 'http_status': 400}
+                if trabalho is None:
+                    return {'sucesso': False, 'mensagem': 'Trabalho não encontrado', 'http_status': 404}
+                return {'sucesso': True, 'trabalho': trabalho}
+
+            if self.sessao.get('tipo') != 'ADMINISTRADOR':
+                return {'sucesso': False, 'mensagem': 'Acesso negado', 'http_status': 403}
+            return {
+                'sucesso': True,
+                'estatisticas': agendador.estatisticas(),
+                'trabalhos': agendador.trabalhos()
+            }
+        except Exception as e:
+            print(f"Erro ao consultar distribuição: {e}")
+            return {'sucesso': False, 'mensagem': str(e)}
+
     def obter_estatisticas_sistema(self):
         """Retorna estatísticas gerais do sistema."""
         try:
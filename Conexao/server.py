@@ -1,28 +1,83 @@
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse, unquote
+from contextlib import contextmanager
 import os
 import sys
 import json
-import uuid
-from datetime import datetime, date
+import queue
+import threading
+import time
 
 # Import Routes (adjusts sys.path inside file)
 from routes import Routes
+from database import Database, criar_pool
+from utils.eventos import TipoEvento
+from cache_respostas import CacheRespostas
+from arquivos_estaticos import ServidorEstatico
+from templates import CacheModelos, localizar_frontend
+from respostas_json import blocos_json, codificar_json, escrever_em_partes, tem_lista_grande
+from sessoes import ArmazemSessoes
+from exportacao import CONSULTAS_EXPORTACAO, FORMATOS_EXPORTACAO, exportar_tabela
+from controle_admissao import AdmissaoNegadaError, ControleAdmissao
+from metricas import EscritorContado, MetricasRotas, formato_prometheus, rotulo_rota
+from utils.custo_banco import custo_atual, iniciar_medicao
 
-# Simple in-memory session store
-SESSOES = {}
+# Sessões com validade de 24h renovada a cada acesso (mesmo Max-Age do cookie)
+# e limite de tamanho; iniciar_servidor(backend_sessoes=...) compartilha entre processos
+SESSOES = ArmazemSessoes(ttl=86400, max_sessoes=100_000)
+
+# Respostas de leitura mais acessadas: validade curta + invalidação quando
+# doações, distribuições, cadastros ou a fila mudam os números exibidos
+CACHE_RESPOSTAS = CacheRespostas()
+CACHE_RESPOSTAS.conectar({
+    TipoEvento.DOACAO: ['admin/metricas', 'admin/estatisticas'],
+    TipoEvento.DISTRIBUICAO: ['estatisticas-gerais', 'admin/metricas', 'admin/estatisticas'],
+    TipoEvento.CADASTRO: ['admin/metricas', 'admin/estatisticas'],
+    TipoEvento.FILA: ['admin/metricas'],
+})
+TTL_ESTATISTICAS_GERAIS = 60.0
+TTL_ADMIN = 15.0
+
+
+def resposta_com_sucesso(resultado) -> bool:
+    return bool(resultado and resultado.get('sucesso'))
+
+
+def estatisticas_disponiveis(resultado) -> bool:
+    # Routes.estatisticas_gerais devolve zeros marcados quando o banco falha
+    return bool(resultado) and not resultado.get('indisponivel')
+
+
+# FrontEnd/assets: metadados em memória, 304, gzip e sendfile (ver arquivos_estaticos.py)
+ARQUIVOS_ESTATICOS = ServidorEstatico(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'FrontEnd', 'assets')
+)
+
+# Páginas HTML compiladas uma vez e recompiladas só quando mudam (ver templates.py)
+MODELOS_HTML = CacheModelos(localizar_frontend(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Login e recuperação de senha: crypt()/bcrypt no banco é caro de propósito,
+# então rajadas de tentativas são limitadas por IP/conta e em concorrência
+CONTROLE_ADMISSAO = ControleAdmissao()
+ROTAS_ADMISSAO = {
+    '/login', '/api/login',
+    '/api/recuperacao/solicitar', '/api/recuperacao/validar', '/api/recuperacao/resetar'
+}
+
+# Latência, status, bytes e custo de banco por rota (/api/admin/perf e /metrics)
+METRICAS = MetricasRotas()
+# /metrics sem login para clientes em loopback; só ative se nenhum proxy
+# local repassa requisições externas (todas chegariam como 127.0.0.1)
+METRICAS_SEM_LOGIN_LOCAL = False
 
 
 def criar_sessao(dados: dict) -> str:
-    sid = str(uuid.uuid4())
-    SESSOES[sid] = dados.copy()
-    SESSOES[sid]['criada_em'] = datetime.utcnow().isoformat()
-    return sid
+    return SESSOES.criar(dados)
 
 
 def destruir_sessao(session_id: str):
-    if session_id in SESSOES:
-        del SESSOES[session_id]
+    SESSOES.destruir(session_id)
 
 
 def obter_session_id_from_headers(headers):
@@ -38,36 +93,185 @@ def obter_session_id_from_headers(headers):
     return None
 
 
+# Marca de "sessão ainda não consultada nesta requisição"
+_SESSAO_NAO_RESOLVIDA = object()
+
+
 class SimpleHandler(BaseHTTPRequestHandler):
     routes = Routes()
+    # HTTP/1.1 para permitir Transfer-Encoding: chunked nas listas grandes
+    protocol_version = 'HTTP/1.1'
+    # sid do cookie com sessão válida (None = sem sessão); ver sid_sessao_valida
+    _sid_sessao = _SESSAO_NAO_RESOLVIDA
+    # False enquanto a transação da requisição não foi confirmada; ver confirmar_transacao
+    _transacao_confirmada = True
+    # Keep-alive: conexão ociosa por mais que isso (s) é fechada e libera o worker
+    timeout = 5
+
+    def send_response(self, code, message=None):
+        self._status_resposta = code
+        super().send_response(code, message)
+
+    def confirmar_transacao(self):
+        """
+        Confirma a transação da requisição antes de a resposta sair (uma vez
+        por requisição): o cliente só recebe "sucesso" do que já está gravado
+        e uma requisição seguinte, em outro worker, já enxerga os dados.
+        Falha no commit sobe para o handler, que responde 500.
+        """
+        if self._transacao_confirmada:
+            return
+        self._transacao_confirmada = True
+        self.routes.db.confirmar_requisicao()
+
+    def end_headers(self):
+        try:
+            self.confirmar_transacao()
+        except Exception:
+            # Nada foi enviado ainda: descarta os cabeçalhos desta resposta
+            self._headers_buffer = []
+            raise
+        # Mantém a conexão só se o corpo tem tamanho conhecido e nenhuma outra
+        # conexão espera por um worker
+        if not self.close_connection and (not self._corpo_delimitado() or self._servidor_saturado()):
+            self.send_header('Connection', 'close')
+        super().end_headers()
+
+    def _corpo_delimitado(self):
+        """True se a resposta informou Content-Length ou Transfer-Encoding."""
+        cabecalhos = b''.join(getattr(self, '_headers_buffer', [])).lower()
+        return b'\r\ncontent-length:' in cabecalhos or b'\r\ntransfer-encoding:' in cabecalhos
+
+    def _servidor_saturado(self):
+        # HTTPServer simples (uma thread) não pode ficar preso a um cliente
+        saturado = getattr(self.server, 'saturado', None)
+        return saturado is None or saturado()
 
     # Utility to sync session from cookie into Routes._sessao_global
     def carregar_sessao_em_routes(self):
         sid = obter_session_id_from_headers(self.headers)
-        if sid and sid in SESSOES:
-            Routes._sessao_global = SESSOES[sid].copy()
-            self.routes.sessao = Routes._sessao_global
+        sessao = SESSOES.obter(sid)
+        if sessao is not None:
+            Routes._sessao_global.definir(sessao)
+            self._sid_sessao = sid
         else:
-            Routes._sessao_global = {}
-            self.routes.sessao = Routes._sessao_global
+            Routes._sessao_global.limpar()
+            self._sid_sessao = None
+
+    def sid_sessao_valida(self):
+        """
+        sid do cookie se a sessão existir, consultando SESSOES no máximo uma
+        vez por requisição (a consulta renova o TTL e pode ir ao backend).
+        """
+        if self._sid_sessao is _SESSAO_NAO_RESOLVIDA:
+            sid = obter_session_id_from_headers(self.headers)
+            self._sid_sessao = sid if sid and sid in SESSOES else None
+        return self._sid_sessao
+
+    def parametros_listagem(self):
+        """
+        Lê ?limite=&cursor=&<filtro>=... das listagens paginadas; os demais
+        parâmetros viram filtros (cada listagem ignora os que não conhece).
+        """
+        query_params = parse_qs(urlparse(self.path).query)
+        parametros = {k: v[0] for k, v in query_params.items()}
+        return {
+            'limite': parametros.pop('limite', None),
+            'cursor': parametros.pop('cursor', None),
+            'filtros': parametros
+        }
+
+    @contextmanager
+    def contexto_requisicao(self):
+        """
+        Escopo de uma requisição: sessão limpa (sem resíduos de requisições
+        anteriores atendidas pela mesma thread) e conexão do pool emprestada.
+        A transação é confirmada em end_headers, antes do corpo da resposta.
+        """
+        Routes._sessao_global.limpar()
+        self._sid_sessao = _SESSAO_NAO_RESOLVIDA
+        self._transacao_confirmada = False
+        try:
+            with self.routes.db.conexao_requisicao():
+                yield
+        finally:
+            Routes._sessao_global.limpar()
+
+    @contextmanager
+    def medir_requisicao(self):
+        """Registra latência, status, bytes enviados e custo de banco em METRICAS."""
+        inicio = time.perf_counter()
+        iniciar_medicao()
+        self._status_resposta = 0
+        self._rota_inexistente = False
+        escritor = self.wfile = EscritorContado(self.wfile)
+        try:
+            yield
+        finally:
+            self.wfile = escritor._destino
+            consultas, segundos_db = custo_atual()
+            METRICAS.registrar(
+                rotulo_rota(self.command, urlparse(self.path).path, self._rota_inexistente),
+                self._status_resposta,
+                time.perf_counter() - inicio,
+                escritor.bytes_enviados,
+                consultas,
+                segundos_db
+            )
+
+    def componentes_metricas(self):
+        """Estatísticas dos componentes do servidor (nome -> função)."""
+        db = self.routes.db
+        componentes = {
+            'cache_respostas': CACHE_RESPOSTAS.estatisticas,
+            'sessoes': SESSOES.estatisticas,
+            'admissao': CONTROLE_ADMISSAO.estatisticas,
+            'instrucoes': db.instrucoes.estatisticas,
+        }
+        if db.pool is not None:
+            componentes['pool'] = db.pool.estatisticas
+        if db.escritor_auditoria is not None:
+            componentes['escritor_auditoria'] = db.escritor_auditoria.estatisticas
+        if db.agendador_distribuicao is not None:
+            componentes['agendador_distribuicao'] = db.agendador_distribuicao.estatisticas
+        return componentes
 
     def do_POST(self):
+        with self.medir_requisicao(), self.contexto_requisicao():
+            return self._tratar_post()
+
+    def do_GET(self):
+        with self.medir_requisicao(), self.contexto_requisicao():
+            return self._tratar_get()
+
+    def _tratar_post(self):
         try:
             content_length = int(self.headers.get('Content-Length', 0))
             body = self.rfile.read(content_length).decode('utf-8') if content_length > 0 else ''
 
             if self.headers.get('Content-Type', '').startswith('application/json'):
                 dados = json.loads(body) if body else {}
+            elif self.headers.get('Content-Type', '').startswith('text/csv'):
+                dados = {'csv': body}
             else:
                 parsed = parse_qs(body)
                 dados = {k: v[0] for k, v in parsed.items()}
 
             path = urlparse(self.path).path
 
+            # Limite de tentativas (antes de qualquer acesso ao banco)
+            if path in ROTAS_ADMISSAO:
+                if not isinstance(dados, dict):
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Corpo da requisição inválido'}, status=400)
+                CONTROLE_ADMISSAO.entrar(self.client_address[0], dados.get('email'))
+
             # LOGIN
             if path in ['/login', '/api/login']:
-                resultado = self.routes.login(dados)
+                with CONTROLE_ADMISSAO.verificacao():
+                    resultado = self.routes.login(dados)
                 if resultado.get('sucesso'):
+                    # Login certo não conta contra o limite da conta
+                    CONTROLE_ADMISSAO.sucesso(dados.get('email'))
                     session_id = criar_sessao({
                         'usuario_id': Routes._sessao_global.get('usuario_id'),
                         'nome': Routes._sessao_global.get('nome'),
@@ -133,8 +337,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 if resultado.get('sucesso'):
                     # Atualiza sessão com o novo tipo
                     sid = obter_session_id_from_headers(self.headers)
-                    if sid and sid in SESSOES:
-                        SESSOES[sid].update({'tipo': Routes._sessao_global.get('tipo')})
+                    if SESSOES.atualizar(sid, {'tipo': Routes._sessao_global.get('tipo')}):
                         # Re-envia o cookie para garantir
                         self.send_response(200)
                         self.send_header('Content-type', 'application/json; charset=utf-8')
@@ -150,11 +353,10 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 resultado = self.routes.completar_cadastro_doador(dados)
                 if resultado.get('sucesso'):
                     sid = obter_session_id_from_headers(self.headers)
-                    if sid and sid in SESSOES:
-                        SESSOES[sid].update({
-                            'id_doador': Routes._sessao_global.get('id_doador'),
-                            'tipo': Routes._sessao_global.get('tipo')
-                        })
+                    SESSOES.atualizar(sid, {
+                        'id_doador': Routes._sessao_global.get('id_doador'),
+                        'tipo': Routes._sessao_global.get('tipo')
+                    })
                 return self.enviar_json(resultado)
 
             if path == '/api/perfil/completar/beneficiario':
@@ -162,11 +364,10 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 resultado = self.routes.completar_cadastro_beneficiario(dados)
                 if resultado.get('sucesso'):
                     sid = obter_session_id_from_headers(self.headers)
-                    if sid and sid in SESSOES:
-                        SESSOES[sid].update({
-                            'id_beneficiario': Routes._sessao_global.get('id_beneficiario'),
-                            'tipo': Routes._sessao_global.get('tipo')
-                        })
+                    SESSOES.atualizar(sid, {
+                        'id_beneficiario': Routes._sessao_global.get('id_beneficiario'),
+                        'tipo': Routes._sessao_global.get('tipo')
+                    })
                 return self.enviar_json(resultado)
 
             # BENEFICIÁRIO - criar solicitação
@@ -201,12 +402,23 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 # persiste esse id na sessão em memória (SESSOES) para requisições futuras.
                 if resultado.get('sucesso'):
                     sid = obter_session_id_from_headers(self.headers)
-                    if sid and sid in SESSOES:
-                        # Atualiza id_doador caso tenha sido criado agora
-                        if Routes._sessao_global.get('id_doador'):
-                            SESSOES[sid].update({'id_doador': Routes._sessao_global.get('id_doador')})
+                    # Atualiza id_doador caso tenha sido criado agora
+                    if Routes._sessao_global.get('id_doador'):
+                        SESSOES.atualizar(sid, {'id_doador': Routes._sessao_global.get('id_doador')})
                 return self.enviar_json(resultado)
             
+            # DOADOR - lote de doações (lista JSON, {"creditos": [...]} ou text/csv)
+            if path == '/api/doador/doacoes/lote':
+                self.carregar_sessao_em_routes()
+                if not self.verificar_permissao('DOADOR'):
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Permissão negada'}, status=403)
+                resultado = self.routes.criar_doacoes_em_lote(dados)
+                if resultado.get('sucesso'):
+                    sid = obter_session_id_from_headers(self.headers)
+                    if Routes._sessao_global.get('id_doador'):
+                        SESSOES.atualizar(sid, {'id_doador': Routes._sessao_global.get('id_doador')})
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
+
             # DOADOR - editar doação
             if path == '/api/doador/doacao/editar':
                 self.carregar_sessao_em_routes()
@@ -246,9 +458,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
                     Routes._sessao_global['nome'] = nome
                     Routes._sessao_global['email'] = email
                     sid = obter_session_id_from_headers(self.headers)
-                    if sid and sid in SESSOES:
-                        SESSOES[sid]['nome'] = nome
-                        SESSOES[sid]['email'] = email
+                    SESSOES.atualizar(sid, {'nome': nome, 'email': email})
         
                     return self.enviar_json({
                         'sucesso': True,
@@ -343,21 +553,25 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 sid = obter_session_id_from_headers(self.headers)
                 if sid:
                     destruir_sessao(sid)
+                self._sid_sessao = None
                 return self.enviar_json({'sucesso': True, 'redirect': '/login'})
             
             # RECUPERAÇÃO DE SENHA - Solicitar código
             if path == '/api/recuperacao/solicitar':
-                resultado = self.routes.solicitar_recuperacao_senha(dados)
+                with CONTROLE_ADMISSAO.verificacao():
+                    resultado = self.routes.solicitar_recuperacao_senha(dados)
                 return self.enviar_json(resultado)
 
             # RECUPERAÇÃO DE SENHA - Validar código
             if path == '/api/recuperacao/validar':
-                resultado = self.routes.validar_codigo_recuperacao(dados)
+                with CONTROLE_ADMISSAO.verificacao():
+                    resultado = self.routes.validar_codigo_recuperacao(dados)
                 return self.enviar_json(resultado)
 
             # RECUPERAÇÃO DE SENHA - Resetar senha
             if path == '/api/recuperacao/resetar':
-                resultado = self.routes.resetar_senha_com_codigo(dados)
+                with CONTROLE_ADMISSAO.verificacao():
+                    resultado = self.routes.resetar_senha_com_codigo(dados)
                 return self.enviar_json(resultado)
             
             if path == '/api/admin/distribuir':
@@ -367,11 +581,18 @@ class SimpleHandler(BaseHTTPRequestHandler):
     
                 limite = dados.get('limite', 10)
                 resultado = self.routes.executar_distribuicao_admin(limite)
-                return self.enviar_json(resultado)
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
 
             # Fallback
             self.enviar_404()
 
+        except AdmissaoNegadaError as e:
+            self.enviar_json(
+                {'sucesso': False, 'mensagem': str(e)},
+                status=e.status,
+                cabecalhos={'Retry-After': str(e.retry_after_segundos)}
+            )
+
         except Exception as e:
             print(f"Erro ao processar requisição POST: {str(e)}")
             import traceback
@@ -395,7 +616,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
             return None
         return usuario
 
-    def do_GET(self):
+    def _tratar_get(self):
         try:
             # Estático
             if self.path.startswith(('/assets/', '/images/')):
@@ -479,57 +700,140 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.obter_metricas_admin()
+                resultado = CACHE_RESPOSTAS.obter(
+                    'admin/metricas', self.routes.obter_metricas_admin, TTL_ADMIN,
+                    guardar_se=resposta_com_sucesso
+                )
                 return self.enviar_json(resultado)
 
+            # Distribuição em segundo plano: um trabalho (?id_job=) ou visão geral (admin)
+            if urlparse(self.path).path == '/api/distribuicao/status':
+                self.carregar_sessao_em_routes()
+                query_params = parse_qs(urlparse(self.path).query)
+                resultado = self.routes.status_distribuicao(query_params.get('id_job', [None])[0])
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
+
+            # ADMIN: desempenho por rota e estatísticas dos componentes
+            if urlparse(self.path).path == '/api/admin/perf':
+                self.carregar_sessao_em_routes()
+                if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
+
+                componentes = {}
+                for nome, obter in self.componentes_metricas().items():
+                    try:
+                        componentes[nome] = obter()
+                    except Exception as e:
+                        componentes[nome] = {'erro': str(e)}
+                return self.enviar_json({'sucesso': True, **METRICAS.resumo(), 'componentes': componentes})
+
+            # ADMIN: consultas mais caras segundo o perfilador de SQL (?top=&ordenar=)
+            if urlparse(self.path).path == '/api/admin/perf/sql':
+                self.carregar_sessao_em_routes()
+                if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
+
+                perfilador = self.routes.db.perfilador
+                if perfilador is None:
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Perfilador de SQL desativado'}, status=404)
+                parametros = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                try:
+                    top = max(1, min(int(parametros.get('top', 20)), 200))
+                except ValueError:
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'top inválido'}, status=400)
+                return self.enviar_json({
+                    'sucesso': True,
+                    'limite_lento_ms': perfilador.limite_lento_ms,
+                    'consultas': perfilador.relatorio(top, parametros.get('ordenar', 'tempo_total_ms')),
+                    'lentas': perfilador.lentas(top)
+                })
+
+            # Prometheus: administrador logado (ou loopback, se liberado na inicialização)
+            if urlparse(self.path).path == '/metrics':
+                if not (METRICAS_SEM_LOGIN_LOCAL and self.client_address[0] in ('127.0.0.1', '::1')):
+                    self.carregar_sessao_em_routes()
+                    if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
+                        return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
+
+                corpo = formato_prometheus(METRICAS, self.componentes_metricas()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(corpo)
+                return
+
             # ADMIN: Lista de Beneficiários
-            if self.path == '/api/admin/beneficiarios':
+            if urlparse(self.path).path == '/api/admin/beneficiarios':
                 self.carregar_sessao_em_routes()
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.listar_beneficiarios_admin()
-                return self.enviar_json(resultado)
+                resultado = self.routes.listar_beneficiarios_admin(**self.parametros_listagem())
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
 
             # ADMIN: Lista de Doadores
-            if self.path == '/api/admin/doadores':
+            if urlparse(self.path).path == '/api/admin/doadores':
                 self.carregar_sessao_em_routes()
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.listar_doadores_admin()
-                return self.enviar_json(resultado)
+                resultado = self.routes.listar_doadores_admin(**self.parametros_listagem())
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
 
             # ADMIN: Lista de Créditos
-            if self.path == '/api/admin/creditos':
+            if urlparse(self.path).path == '/api/admin/creditos':
                 self.carregar_sessao_em_routes()
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.listar_creditos_admin()
-                return self.enviar_json(resultado)
+                resultado = self.routes.listar_creditos_admin(**self.parametros_listagem())
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
 
             # ADMIN: Fila de Espera
-            if self.path == '/api/admin/fila':
+            if urlparse(self.path).path == '/api/admin/fila':
                 self.carregar_sessao_em_routes()
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.listar_fila_admin()
-                return self.enviar_json(resultado)
+                resultado = self.routes.listar_fila_admin(**self.parametros_listagem())
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
 
-            # ADMIN: Logs (com parâmetro limite)
-            if self.path.startswith('/api/admin/logs'):
+            # ADMIN: Logs (limite, cursor e filtros na query string)
+            if urlparse(self.path).path == '/api/admin/logs':
                 self.carregar_sessao_em_routes()
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                from urllib.parse import parse_qs, urlparse
+                resultado = self.routes.listar_logs_admin(**self.parametros_listagem())
+                return self.enviar_json(resultado, status=resultado.get('http_status', 200))
+
+            # ADMIN: Exportação completa (?tabela=usuarios|creditos|fila|transacoes|logs
+            # &formato=csv|ndjson&gzip=1), lida com cursor no servidor e enviada em partes
+            if urlparse(self.path).path == '/api/admin/exportar':
+                self.carregar_sessao_em_routes()
+                if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
+                    return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
+
                 query_params = parse_qs(urlparse(self.path).query)
-                limite = int(query_params.get('limite', [50])[0])
-    
-                resultado = self.routes.listar_logs_admin(limite)
-                return self.enviar_json(resultado)
+                tabela = query_params.get('tabela', [''])[0]
+                formato = query_params.get('formato', ['csv'])[0]
+                if tabela not in CONSULTAS_EXPORTACAO or formato not in FORMATOS_EXPORTACAO:
+                    return self.enviar_json({
+                        'sucesso': False,
+                        'mensagem': f"Use tabela={'|'.join(CONSULTAS_EXPORTACAO)} e formato={'|'.join(FORMATOS_EXPORTACAO)}"
+                    }, status=400)
+                comprimir = query_params.get('gzip', ['0'])[0] in ('1', 'true')
+
+                self.routes.db.registrar_log_auditoria(
+                    id_usuario=self.routes.sessao.get('usuario_id'),
+                    tipo_acao='EXPORTACAO',
+                    detalhes=f'tabela={tabela} formato={formato}'
+                )
+                # Commit agora: o cursor da exportação abre a própria transação de leitura
+                self.confirmar_transacao()
+                return exportar_tabela(self, self.routes.db, tabela, formato, comprimir)
 
             # ADMIN: Estatísticas do Sistema
             if self.path == '/api/admin/estatisticas':
@@ -537,7 +841,10 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 if self.routes.sessao.get('tipo') != 'ADMINISTRADOR':
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Acesso negado'}, status=403)
     
-                resultado = self.routes.obter_estatisticas_sistema()
+                resultado = CACHE_RESPOSTAS.obter(
+                    'admin/estatisticas', self.routes.obter_estatisticas_sistema, TTL_ADMIN,
+                    guardar_se=resposta_com_sucesso
+                )
                 return self.enviar_json(resultado)
 
             # LISTAR USUÁRIOS (API)
@@ -553,12 +860,16 @@ class SimpleHandler(BaseHTTPRequestHandler):
                     return self.enviar_json({'sucesso': False, 'mensagem': str(e)}, status=500)
 
 
-            if self.path == '/api/beneficiario/dados':
+            if urlparse(self.path).path == '/api/beneficiario/dados':
                 self.carregar_sessao_em_routes()
                 if not self.verificar_permissao('BENEFICIARIO'):
                     return self.enviar_json({'sucesso': False, 'mensagem': 'Permissão negada'}, status=403)
-                dados = self.routes.obter_dados_beneficiario()
-                return self.enviar_json(dados)
+                query_params = parse_qs(urlparse(self.path).query)
+                dados = self.routes.obter_dados_beneficiario(
+                    limite=query_params.get('limite', [50])[0],
+                    cursor=query_params.get('cursor', [None])[0]
+                )
+                return self.enviar_json(dados, status=dados.get('http_status', 200))
 
             if self.path == '/api/doador/dados':
                 self.carregar_sessao_em_routes()
@@ -572,7 +883,10 @@ class SimpleHandler(BaseHTTPRequestHandler):
             
             if self.path == '/api/estatisticas-gerais':
                 try:
-                    resultado = self.routes.estatisticas_gerais()
+                    resultado = CACHE_RESPOSTAS.obter(
+                        'estatisticas-gerais', self.routes.estatisticas_gerais, TTL_ESTATISTICAS_GERAIS,
+                        guardar_se=estatisticas_disponiveis
+                    )
                     return self.enviar_json({
                         'sucesso': True,
                         'dados': resultado
@@ -594,94 +908,60 @@ class SimpleHandler(BaseHTTPRequestHandler):
             self.enviar_json({'sucesso': False, 'mensagem': str(e)}, status=500)
 
     def servir_html(self, nome_arquivo, dados=None):
-        cur = os.path.abspath(__file__)
-        candidates = []
-        base = os.path.dirname(cur)
-        for _ in range(4):
-            candidates.append(os.path.join(base, "FrontEnd"))
-            base = os.path.dirname(base)
-        FRONT_DIR = next((c for c in candidates if os.path.isdir(c)), None)
-        if not FRONT_DIR:
-            print("Não encontrei a pasta FrontEnd. Candidatos:", candidates)
+        corpo = MODELOS_HTML.renderizar(nome_arquivo, dados)
+        if corpo is None:
+            print(f"Arquivo não encontrado: {nome_arquivo}")
             return self.enviar_404()
-        caminho = os.path.join(FRONT_DIR, nome_arquivo)
-        if os.path.exists(caminho):
-            with open(caminho, 'r', encoding='utf-8') as f:
-                conteudo = f.read()
-            if dados:
-                for chave, valor in dados.items():
-                    conteudo = conteudo.replace(f'{{{{{chave}}}}}', str(valor))
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            
-            sid = obter_session_id_from_headers(self.headers)
-            if sid and sid in SESSOES:
-                self.send_header('Set-Cookie', f'session_id={sid}; Path=/; Max-Age=86400; SameSite=Lax')
-            
-            self.end_headers()
-            self.wfile.write(conteudo.encode('utf-8'))
-        else:
-            print(f"Arquivo não encontrado: {caminho}")
-            self.enviar_404()
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+
+        sid = self.sid_sessao_valida()
+        if sid:
+            self.send_header('Set-Cookie', f'session_id={sid}; Path=/; Max-Age=86400; SameSite=Lax')
+
+        self.end_headers()
+        self.wfile.write(corpo)
 
     def servir_estatico(self, path):
-        path = unquote(path)
-        BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ASSETS_DIR = os.path.join(BASE_DIR, 'FrontEnd', 'assets')
+        url = urlparse(path)
+        path = unquote(url.path)
         if path.startswith('/static/'):
             rel_path = path[len('/static/'):]
         elif path.startswith('/assets/'):
             rel_path = path[len('/assets/'):] 
         else:
             self.enviar_404(); return
-        rel_path = os.path.normpath(rel_path).replace('\\', '/')
-        if rel_path.startswith('..'):
-            self.enviar_404(); return
-        arquivo = os.path.join(ASSETS_DIR, rel_path)
-        if not os.path.exists(arquivo):
-            print(f"Arquivo estático não encontrado: {arquivo}")
-            self.enviar_404(); return
-        if arquivo.endswith('.css'):
-            content_type = 'text/css'
-        elif arquivo.endswith('.js'):
-            content_type = 'application/javascript'
-        elif arquivo.endswith('.png'):
-            content_type = 'image/png'
-        elif arquivo.endswith('.jpg') or arquivo.endswith('.jpeg'):
-            content_type = 'image/jpeg'
-        elif arquivo.endswith('.svg'):
-            content_type = 'image/svg+xml'
-        elif arquivo.endswith('.ico'):
-            content_type = 'image/x-icon'
-        else:
-            content_type = 'application/octet-stream'
-        with open(arquivo, 'rb') as f:
-            conteudo = f.read()
-        self.send_response(200)
-        self.send_header('Content-type', content_type)
-        self.end_headers()
-        self.wfile.write(conteudo)
-
-    def enviar_json(self, dados, status=200):
-        import decimal
-        def converter_decimal(obj):
-            if isinstance(obj, decimal.Decimal):
-                return float(obj)
-            if isinstance(obj, (datetime, date)):
-                return obj.isoformat()
-            raise TypeError(f'Tipo {type(obj)} não é serializável')
+        # ?v=... marca a URL como versionada (cache imutável)
+        versionado = 'v' in parse_qs(url.query)
+        if not ARQUIVOS_ESTATICOS.servir(self, rel_path, fingerprint=versionado):
+            print(f"Arquivo estático não encontrado: {rel_path}")
+            self.enviar_404()
+
+    def enviar_json(self, dados, status=200, cabecalhos=None):
         self.send_response(status)
         self.send_header('Content-type', 'application/json; charset=utf-8')
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
         
-        sid = obter_session_id_from_headers(self.headers)
-        if sid and sid in SESSOES:
+        sid = self.sid_sessao_valida()
+        if sid:
             self.send_header('Set-Cookie', f'session_id={sid}; Path=/; Max-Age=86400; SameSite=Lax')
-        
+
+        # Listas grandes (admin, /api/usuarios) saem em partes, sem montar o JSON inteiro
+        if self.request_version == 'HTTP/1.1' and tem_lista_grande(dados):
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            escrever_em_partes(self.wfile, blocos_json(dados))
+            return
+
+        corpo = codificar_json(dados)
+        self.send_header('Content-Length', str(len(corpo)))
         self.end_headers()
-        json_data = json.dumps(dados, ensure_ascii=False, default=converter_decimal)
-        self.wfile.write(json_data.encode('utf-8'))
+        self.wfile.write(corpo)
 
     def enviar_404(self):
+        self._rota_inexistente = True
         self.send_response(404)
         self.send_header('Content-type', 'text/html; charset=utf-8')
         self.end_headers()
@@ -692,8 +972,136 @@ class SimpleHandler(BaseHTTPRequestHandler):
         print(f"[{self.date_time_string()}] {format % args}")
 
 
-def iniciar_servidor(porta=8000):
-    servidor = HTTPServer(('localhost', porta), SimpleHandler)
+class ServidorConcorrente(HTTPServer):
+    """
+    HTTPServer com pool fixo de workers.
+
+    - max_workers threads atendem as conexões aceitas
+    - backlog limita a fila de conexões pendentes no socket (listen)
+    - fila_maxima limita conexões aceitas aguardando um worker; acima disso
+      a conexão recebe 503 imediatamente
+    - enquanto houver conexões na fila (saturado()), as respostas fecham a
+      conexão em vez de mantê-la em keep-alive
+    - encerrar() para de aceitar conexões e drena as que já estão na fila
+    """
+
+    def __init__(self, endereco, handler, max_workers=8, backlog=64, fila_maxima=128):
+        # request_queue_size é lido em server_activate() (listen)
+        self.request_queue_size = backlog
+        self.max_workers = max_workers
+        self._fila = queue.Queue(maxsize=fila_maxima)
+        self._workers = []
+        super().__init__(endereco, handler)
+
+        for i in range(max_workers):
+            t = threading.Thread(target=self._loop_worker, name=f'worker-http-{i}', daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def process_request(self, request, client_address):
+        try:
+            self._fila.put_nowait((request, client_address))
+        except queue.Full:
+            self._rejeitar(request)
+            self.shutdown_request(request)
+
+    def saturado(self):
+        """True se há conexões aceitas esperando um worker livre."""
+        return not self._fila.empty()
+
+    @staticmethod
+    def _rejeitar(request):
+        corpo = b'{"sucesso": false, "mensagem": "Servidor ocupado, tente novamente"}'
+        try:
+            request.sendall(
+                b'HTTP/1.0 503 Service Unavailable\r\n'
+                b'Content-Type: application/json; charset=utf-8\r\n'
+                b'Retry-After: 1\r\n'
+                b'Content-Length: ' + str(len(corpo)).encode() + b'\r\n\r\n' + corpo
+            )
+        except OSError:
+            pass
+
+    def _loop_worker(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def encerrar(self, timeout=30.0):
+        """Drena as conexões pendentes e finaliza os workers."""
+        for _ in self._workers:
+            self._fila.put(None)
+        for t in self._workers:
+            t.join(timeout)
+        self.server_close()
+
+
+def iniciar_servidor(porta=8000, concorrente=True, max_workers=8, backlog=64, pool_maximo=None,
+                     backend_sessoes=None, backend_admissao=None, limites_admissao=None,
+                     perfilador_sql=None, metricas_sem_login=False):
+    """
+    Inicia o servidor HTTP.
+
+    Args:
+        porta: Porta TCP
+        concorrente: Usa ServidorConcorrente + pool de conexões (False = HTTPServer
+            single-thread com conexão única, comportamento antigo)
+        max_workers: Número de threads atendendo requisições
+        backlog: Tamanho da fila de conexões pendentes no listen()
+        pool_maximo: Máximo de conexões no pool (padrão: max_workers + 2)
+        backend_sessoes: Onde compartilhar as sessões entre processos:
+            None (só memória), 'postgres' (tabela UNLOGGED sessao_http) ou o
+            caminho de um arquivo SQLite
+        backend_admissao: 'postgres' para que os limites de tentativas de login
+            (tabela UNLOGGED limite_taxa) valham para todos os processos
+        limites_admissao: Parâmetros de ControleAdmissao (capacidade_ip, taxa_ip,
+            capacidade_conta, taxa_conta, max_verificacoes...) no lugar dos
+            padrões; ex.: limites altos para benchmarks/carga_http.py
+        perfilador_sql: Parâmetros de PerfiladorSQL (ex.: {'limite_lento_ms': 50,
+            'explicar': True}) para medir as consultas; relatório em /api/admin/perf/sql
+        metricas_sem_login: Libera /metrics sem sessão de administrador para
+            clientes em 127.0.0.1/::1 (ex.: Prometheus no mesmo host). Não use
+            atrás de um proxy reverso local
+    """
+    global CONTROLE_ADMISSAO, METRICAS_SEM_LOGIN_LOCAL
+    METRICAS_SEM_LOGIN_LOCAL = metricas_sem_login
+    if limites_admissao:
+        CONTROLE_ADMISSAO = ControleAdmissao(**limites_admissao)
+    if backend_admissao == 'postgres':
+        from controle_admissao import BackendAdmissaoPostgres
+        CONTROLE_ADMISSAO.definir_backend(BackendAdmissaoPostgres(criar_pool(minimo=0, maximo=2)))
+    if backend_sessoes == 'postgres':
+        from sessoes import BackendPostgres
+        # Pool próprio: não disputa conexões com os workers
+        SESSOES.definir_backend(BackendPostgres(criar_pool(minimo=0, maximo=2)))
+    elif backend_sessoes:
+        from sessoes import BackendSqlite
+        SESSOES.definir_backend(BackendSqlite(backend_sessoes))
+
+    if concorrente:
+        db_antigo = SimpleHandler.routes.db
+        # +1 conexão para o escritor de auditoria e +1 para o agendador de distribuição
+        SimpleHandler.routes = Routes(db=Database(pool=criar_pool(
+            minimo=0, maximo=pool_maximo or max_workers + 2
+        )))
+        SimpleHandler.routes.db.ativar_auditoria_assincrona()
+        # Doações e pedidos de distribuição só agendam; uma thread distribui
+        SimpleHandler.routes.db.ativar_agendador_distribuicao()
+        db_antigo.fechar()
+        servidor = ServidorConcorrente(('localhost', porta), SimpleHandler,
+                                       max_workers=max_workers, backlog=backlog)
+    else:
+        servidor = HTTPServer(('localhost', porta), SimpleHandler)
+    if perfilador_sql is not None:
+        SimpleHandler.routes.db.ativar_perfilador(**perfilador_sql)
     print(f'\n Servidor Energia Para Todos iniciado!')
     print(f' Acesse: http://localhost:{porta}')
     print(f' Login: http://localhost:{porta}/login')
@@ -702,7 +1110,13 @@ def iniciar_servidor(porta=8000):
         servidor.serve_forever()
     except KeyboardInterrupt:
         print('\nEncerrando servidor...')
-        servidor.server_close()
+        if isinstance(servidor, ServidorConcorrente):
+            servidor.encerrar()
+            SimpleHandler.routes.db.agendador_distribuicao.encerrar()
+            SimpleHandler.routes.db.escritor_auditoria.encerrar()
+            SimpleHandler.routes.db.pool.fechar()
+        else:
+            servidor.server_close()
 
         print('\n\nServidor encerrado.')
         servidor.shutdown()
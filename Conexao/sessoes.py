@@ -0,0 +1,384 @@
+"""
+Armazenamento de sessões HTTP com expiração (TTL deslizante), limite de
+tamanho (LRU) e backend compartilhado opcional (SQLite ou Postgres).
+"""
+import json
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+class BackendSessoes(ABC):
+    """
+    Interface de armazenamento compartilhado entre processos.
+
+    expira_em é sempre um timestamp Unix (time.time()), para que processos
+    diferentes concordem sobre a validade.
+    """
+
+    @abstractmethod
+    def carregar(self, sid: str) -> Optional[Tuple[dict, float]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def salvar(self, sid: str, dados: dict, expira_em: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def renovar(self, sid: str, expira_em: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remover(self, sid: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remover_expiradas(self, agora: float) -> int:
+        raise NotImplementedError
+
+
+class BackendSqlite(BackendSessoes):
+    """Sessões em um arquivo SQLite local (vários processos na mesma máquina)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessao_http (
+                    sid TEXT PRIMARY KEY,
+                    dados TEXT NOT NULL,
+                    expira_em REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessao_http_expira ON sessao_http (expira_em)")
+
+    def _conexao(self):
+        import sqlite3
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5.0)
+            self._local.conn = conn
+        return conn
+
+    def carregar(self, sid: str) -> Optional[Tuple[dict, float]]:
+        linha = self._conexao().execute(
+            "SELECT dados, expira_em FROM sessao_http WHERE sid = ?", (sid,)
+        ).fetchone()
+        if linha is None:
+            return None
+        return json.loads(linha[0]), linha[1]
+
+    def salvar(self, sid: str, dados: dict, expira_em: float) -> None:
+        with self._conexao() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessao_http (sid, dados, expira_em) VALUES (?, ?, ?)",
+                (sid, json.dumps(dados, default=str), expira_em)
+            )
+
+    def renovar(self, sid: str, expira_em: float) -> None:
+        with self._conexao() as conn:
+            conn.execute("UPDATE sessao_http SET expira_em = ? WHERE sid = ?", (expira_em, sid))
+
+    def remover(self, sid: str) -> None:
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM sessao_http WHERE sid = ?", (sid,))
+
+    def remover_expiradas(self, agora: float) -> int:
+        with self._conexao() as conn:
+            return conn.execute("DELETE FROM sessao_http WHERE expira_em <= ?", (agora,)).rowcount
+
+
+class BackendPostgres(BackendSessoes):
+    """
+    Sessões na tabela UNLOGGED sessao_http (ver script_banco.sql).
+
+    Usa um pool próprio (PoolConexoes), separado do pool das requisições, para
+    não disputar conexões com o worker que já segura uma.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _executar(self, sql: str, params=(), buscar: bool = False):
+        conn = self.pool.obter()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                resultado = cursor.fetchone() if buscar else cursor.rowcount
+            self.pool.devolver(conn, confirmar=True)
+            return resultado
+        except Exception:
+            self.pool.devolver(conn, confirmar=False)
+            raise
+
+    def carregar(self, sid: str) -> Optional[Tuple[dict, float]]:
+        linha = self._executar(
+            "SELECT dados, EXTRACT(EPOCH FROM expira_em) FROM sessao_http WHERE sid = %s",
+            (sid,), buscar=True
+        )
+        if linha is None:
+            return None
+        dados = linha[0] if isinstance(linha[0], dict) else json.loads(linha[0])
+        return dados, float(linha[1])
+
+    def salvar(self, sid: str, dados: dict, expira_em: float) -> None:
+        self._executar("""
+            INSERT INTO sessao_http (sid, dados, expira_em)
+            VALUES (%s, %s::jsonb, to_timestamp(%s))
+            ON CONFLICT (sid) DO UPDATE
+            SET dados = EXCLUDED.dados, expira_em = EXCLUDED.expira_em
+        """, (sid, json.dumps(dados, default=str), expira_em))
+
+    def renovar(self, sid: str, expira_em: float) -> None:
+        self._executar(
+            "UPDATE sessao_http SET expira_em = to_timestamp(%s) WHERE sid = %s",
+            (expira_em, sid)
+        )
+
+    def remover(self, sid: str) -> None:
+        self._executar("DELETE FROM sessao_http WHERE sid = %s", (sid,))
+
+    def remover_expiradas(self, agora: float) -> int:
+        return self._executar("DELETE FROM sessao_http WHERE expira_em <= to_timestamp(%s)", (agora,))
+
+
+class _Entrada:
+    __slots__ = ('dados', 'expira_em', 'conferida_em')
+
+    def __init__(self, dados: dict, expira_em: float, conferida_em: float):
+        self.dados = dados
+        self.expira_em = expira_em
+        # Última leitura do backend (cópia local pode estar desatualizada)
+        self.conferida_em = conferida_em
+
+
+class _Fatia:
+    """Parte do armazenamento com lock próprio; ordem do OrderedDict = último acesso."""
+
+    __slots__ = ('lock', 'entradas')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entradas: 'OrderedDict[str, _Entrada]' = OrderedDict()
+
+
+class ArmazemSessoes:
+    """
+    Sessões indexadas pelo session_id do cookie.
+
+    - Busca O(1): o sid escolhe a fatia (lock próprio) e o dict da fatia
+    - TTL deslizante: cada acesso válido renova a validade por `ttl` segundos
+      (o mesmo Max-Age reenviado no cookie)
+    - LRU: cada fatia guarda até max_sessoes / num_fatias sessões; acima disso
+      a menos usada é descartada. Como todas têm o mesmo TTL, a ordem de uso
+      também é a ordem de expiração: as expiradas saem do início da fatia
+    - backend (opcional): BackendSqlite/BackendPostgres para compartilhar as
+      sessões entre processos; a memória vira um cache revalidado a cada
+      `validade_local` segundos e a renovação no backend é gravada no máximo
+      a cada `intervalo_renovacao` segundos por sessão
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400,
+        max_sessoes: int = 100_000,
+        num_fatias: int = 16,
+        backend: Optional[BackendSessoes] = None,
+        validade_local: float = 5.0,
+        intervalo_renovacao: float = 60.0
+    ):
+        self.ttl = ttl
+        self.num_fatias = num_fatias
+        self.max_por_fatia = max(1, max_sessoes // num_fatias)
+        self.backend = backend
+        self.validade_local = validade_local
+        self.intervalo_renovacao = intervalo_renovacao
+        self._fatias = [_Fatia() for _ in range(num_fatias)]
+        self._estatisticas = {
+            'criadas': 0,
+            'expiradas': 0,
+            'descartadas_lru': 0,
+            'leituras_backend': 0
+        }
+        # Contadores alterados a partir de várias fatias (locks diferentes)
+        self._lock_estatisticas = threading.Lock()
+
+    def definir_backend(self, backend: Optional[BackendSessoes]) -> None:
+        """Troca o backend compartilhado (None = só memória)."""
+        self.backend = backend
+        for fatia in self._fatias:
+            with fatia.lock:
+                fatia.entradas.clear()
+
+    def _fatia(self, sid: str) -> _Fatia:
+        return self._fatias[hash(sid) % self.num_fatias]
+
+    def _contar(self, contador: str) -> int:
+        """Incrementa um contador de estatisticas() e devolve o novo valor."""
+        with self._lock_estatisticas:
+            self._estatisticas[contador] += 1
+            return self._estatisticas[contador]
+
+    def _podar(self, fatia: _Fatia, agora: float) -> None:
+        # Chamado com fatia.lock adquirido
+        entradas = fatia.entradas
+        while entradas:
+            sid, entrada = next(iter(entradas.items()))
+            if entrada.expira_em > agora:
+                break
+            del entradas[sid]
+            self._contar('expiradas')
+        while len(entradas) > self.max_por_fatia:
+            entradas.popitem(last=False)
+            self._contar('descartadas_lru')
+
+    # ============================================
+    # OPERAÇÕES
+    # ============================================
+
+    def criar(self, dados: dict) -> str:
+        """
+        Cria uma sessão.
+
+        Args:
+            dados: Dados do usuário logado (usuario_id, nome, tipo...)
+
+        Returns:
+            session_id para o cookie
+        """
+        sid = str(uuid.uuid4())
+        sessao = dict(dados, criada_em=datetime.utcnow().isoformat())
+        agora = time.time()
+        expira_em = agora + self.ttl
+        if self.backend is not None:
+            self.backend.salvar(sid, sessao, expira_em)
+
+        fatia = self._fatia(sid)
+        with fatia.lock:
+            fatia.entradas[sid] = _Entrada(sessao, expira_em, agora)
+            self._podar(fatia, agora)
+        criadas = self._contar('criadas')
+
+        # O backend não tem poda por acesso: limpa de tempos em tempos
+        if self.backend is not None and criadas % 1000 == 0:
+            self.backend.remover_expiradas(agora)
+        return sid
+
+    def _entrada_valida(self, sid: str) -> Optional[_Entrada]:
+        """Entrada viva (já renovada) ou None; consulta o backend quando preciso."""
+        if not sid:
+            return None
+        fatia = self._fatia(sid)
+        agora = time.time()
+        with fatia.lock:
+            entrada = fatia.entradas.get(sid)
+            if entrada is not None:
+                if entrada.expira_em <= agora:
+                    del fatia.entradas[sid]
+                    self._contar('expiradas')
+                    entrada = None
+                elif self.backend is None or agora - entrada.conferida_em < self.validade_local:
+                    renovar_backend = (
+                        self.backend is not None
+                        and entrada.expira_em - agora < self.ttl - self.intervalo_renovacao
+                    )
+                    entrada.expira_em = agora + self.ttl
+                    fatia.entradas.move_to_end(sid)
+                    if not renovar_backend:
+                        return entrada
+                else:
+                    # Cópia local antiga: outro processo pode ter alterado/encerrado
+                    entrada = None
+
+        if self.backend is None:
+            return entrada
+        if entrada is not None:
+            self.backend.renovar(sid, entrada.expira_em)
+            return entrada
+
+        carregada = self.backend.carregar(sid)
+        self._contar('leituras_backend')
+        if carregada is None or carregada[1] <= agora:
+            with fatia.lock:
+                fatia.entradas.pop(sid, None)
+            return None
+        dados, expira_em = carregada
+        if expira_em - agora < self.ttl - self.intervalo_renovacao:
+            expira_em = agora + self.ttl
+            self.backend.renovar(sid, expira_em)
+        entrada = _Entrada(dados, expira_em, agora)
+        with fatia.lock:
+            fatia.entradas[sid] = entrada
+            fatia.entradas.move_to_end(sid)
+            self._podar(fatia, agora)
+        return entrada
+
+    def obter(self, sid: Optional[str]) -> Optional[dict]:
+        """
+        Dados da sessão (cópia, pode ser alterada pela requisição) ou None se
+        não existir/tiver expirado. Renova a validade.
+        """
+        entrada = self._entrada_valida(sid)
+        return dict(entrada.dados) if entrada is not None else None
+
+    def __contains__(self, sid) -> bool:
+        return self._entrada_valida(sid) is not None
+
+    def atualizar(self, sid: Optional[str], campos: Dict[str, Any]) -> bool:
+        """
+        Altera campos de uma sessão existente.
+
+        Returns:
+            False se a sessão não existir (ou tiver expirado)
+        """
+        entrada = self._entrada_valida(sid)
+        if entrada is None:
+            return False
+        fatia = self._fatia(sid)
+        with fatia.lock:
+            # Troca o dict inteiro: quem leu antes continua com a versão anterior
+            entrada.dados = {**entrada.dados, **campos}
+            dados, expira_em = entrada.dados, entrada.expira_em
+        if self.backend is not None:
+            self.backend.salvar(sid, dados, expira_em)
+        return True
+
+    def destruir(self, sid: Optional[str]) -> None:
+        """Encerra a sessão (logout)."""
+        if not sid:
+            return
+        fatia = self._fatia(sid)
+        with fatia.lock:
+            fatia.entradas.pop(sid, None)
+        if self.backend is not None:
+            self.backend.remover(sid)
+
+    def limpar_expiradas(self) -> int:
+        """Remove sessões vencidas da memória e do backend. Retorna quantas saíram do backend."""
+        agora = time.time()
+        for fatia in self._fatias:
+            with fatia.lock:
+                self._podar(fatia, agora)
+        if self.backend is not None:
+            return self.backend.remover_expiradas(agora)
+        return 0
+
+    def __len__(self) -> int:
+        return sum(len(f.entradas) for f in self._fatias)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores e número de sessões em memória."""
+        with self._lock_estatisticas:
+            contadores = dict(self._estatisticas)
+        return {**contadores, 'sessoes': len(self)}
+
+    def __repr__(self) -> str:
+        backend = type(self.backend).__name__ if self.backend else None
+        return f"<ArmazemSessoes(sessoes={len(self)}, backend={backend})>"
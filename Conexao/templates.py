@@ -0,0 +1,168 @@
+"""
+Páginas HTML do FrontEnd compiladas em memória (trechos fixos + marcadores {{chave}}).
+"""
+import os
+import re
+import stat
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# {{chave}}: mesmo formato aceito pelo antigo str.replace (sem espaços internos)
+PADRAO_MARCADOR = re.compile(r'\{\{([^{}\s]+)\}\}')
+
+
+def localizar_frontend(inicio: str, niveis: int = 4) -> Optional[str]:
+    """
+    Procura a pasta FrontEnd subindo a partir de `inicio`.
+
+    Args:
+        inicio: Diretório inicial da busca
+        niveis: Quantos diretórios acima verificar
+
+    Returns:
+        Caminho absoluto da pasta ou None
+    """
+    base = os.path.abspath(inicio)
+    candidatos = []
+    for _ in range(niveis):
+        candidatos.append(os.path.join(base, "FrontEnd"))
+        base = os.path.dirname(base)
+    encontrado = next((c for c in candidatos if os.path.isdir(c)), None)
+    if not encontrado:
+        print("Não encontrei a pasta FrontEnd. Candidatos:", candidatos)
+    return encontrado
+
+
+class ModeloCompilado:
+    """
+    Página dividida em trechos literais intercalados com marcadores.
+
+    literais tem sempre um item a mais que marcadores:
+    literais[0] + valor(marcadores[0]) + literais[1] + ... + literais[-1]
+    """
+
+    def __init__(self, caminho: str, conteudo: str, estado: os.stat_result, pre_codificar: bool = True):
+        self.caminho = caminho
+        self.mtime_ns = estado.st_mtime_ns
+        self.tamanho = estado.st_size
+        self.verificado_em = time.monotonic()
+
+        partes = PADRAO_MARCADOR.split(conteudo)
+        self.literais: List[str] = partes[0::2]
+        self.marcadores: List[str] = partes[1::2]
+
+        # Página inteira já codificada: resposta sem dados não aloca nada
+        self.conteudo_bytes = conteudo.encode('utf-8')
+        self.literais_bytes: Optional[List[bytes]] = (
+            [literal.encode('utf-8') for literal in self.literais] if pre_codificar else None
+        )
+
+    def renderizar(self, dados: Optional[Dict[str, Any]] = None) -> str:
+        """Monta a página; marcadores sem valor em `dados` ficam como estão."""
+        if not dados or not self.marcadores:
+            return self.conteudo_bytes.decode('utf-8')
+        pedacos = [self.literais[0]]
+        for marcador, literal in zip(self.marcadores, self.literais[1:]):
+            if marcador in dados:
+                pedacos.append(str(dados[marcador]))
+            else:
+                pedacos.append('{{' + marcador + '}}')
+            pedacos.append(literal)
+        return ''.join(pedacos)
+
+    def renderizar_bytes(self, dados: Optional[Dict[str, Any]] = None) -> bytes:
+        """Como renderizar(), já em UTF-8 (usa os trechos pré-codificados se houver)."""
+        if not dados or not self.marcadores:
+            return self.conteudo_bytes
+        if self.literais_bytes is None:
+            return self.renderizar(dados).encode('utf-8')
+        pedacos = [self.literais_bytes[0]]
+        for marcador, literal in zip(self.marcadores, self.literais_bytes[1:]):
+            if marcador in dados:
+                pedacos.append(str(dados[marcador]).encode('utf-8'))
+            else:
+                pedacos.append(b'{{' + marcador.encode('utf-8') + b'}}')
+            pedacos.append(literal)
+        return b''.join(pedacos)
+
+
+class CacheModelos:
+    """
+    Compila cada página no primeiro uso e a mantém em memória.
+
+    - A raiz (pasta FrontEnd) é resolvida uma vez, na criação
+    - O arquivo só é consultado (os.stat) a cada `intervalo_verificacao`
+      segundos; é relido e recompilado apenas se mtime/tamanho mudarem
+    - pre_codificar=True guarda os trechos literais também em bytes
+    """
+
+    def __init__(self, raiz: Optional[str], intervalo_verificacao: float = 2.0, pre_codificar: bool = True):
+        self.raiz = os.path.realpath(raiz) if raiz else None
+        self.intervalo_verificacao = intervalo_verificacao
+        self.pre_codificar = pre_codificar
+
+        self._modelos: Dict[str, ModeloCompilado] = {}
+        self._lock = threading.Lock()
+
+    def _caminho_seguro(self, nome_arquivo: str) -> Optional[str]:
+        caminho = os.path.realpath(os.path.join(self.raiz, nome_arquivo.lstrip('/')))
+        if os.path.commonpath([self.raiz, caminho]) != self.raiz:
+            return None
+        return caminho
+
+    def obter(self, nome_arquivo: str) -> Optional[ModeloCompilado]:
+        """
+        Retorna a página compilada (recompilando se mudou no disco).
+
+        Args:
+            nome_arquivo: Caminho relativo à pasta FrontEnd (ex.: 'login.html')
+
+        Returns:
+            ModeloCompilado ou None se a página não existir
+        """
+        if self.raiz is None:
+            return None
+
+        modelo = self._modelos.get(nome_arquivo)
+        agora = time.monotonic()
+        if modelo is not None and agora - modelo.verificado_em < self.intervalo_verificacao:
+            return modelo
+
+        caminho = self._caminho_seguro(nome_arquivo)
+        if caminho is None:
+            return None
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            with self._lock:
+                self._modelos.pop(nome_arquivo, None)
+            return None
+        if not stat.S_ISREG(estado.st_mode):
+            return None
+
+        if modelo is not None and modelo.mtime_ns == estado.st_mtime_ns and modelo.tamanho == estado.st_size:
+            modelo.verificado_em = agora
+            return modelo
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            conteudo = f.read()
+        modelo = ModeloCompilado(caminho, conteudo, estado, self.pre_codificar)
+        with self._lock:
+            self._modelos[nome_arquivo] = modelo
+        return modelo
+
+    def renderizar(self, nome_arquivo: str, dados: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+        """
+        Página pronta para envio (UTF-8).
+
+        Returns:
+            Bytes da página ou None se ela não existir
+        """
+        modelo = self.obter(nome_arquivo)
+        if modelo is None:
+            return None
+        return modelo.renderizar_bytes(dados)
+
+    def __repr__(self) -> str:
+        return f"<CacheModelos(raiz={self.raiz!r}, paginas={len(self._modelos)})>"
@@ -70,7 +70,8 @@ async function carregarDados() {
     
     document.getElementById('input-kwh-solicitado').setAttribute('max', consumoMax);
 
-    // ✅ Renderiza histórico com filtros
+    // ✅ Renderiza histórico com filtros (primeira página)
+    proximoCursorHistorico = d.historico_paginacao ? d.historico_paginacao.proximo_cursor : null;
     renderizarHistoricoComFiltros(d.historico);
   } catch (err) {
     console.error('Erro:', err);
@@ -269,6 +270,29 @@ let filtrosSolicitacoes = {
 
 // Dados originais (sem filtro)
 let solicitacoesOriginais = [];
+// Cursor da próxima página do histórico (null = não há mais)
+let proximoCursorHistorico = null;
+
+// CARREGAR MAIS SOLICITAÇÕES (próxima página do histórico)
+async function carregarMaisHistorico() {
+  if (!proximoCursorHistorico) return;
+  try {
+    const resp = await fetch(`/api/beneficiario/dados?cursor=${encodeURIComponent(proximoCursorHistorico)}`);
+    const data = await resp.json();
+
+    if (!data.sucesso) {
+      mostrarAlerta(data.mensagem || 'Erro ao carregar histórico', 'error');
+      return;
+    }
+
+    const d = data.dados;
+    proximoCursorHistorico = d.historico_paginacao ? d.historico_paginacao.proximo_cursor : null;
+    renderizarHistoricoComFiltros(solicitacoesOriginais.concat(d.historico || []));
+  } catch (err) {
+    console.error('Erro:', err);
+    mostrarAlerta('Erro ao carregar histórico', 'error');
+  }
+}
 
 // RENDERIZAR HISTÓRICO COM FILTROS
 function renderizarHistoricoComFiltros(historico) {
@@ -433,6 +457,16 @@ function renderizarHistoricoComFiltros(historico) {
   });
 
   html += '</tbody></table>';
+
+  if (proximoCursorHistorico) {
+    html += `
+      <div style="text-align: center; margin-top: 15px;">
+        <button class="btn-acao" onclick="carregarMaisHistorico()" title="Carregar solicitações anteriores">
+          <i class="fas fa-chevron-down"></i> Carregar mais
+        </button>
+      </div>
+    `;
+  }
   historicoDiv.innerHTML = html;
 
   // Restaurar valores dos filtros nos inputs